@@ -0,0 +1,131 @@
+"""Benchmark: selecting welcome/interview send jobs from the responses frame.
+
+Compares the original iterrows() loops from main() with the column-wise
+build_send_jobs() on a synthetic responses frame, and checks both pick the
+same rows.
+
+Run from the repository root:
+
+    python benchmarks/bench_candidate_selection.py [rows]
+"""
+import contextlib
+import os
+import random
+import sys
+import time
+import uuid
+from urllib.parse import quote
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+DEPARTMENTS = list(main.DEPARTMENT_INFO)
+
+
+def synthetic_responses(count, seed=7):
+    """A responses frame shaped like get_new_signups() output, with some bad rows mixed in."""
+    rng = random.Random(seed)
+    names, emails, departments, give, email_sent, interview_sent = [], [], [], [], [], []
+    for i in range(count):
+        roll = rng.random()
+        names.append("" if roll < 0.01 else f"candidate {i} smith")
+        emails.append("" if 0.01 <= roll < 0.02 else f"candidate{i}@example.com")
+        picks = rng.sample(DEPARTMENTS, rng.choice((1, 2)))
+        departments.append(", ".join(picks))
+        give.append(rng.choice(("Yes", "yes ", "No", "")))
+        email_sent.append("" if rng.random() < 0.3 else "Yes")
+        interview_sent.append("" if rng.random() < 0.5 else "Yes")
+    return pd.DataFrame({
+        main.TIMESTAMP_COLUMN: ["1/1/2025 10:00:00"] * count,
+        main.NAME_COLUMN: names,
+        main.EMAIL_COLUMN: emails,
+        main.DEPARTMENTS_COLUMN: departments,
+        main.GIVE_INTERVIEW_COLUMN: give,
+        main.EMAIL_SENT_COLUMN: email_sent,
+        main.INTERVIEW_SENT_COLUMN: interview_sent,
+        "original_row_index": range(2, count + 2),
+    })
+
+
+def legacy_send_jobs(all_records_df):
+    """The selection phase of main() as it was, with iterrows() over each filtered frame."""
+    new_signups_df = all_records_df[all_records_df[main.EMAIL_SENT_COLUMN] == ''].copy()
+    print(f"Found {len(new_signups_df)} new signups for welcome emails.")
+
+    welcome_jobs = []
+    settled_rows = set()
+    for index, row in new_signups_df.iterrows():
+        name = row.get("What is your name?", "")
+        email = row.get("What is your email?", "")
+        departments = row.get("Which department(s) do you want to be in? (Pick up to 2)", "")
+        original_row = row.get("original_row_index")
+
+        if not email or not name:
+            print(f"Skipping row {original_row}: missing name or email")
+            settled_rows.add(original_row)
+            continue
+
+        print(f"Processing welcome email: {name} ({email})")
+        welcome_jobs.append(main.SendJob("welcome", original_row, name.title(), email, departments, None, None))
+
+    interview_needed_df = all_records_df[
+        (all_records_df["Give Interview"].astype(str).str.strip().str.lower() == "yes") &
+        (all_records_df[main.INTERVIEW_SENT_COLUMN] == '')
+    ].copy()
+
+    print(f"\nFound {len(interview_needed_df)} people needing interview emails.")
+
+    interview_jobs = []
+    for index, row in interview_needed_df.iterrows():
+        name = row.get("What is your name?", "")
+        email = row.get("What is your email?", "")
+        departments = row.get("Which department(s) do you want to be in? (Pick up to 2)", "")
+        original_row = row.get("original_row_index")
+
+        if not email or not name:
+            print(f"Skipping row {original_row}: missing name or email")
+            continue
+
+        print(f"Processing interview email: {name} ({email})")
+        name = name.title()
+
+        booking_id = str(uuid.uuid4())
+        dept_param = str(departments) if departments else "Tech"
+        booking_link = f"{main.BOOKING_BASE_URL}?id={booking_id}&name={quote(name)}&email={quote(email)}&dept={quote(dept_param)}"
+        interview_jobs.append(main.SendJob("interview", original_row, name, email, dept_param, booking_id, booking_link))
+
+    return welcome_jobs, interview_jobs, settled_rows
+
+
+def bench(label, select, df):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        result = select(df)
+        elapsed = time.perf_counter() - start
+    welcome_jobs, interview_jobs, skipped = result
+    print(f"{label:<12} {elapsed * 1000:9.1f} ms  ({len(welcome_jobs)} welcome, "
+          f"{len(interview_jobs)} interview, {len(skipped)} skipped)")
+    return elapsed, result
+
+
+def without_booking_id(job):
+    link = job.booking_link.replace(job.booking_id, "") if job.booking_link else None
+    return job._replace(booking_id=None, booking_link=link)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    df = synthetic_responses(count)
+    print(f"{count} response rows")
+
+    legacy_time, (legacy_welcome, legacy_interview, legacy_skipped) = bench("iterrows", legacy_send_jobs, df)
+    new_time, (welcome, interview, skipped) = bench("vectorised", main.build_send_jobs, df)
+
+    assert welcome == legacy_welcome, "welcome jobs differ"
+    assert [without_booking_id(j) for j in interview] == [without_booking_id(j) for j in legacy_interview], \
+        "interview jobs differ"
+    assert set(skipped) == legacy_skipped, "skipped rows differ"
+    print(f"speed-up      {legacy_time / new_time:9.1f}x (same jobs selected)")
@@ -0,0 +1,76 @@
+"""Micro-benchmark: per-message build time of the welcome/interview emails.
+
+Compares the original per-recipient build (department table rebuilt, HTML
+re-rendered, logo re-read and re-encoded for every message) with the
+precompiled templates and shared logo part in main.py.
+
+Run from the repository root:
+
+    python benchmarks/bench_email_templates.py [recipients]
+"""
+import os
+import sys
+import time
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+
+DEPARTMENTS = list(main.DEPARTMENT_INFO)
+
+
+def synthetic_recipients(count):
+    return [
+        (f"Candidate {i}", f"candidate{i}@example.com",
+         f"{DEPARTMENTS[i % len(DEPARTMENTS)]}, {DEPARTMENTS[(i + 3) % len(DEPARTMENTS)]}")
+        for i in range(count)
+    ]
+
+
+def legacy_welcome_message(sender_email, recipient_name, recipient_email, departments_str):
+    """The per-message build as it was done before templates were precompiled."""
+    message = MIMEMultipart("related")
+    message["Subject"] = "Next Steps With SBI!"
+    message["From"] = sender_email
+    message["To"] = recipient_email
+
+    department_info = dict(main.DEPARTMENT_INFO)
+    departments_list = [dep.strip() for dep in departments_str.split(',') if dep.strip()]
+    departments_html = ''
+    for dep in departments_list:
+        departments_html += f"<strong>{dep}:</strong> {department_info[dep]}<br><br>"
+
+    html_content = main.WELCOME_TEMPLATE.source.format(
+        recipient_name=recipient_name, departments_html=departments_html)
+    message.attach(MIMEText(html_content, "html"))
+
+    if os.path.exists(main.LOGO_FILE):
+        with open(main.LOGO_FILE, "rb") as f:
+            logo = MIMEImage(f.read())
+            logo.add_header("Content-ID", "<logo>")
+            message.attach(logo)
+    return message
+
+
+def bench(label, build, recipients):
+    start = time.perf_counter()
+    total_bytes = 0
+    for name, email, departments in recipients:
+        total_bytes += len(build("sender@example.com", name, email, departments).as_string())
+    elapsed = time.perf_counter() - start
+    per_message = elapsed / len(recipients) * 1e6
+    print(f"{label:<12} {elapsed:8.3f}s total  {per_message:9.1f} us/message  {total_bytes / len(recipients) / 1024:7.1f} KiB/message")
+    return elapsed
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    recipients = synthetic_recipients(count)
+    print(f"Building {count} welcome emails")
+    before = bench("before", legacy_welcome_message, recipients)
+    after = bench("after", main.build_welcome_message, recipients)
+    print(f"speed-up: {before / after:.1f}x")
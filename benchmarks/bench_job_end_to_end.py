@@ -0,0 +1,140 @@
+"""Benchmark: a whole run of main() against local stand-ins for every service.
+
+Builds a synthetic responses sheet, installs the fakes from fakes.py on
+main.backends and runs main() twice: a cold run with no ingest checkpoint,
+then a repeat run that should find nothing new. Reports emails/sec, Google
+API calls per row, per-call span latencies and peak memory, and checks
+every welcome-due row was marked sent.
+
+Run from the repository root:
+
+    python benchmarks/bench_job_end_to_end.py [--rows N] [--latency S] [--smtp-latency S]
+        [--error-rate P] [--smtp fake|sink]
+
+--smtp sink sends through the real SMTPTransport to a local SMTPSinkServer
+instead of the in-process fake transport.
+"""
+import argparse
+import contextlib
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Read by main at import: no send-rate or Sheets quota pacing, which would dominate the numbers
+os.environ.setdefault("DISPATCH_RATE_PER_SECOND", "0")
+os.environ.setdefault("SHEETS_READS_PER_MINUTE", "0")
+os.environ.setdefault("SHEETS_WRITES_PER_MINUTE", "0")
+os.environ.setdefault("SMTP_STARTTLS", "0")
+# A throwaway send journal, cleared before the memory pass re-sends to a fresh sheet
+os.environ.setdefault("STATE_STORE", tempfile.mkdtemp(prefix="bench-job-"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from fakes import CallLog, Faults, FakeSecrets, FakeSMTPTransport, FakeSpreadsheet, SMTPSinkServer
+
+HEADERS = [
+    main.TIMESTAMP_COLUMN, main.NAME_COLUMN, main.EMAIL_COLUMN, main.DEPARTMENTS_COLUMN,
+    main.EMAIL_SENT_COLUMN, main.GIVE_INTERVIEW_COLUMN, main.INTERVIEW_SENT_COLUMN,
+]
+SECRETS = {
+    "EMAIL_USER": "automation@example.com",
+    "GOOGLE_PASS": "app-password",
+    "SERVICE_ACCOUNT_FILE": "{}",
+}
+
+
+def synthetic_sheet(count, seed=11):
+    """Header plus `count` responses: 30% awaiting a welcome email, 10% approved for an interview."""
+    rng = random.Random(seed)
+    departments = list(main.DEPARTMENT_INFO)
+    rows = [HEADERS]
+    for i in range(count):
+        welcome_sent = "" if rng.random() < 0.3 else "Yes"
+        give = "Yes" if welcome_sent and rng.random() < 0.1 else ""
+        rows.append([
+            f"1/{i % 28 + 1}/2025 10:{i % 60:02d}:00",
+            f"candidate {i} smith",
+            f"candidate{i}@example.com",
+            ", ".join(rng.sample(departments, rng.choice((1, 2)))),
+            welcome_sent,
+            give,
+            "",
+        ])
+    return rows
+
+
+def run(calls, trace_memory=False):
+    calls.reset()
+    if trace_memory:
+        tracemalloc.start()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        main.main()
+        elapsed = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, dict(calls.counts), peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every Sheets and Secret Manager call")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="seconds added to every fake SMTP send")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of SMTP sends that fail")
+    parser.add_argument("--smtp", choices=("fake", "sink"), default="fake")
+    args = parser.parse_args()
+
+    rows = synthetic_sheet(args.rows)
+    welcome_due = sum(1 for row in rows[1:] if row[4] == "")
+    interview_due = sum(1 for row in rows[1:] if row[5] == "Yes")
+    print(f"{args.rows} response rows: {welcome_due} welcome, {interview_due} interview emails due")
+
+    calls = CallLog()
+    google_faults = Faults(latency=args.latency)
+    smtp_faults = Faults(latency=args.smtp_latency, error_rate=args.error_rate, seed=3)
+    spreadsheet = FakeSpreadsheet({main.RESPONSES_WORKSHEET_NAME: rows}, calls=calls, faults=google_faults)
+    main.backends.spreadsheet = lambda: spreadsheet
+    main.backends.secret = FakeSecrets(SECRETS, calls=calls, faults=google_faults)
+
+    with contextlib.ExitStack() as stack:
+        if args.smtp == "sink":
+            sink = stack.enter_context(SMTPSinkServer(faults=smtp_faults))
+            main.backends.smtp_transport = lambda: main.smtp_transport(host=sink.host, port=sink.port, starttls=False)
+        else:
+            sink = None
+            main.backends.smtp_transport = FakeSMTPTransport.factory(calls=calls, faults=smtp_faults)
+
+        cold_time, cold_calls, _ = run(calls)
+        emails = (sink.messages if sink else cold_calls.get("smtp.sendmail", 0) - smtp_faults.injected)
+        google_calls = sum(count for name, count in cold_calls.items() if not name.startswith("smtp."))
+        print(f"cold run      {cold_time * 1000:9.1f} ms  {emails} emails, {emails / cold_time:,.0f} emails/sec")
+        print(f"              {google_calls} Sheets/Secret Manager calls, {google_calls / args.rows:.4f} per row")
+        print(f"              {dict(sorted(cold_calls.items()))}")
+
+        repeat_time, repeat_calls, _ = run(calls)
+        print(f"repeat run    {repeat_time * 1000:9.1f} ms  {dict(sorted(repeat_calls.items()))}")
+        print("span latencies over both runs:")
+        main.telemetry.report()
+
+    sheet = spreadsheet.worksheets[main.RESPONSES_WORKSHEET_NAME].rows
+    unmarked = sum(1 for row in sheet[1:] if row[4] == "")
+    if not args.error_rate:
+        assert unmarked == 0, f"{unmarked} rows still awaiting a welcome email"
+
+    # Memory is measured on a fresh sheet in a separate pass; tracemalloc slows the run down
+    shutil.rmtree(main.STATE_STORE, ignore_errors=True)
+    spreadsheet = FakeSpreadsheet({main.RESPONSES_WORKSHEET_NAME: synthetic_sheet(args.rows)}, calls=calls)
+    main.backends.spreadsheet = lambda: spreadsheet
+    main.backends.smtp_transport = FakeSMTPTransport.factory(calls=calls)
+    _, _, peak = run(calls, trace_memory=True)
+    print(f"peak memory   {peak / 2**20:9.1f} MiB traced during main(), "
+          f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB max RSS")
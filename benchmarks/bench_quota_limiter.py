@@ -0,0 +1,93 @@
+"""Benchmark: Sheets calls from many threads against a quota-enforcing fake.
+
+The fake worksheet rejects calls above --quota per second with the 429
+APIError Google returns. The same workload runs twice:
+
+  unlimited  every thread calls straight through; rejected calls are lost
+  limited    calls go through sbi_common.quota.QuotaLimiter (token bucket, backoff on 429)
+
+and the report shows throughput against the quota, lost calls, retries,
+total throttle time and the deepest queue of waiting callers.
+
+Run from the repository root:
+
+    python benchmarks/bench_quota_limiter.py [--quota R] [--client-rate R] [--calls N] [--workers N]
+
+A --client-rate above --quota shows the adaptive part: the limiter halves
+its pace on 429s and settles near the real quota. Throttle time is summed
+over all threads.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sbi_common.quota import QUOTA_BURST, QuotaLimiter
+from fakes import Faults, FakeWorksheet
+
+UPDATE = [{"range": "A2", "values": [["Yes"]]}]
+
+
+def run(label, worksheet, faults, calls, workers, limiter=None):
+    lost = []
+    peak_waiting = 0
+    done = threading.Event()
+
+    def one_call(_):
+        try:
+            if limiter is None:
+                worksheet.batch_update(UPDATE)
+            else:
+                limiter.call(worksheet.batch_update, UPDATE)
+        except Exception as e:
+            lost.append(e)
+
+    def watch_queue():
+        nonlocal peak_waiting
+        while not done.wait(0.01):
+            peak_waiting = max(peak_waiting, limiter.bucket.waiting)
+
+    rejected_before = faults.quota_rejections
+    if limiter is not None:
+        threading.Thread(target=watch_queue, daemon=True).start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(one_call, range(calls)))
+    elapsed = time.perf_counter() - start
+    done.set()
+
+    completed = calls - len(lost)
+    print(f"{label:<10} {elapsed:6.2f} s  {completed:5d} ok  {len(lost):5d} lost  "
+          f"{completed / elapsed:6.1f} calls/s  {faults.quota_rejections - rejected_before:5d} 429s", end="")
+    if limiter is not None:
+        stats = limiter.stats()
+        print(f"  {stats['retries']} retries, {stats['throttled_seconds']:.1f} thread-s throttled, "
+              f"peak queue {peak_waiting}, final pace {stats['rate_per_second']}/s")
+    else:
+        print()
+    return lost
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quota", type=float, default=20.0, help="calls per second the fake accepts")
+    parser.add_argument("--client-rate", type=float, help="limiter pace in calls per second (default: the quota)")
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+    burst = QUOTA_BURST
+
+    print(f"{args.calls} batch_update calls from {args.workers} threads, quota {args.quota:g}/s (burst {burst})")
+    faults = Faults(latency=args.latency, quota_per_second=args.quota, quota_burst=burst)
+    worksheet = FakeWorksheet("Form Responses 1", [["Automated Email Sent"]], faults=faults)
+    run("unlimited", worksheet, faults, args.calls, args.workers)
+
+    time.sleep(burst / args.quota)  # let the fake's bucket refill between runs
+    limiter = QuotaLimiter("sheets_write", args.client_rate or args.quota, burst=burst, max_attempts=8)
+    lost = run("limited", worksheet, faults, args.calls, args.workers, limiter)
+    assert not lost, f"{len(lost)} calls lost through the limiter: {lost[0]}"
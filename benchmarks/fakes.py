@@ -0,0 +1,558 @@
+"""In-process stand-ins for Sheets, Calendar, Secret Manager, Cloud Storage and SMTP.
+
+Install them on the `backends` object of main.py or booking-page/booking.py:
+
+    faults = Faults(latency=0.05, error_rate=0.01)
+    calls = CallLog()
+    spreadsheet = FakeSpreadsheet({"Form Responses 1": rows}, calls=calls, faults=faults)
+    main.backends.spreadsheet = lambda: spreadsheet
+    main.backends.secret = FakeSecrets({"EMAIL_USER": "bot@example.com"}, calls=calls)
+    main.backends.smtp_transport = FakeSMTPTransport.factory(calls=calls)
+
+Every fake records its calls in a CallLog and can add latency and injected
+errors through Faults. SMTPSinkServer is a real SMTP server on localhost for
+exercising SMTPTransport itself (run with SMTP_STARTTLS=0).
+"""
+import itertools
+import json
+import random
+import socketserver
+import threading
+import time
+import uuid
+from collections import Counter
+
+import gspread
+import httplib2
+import requests
+from google.api_core import exceptions as google_exceptions
+from googleapiclient.errors import HttpError
+
+
+class InjectedError(Exception):
+    """Raised by a fake when Faults decides a call should fail."""
+
+
+class CallLog:
+    """Thread-safe counter of calls per "service.method"."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def total(self, prefix=""):
+        with self._lock:
+            return sum(count for name, count in self.counts.items() if name.startswith(prefix))
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+
+
+class Faults:
+    """Latency, error and quota injection shared by the fakes.
+
+    Each call sleeps latency +/- jitter seconds, then fails with probability
+    error_rate, or when its 1-based call number is in fail_calls. The error
+    raised is error_factory(name), InjectedError by default.
+
+    With quota_per_second set, calls beyond that rate (after a burst of
+    quota_burst) are rejected with quota_error() the way Google rejects
+    requests over a per-minute quota.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, fail_calls=(), error_factory=None, seed=0,
+                 quota_per_second=None, quota_burst=1):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fail_calls = set(fail_calls)
+        self.error_factory = error_factory or (lambda name: InjectedError(f"injected failure in {name}"))
+        self.quota_per_second = quota_per_second
+        self.quota_burst = quota_burst
+        self.injected = 0
+        self.quota_rejections = 0
+        self._quota_tokens = float(quota_burst)
+        self._quota_updated = time.monotonic()
+        self._calls = itertools.count(1)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _over_quota(self):
+        if self.quota_per_second is None:
+            return False
+        now = time.monotonic()
+        self._quota_tokens = min(self.quota_burst, self._quota_tokens + (now - self._quota_updated) * self.quota_per_second)
+        self._quota_updated = now
+        if self._quota_tokens < 1:
+            self.quota_rejections += 1
+            return True
+        self._quota_tokens -= 1
+        return False
+
+    def apply(self, name):
+        with self._lock:
+            number = next(self._calls)
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            over_quota = self._over_quota()
+            fail = not over_quota and (number in self.fail_calls or self._random.random() < self.error_rate)
+            if fail:
+                self.injected += 1
+        if delay:
+            time.sleep(delay)
+        if over_quota:
+            raise quota_error()
+        if fail:
+            raise self.error_factory(name)
+
+
+NO_FAULTS = Faults()
+
+
+def api_error(status, message, reason, headers=None):
+    """A gspread APIError built from a real error response body."""
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": message, "status": reason}}).encode("utf-8")
+    response.headers.update(headers or {})
+    return gspread.exceptions.APIError(response)
+
+
+def quota_error(status=429, retry_after=None):
+    """The gspread APIError a Sheets quota rejection (or, with another status, a server error) produces."""
+    return api_error(
+        status,
+        "Quota exceeded for quota metric 'Read requests'" if status == 429 else "Backend error",
+        "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE",
+        {"Retry-After": str(retry_after)} if retry_after is not None else None,
+    )
+
+
+def http_error(status, message="Injected"):
+    """The googleapiclient HttpError a Calendar API call fails with."""
+    return HttpError(httplib2.Response({"status": status}), json.dumps({"error": {"message": message}}).encode("utf-8"))
+
+
+class _Fake:
+    def __init__(self, calls=None, faults=None):
+        self.calls = calls or CallLog()
+        self.faults = faults or NO_FAULTS
+
+    def _call(self, name):
+        self.calls.add(name)
+        self.faults.apply(name)
+
+
+def _trimmed(rows):
+    """Drop trailing empty cells and rows the way the Sheets API does."""
+    trimmed = []
+    for row in rows:
+        row = list(row)
+        while row and row[-1] == "":
+            row.pop()
+        trimmed.append(row)
+    while trimmed and not trimmed[-1]:
+        trimmed.pop()
+    return trimmed
+
+
+class FakeWorksheet(_Fake):
+    """A worksheet held as a list of rows (row 1 is the header), with gspread's read/write calls."""
+
+    def __init__(self, title, rows=None, calls=None, faults=None):
+        super().__init__(calls, faults)
+        self.title = title
+        self.rows = [[str(value) for value in row] for row in (rows or [])]
+        self._lock = threading.Lock()
+
+    def _grid(self, a1):
+        grid = gspread.utils.a1_range_to_grid_range(a1)
+        with self._lock:
+            width = max((len(row) for row in self.rows), default=0)
+            row_start = grid.get("startRowIndex", 0)
+            row_end = min(grid.get("endRowIndex", len(self.rows)), len(self.rows))
+            col_start = grid.get("startColumnIndex", 0)
+            col_end = grid.get("endColumnIndex", width)
+            return _trimmed(row[col_start:col_end] for row in self.rows[row_start:row_end])
+
+    def _set(self, row, col, value):
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        while len(cells) < col:
+            cells.append("")
+        cells[col - 1] = "" if value is None else str(value)
+
+    def get_all_values(self):
+        self._call("sheets.get_all_values")
+        with self._lock:
+            return _trimmed(self.rows)
+
+    def get_all_records(self):
+        self._call("sheets.get_all_records")
+        with self._lock:
+            rows = _trimmed(self.rows)
+        if not rows:
+            return []
+        headers, width = rows[0], len(rows[0])
+        values = [gspread.utils.numericise_all(row[:width] + [""] * (width - len(row))) for row in rows[1:]]
+        return gspread.utils.to_records(headers, values)
+
+    def row_values(self, row):
+        self._call("sheets.row_values")
+        return (self._grid(f"{row}:{row}") or [[]])[0]
+
+    def batch_get(self, ranges):
+        self._call("sheets.batch_get")
+        return [self._grid(a1) for a1 in ranges]
+
+    def batch_update(self, data):
+        self._call("sheets.batch_update")
+        with self._lock:
+            for update in data:
+                self._write(update["range"], update["values"])
+
+    def update(self, range_name=None, values=None):
+        self._call("sheets.update")
+        with self._lock:
+            self._write(range_name, values)
+
+    def append_row(self, values, **kwargs):
+        self._call("sheets.append_row")
+        with self._lock:
+            row = len(_trimmed(self.rows)) + 1
+            for col, value in enumerate(values, start=1):
+                self._set(row, col, value)
+
+    def _write(self, a1, values):
+        grid = gspread.utils.a1_range_to_grid_range(a1)
+        for r, row in enumerate(values):
+            for c, value in enumerate(row):
+                self._set(grid.get("startRowIndex", 0) + r + 1, grid.get("startColumnIndex", 0) + c + 1, value)
+
+
+class FakeSpreadsheet(_Fake):
+    """A spreadsheet of FakeWorksheets keyed by title, with the values_batch_get used by the booking page."""
+
+    def __init__(self, tabs=None, calls=None, faults=None):
+        super().__init__(calls, faults)
+        self.worksheets = {
+            title: FakeWorksheet(title, rows, self.calls, self.faults)
+            for title, rows in (tabs or {}).items()
+        }
+
+    def worksheet(self, title):
+        self._call("sheets.worksheet")
+        if title not in self.worksheets:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return self.worksheets[title]
+
+    def add_worksheet(self, title, rows=100, cols=26):
+        self._call("sheets.add_worksheet")
+        if title in self.worksheets:
+            raise api_error(400, f'Invalid requests[0].addSheet: A sheet with the name "{title}" already exists.',
+                            "INVALID_ARGUMENT")
+        self.worksheets[title] = FakeWorksheet(title, [], self.calls, self.faults)
+        return self.worksheets[title]
+
+    def values_batch_get(self, ranges):
+        self._call("sheets.values_batch_get")
+        value_ranges = []
+        for a1 in ranges:
+            title, _, cells = a1.rpartition("!") if "!" in a1 else (a1, "", "")
+            worksheet = self.worksheets[title.strip("'").replace("''", "'")]
+            values = worksheet._grid(cells) if cells else _trimmed(worksheet.rows)
+            value_ranges.append({"range": a1, "values": values})
+        return {"valueRanges": value_ranges}
+
+
+class FakeSecrets(_Fake):
+    """Callable secret source backed by a dict; unknown ids raise KeyError."""
+
+    def __init__(self, values, calls=None, faults=None):
+        super().__init__(calls, faults)
+        self.values = dict(values)
+
+    def __call__(self, secret_id):
+        self._call("secrets.access")
+        return self.values[secret_id]
+
+
+class _FakeBlob:
+    def __init__(self, bucket, name, generation=None):
+        self.bucket = bucket
+        self.name = name
+        self.generation = generation
+
+    def _check(self, generation, current):
+        if generation is not None and generation != (current or 0):
+            raise google_exceptions.PreconditionFailed(f"{self.name}: generation is {current}")
+
+    def download_as_bytes(self, if_generation_match=None):
+        self.bucket._call("storage.download")
+        with self.bucket._lock:
+            if self.name not in self.bucket.objects:
+                raise google_exceptions.NotFound(self.name)
+            generation, data = self.bucket.objects[self.name]
+            self._check(if_generation_match, generation)
+        self.generation = generation
+        return data
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        self.bucket._call("storage.upload")
+        with self.bucket._lock:
+            self._check(if_generation_match, self.bucket.objects.get(self.name, (None,))[0])
+            self.bucket.generations += 1
+            self.generation = self.bucket.generations
+            self.bucket.objects[self.name] = (self.generation, data.encode("utf-8"))
+            lost = self.bucket.lost_responses > 0
+            if lost:
+                self.bucket.lost_responses -= 1
+        if lost:
+            # The write landed but its response didn't: the client's retry trips its own precondition
+            raise google_exceptions.PreconditionFailed(f"{self.name}: generation is {self.generation}")
+
+    def delete(self, if_generation_match=None):
+        self.bucket._call("storage.delete")
+        with self.bucket._lock:
+            if self.name not in self.bucket.objects:
+                raise google_exceptions.NotFound(self.name)
+            self._check(if_generation_match, self.bucket.objects[self.name][0])
+            del self.bucket.objects[self.name]
+
+
+class FakeBucket(_Fake):
+    """Cloud Storage bucket over a dict, honouring if_generation_match like the real service.
+
+    Set lost_responses to have that many uploads succeed but report a
+    precondition failure, as when the client retries a write whose first
+    response was lost.
+    """
+
+    def __init__(self, name="fake-bucket", calls=None, faults=None):
+        super().__init__(calls, faults)
+        self.name = name
+        self.objects = {}
+        self.generations = 0
+        self.lost_responses = 0
+        self._lock = threading.Lock()
+
+    def blob(self, name):
+        return _FakeBlob(self, name)
+
+    def list_blobs(self, prefix=""):
+        self._call("storage.list")
+        with self._lock:
+            return [
+                _FakeBlob(self, name, generation)
+                for name, (generation, _) in sorted(self.objects.items()) if name.startswith(prefix)
+            ]
+
+
+class _Request:
+    def __init__(self, execute):
+        self.execute = execute
+
+
+class FakeCalendarService(_Fake):
+    """Calendar v3 service with events().insert/get and freebusy().query over in-memory events.
+
+    An insert whose body carries an id already in use fails with a 409, as
+    the real API does.
+    """
+
+    def __init__(self, calls=None, faults=None):
+        super().__init__(calls, faults)
+        self.events_by_calendar = {}
+        self._lock = threading.Lock()
+
+    def events(self):
+        return self
+
+    def freebusy(self):
+        return self
+
+    def insert(self, calendarId, body, **kwargs):
+        def execute():
+            self._call("calendar.events.insert")
+            event = dict(body, id=body.get("id") or uuid.uuid4().hex)
+            with self._lock:
+                events = self.events_by_calendar.setdefault(calendarId, [])
+                if any(existing["id"] == event["id"] for existing in events):
+                    raise http_error(409, "The requested identifier already exists.")
+                events.append(event)
+            return event
+        return _Request(execute)
+
+    def get(self, calendarId, eventId, **kwargs):
+        def execute():
+            self._call("calendar.events.get")
+            with self._lock:
+                for event in self.events_by_calendar.get(calendarId, []):
+                    if event["id"] == eventId:
+                        return event
+            raise http_error(404, "Not Found")
+        return _Request(execute)
+
+    def query(self, body):
+        def execute():
+            self._call("calendar.freebusy.query")
+            with self._lock:
+                calendars = {
+                    item["id"]: {"busy": [
+                        {"start": event["start"]["dateTime"], "end": event["end"]["dateTime"]}
+                        for event in self.events_by_calendar.get(item["id"], [])
+                        if event["start"]["dateTime"] < body["timeMax"] and event["end"]["dateTime"] > body["timeMin"]
+                    ]}
+                    for item in body["items"]
+                }
+            return {"calendars": calendars}
+        return _Request(execute)
+
+
+class FakeSMTPTransport(_Fake):
+    """Transport that records messages instead of sending them (keep=False only counts)."""
+
+    def __init__(self, calls=None, faults=None, keep=False):
+        super().__init__(calls, faults)
+        self.keep = keep
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self.outbox = []
+        self._open = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def factory(cls, **kwargs):
+        """Zero-argument constructor for backends.smtp_transport; made transports are kept in .made."""
+        made = []
+
+        def make():
+            transport = cls(**kwargs)
+            made.append(transport)
+            return transport
+        make.made = made
+        return make
+
+    def send(self, sender, recipient, message):
+        with self._lock:
+            if not self._open:
+                self._call("smtp.login")
+                self._open = True
+                self.connections_opened += 1
+            self._call("smtp.sendmail")
+            # Serialise like the real transport so rendering cost is included
+            body = message.as_string()
+            self.messages_sent += 1
+            if self.keep:
+                self.outbox.append((sender, recipient, body))
+
+    def close(self):
+        self._open = False
+
+
+class _SMTPSession(socketserver.StreamRequestHandler):
+    """Just enough of RFC 5321 for smtplib: EHLO, AUTH, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        sink = self.server.sink
+        with sink._lock:
+            sink.sessions += 1
+        self.reply("220 localhost sink ready")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command, _, argument = line.decode("utf-8", "replace").rstrip("\r\n").partition(" ")
+            command = command.upper()
+            if command in ("EHLO", "HELO"):
+                self.wfile.write(b"250-localhost\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            elif command == "AUTH":
+                mechanism = argument.split(" ")[0].upper()
+                if mechanism == "LOGIN":
+                    for prompt in ("VXNlcm5hbWU6", "UGFzc3dvcmQ6"):
+                        self.reply(f"334 {prompt}")
+                        self.rfile.readline()
+                self.reply("235 authenticated")
+            elif command == "MAIL":
+                sender, recipients = argument, []
+                self.reply("250 ok")
+            elif command == "RCPT":
+                recipients.append(argument)
+                self.reply("250 ok")
+            elif command == "DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                size = 0
+                for data in iter(self.rfile.readline, b""):
+                    if data == b".\r\n":
+                        break
+                    size += len(data)
+                try:
+                    sink.faults.apply("smtp.data")
+                except Exception:
+                    self.reply("451 injected failure")
+                    continue
+                sink.received(sender, recipients, size)
+                self.reply("250 queued")
+            elif command in ("RSET", "NOOP"):
+                sender, recipients = None, []
+                self.reply("250 ok")
+            elif command == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 not implemented")
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSinkServer:
+    """Local SMTP server that accepts any login and counts messages, for SMTPTransport runs.
+
+    Point the transports at it with SMTP_SERVER=127.0.0.1 SMTP_PORT=<port>
+    SMTP_STARTTLS=0, or pass host/port/starttls to SMTPTransport directly.
+    Injected DATA failures are answered with a 451.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, faults=None):
+        self.faults = faults or NO_FAULTS
+        self.messages = 0
+        self.bytes = 0
+        self.sessions = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingServer((host, port), _SMTPSession)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address
+        self._thread = None
+
+    def received(self, sender, recipients, size):
+        with self._lock:
+            self.messages += 1
+            self.bytes += size
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True, name="smtp-sink")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
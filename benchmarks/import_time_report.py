@@ -0,0 +1,83 @@
+"""Startup-cost report for the Cloud Run job, from `python -X importtime`.
+
+Imports main.py in a fresh interpreter (best of several runs), prints the
+total and the modules with the largest cumulative import time, and checks
+that the modules main.py loads lazily were not pulled in at import.
+
+Run from the repository root:
+
+    python benchmarks/import_time_report.py [--top N] [--runs N] [--csv FILE]
+
+With --csv a dated row (total and top modules) is appended to FILE so the
+numbers can be tracked from run to run.
+"""
+import argparse
+import csv
+import os
+import re
+import subprocess
+import sys
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imported inside the functions that need them; loading any of these at
+# `import main` means a top-level import crept back in
+LAZY_MODULES = ("pandas", "numpy", "google.cloud.secretmanager", "grpc", "googleapiclient.discovery")
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def measure():
+    """Run one `-X importtime` import of main; returns ({module: (self_us, cumulative_us)}, loaded lazies)."""
+    probe = "import sys, main; print(','.join(m for m in %r if m in sys.modules))" % (LAZY_MODULES,)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, module = match.groups()
+            timings[module] = (int(self_us), int(cumulative_us))
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return timings, loaded
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--csv", help="append a row with the results to this file")
+    args = parser.parse_args()
+
+    runs = [measure() for _ in range(args.runs)]
+    timings, loaded = min(runs, key=lambda run: run[0]["main"][1])
+    total_ms = timings["main"][1] / 1000
+    top = sorted(
+        ((module, cumulative) for module, (_, cumulative) in timings.items() if module != "main"),
+        key=lambda item: item[1], reverse=True,
+    )[:args.top]
+
+    print(f"import main: {total_ms:.1f} ms (best of {args.runs})")
+    print(f"{'cumulative ms':>14}  module")
+    for module, cumulative in top:
+        print(f"{cumulative / 1000:14.1f}  {module}")
+    print(f"lazy modules loaded at import: {', '.join(loaded) if loaded else 'none'}")
+
+    if args.csv:
+        new_file = not os.path.exists(args.csv)
+        with open(args.csv, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(["date", "python", "import_main_ms", "lazy_loaded", "top_modules"])
+            writer.writerow([
+                datetime.now().isoformat(timespec="seconds"),
+                sys.version.split()[0],
+                f"{total_ms:.1f}",
+                " ".join(loaded),
+                " ".join(f"{module}={cumulative / 1000:.1f}" for module, cumulative in top[:5]),
+            ])
+
+    sys.exit(1 if loaded else 0)
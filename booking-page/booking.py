@@ -1,21 +1,56 @@
-from flask import Flask, request, render_template_string, redirect
+from flask import Flask, request, render_template_string, redirect, jsonify, abort, g
 from google.oauth2 import service_account
+from google.auth.transport.requests import Request as GoogleAuthRequest
+from google.auth.exceptions import RefreshError
 from googleapiclient.discovery import build
+from googleapiclient.http import HttpRequest
+import google_auth_httplib2
+import httplib2
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import importlib.util
 import os
+import sys
 import json
-from google.cloud import secretmanager
 from urllib.parse import quote
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
-import ssl
 import gspread
 import re
+import threading
+import time
+import hmac
+import bisect
+import random
+import uuid
+import socket
+import gzip
+import hashlib
+import contextvars
+from concurrent.futures import (
+    CancelledError as FuturesCancelledError, Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError,
+)
+from functools import lru_cache
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
 
-app = Flask(__name__)
+try:
+    import brotli
+except ImportError:  # optional: responses fall back to gzip
+    brotli = None
+
+if importlib.util.find_spec("sbi_common") is None:
+    # Run from a checkout: the shared package sits at the repository root
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sbi_common.secret_cache import SecretCache
+from sbi_common.smtp import SMTPPool, SMTPTransport
+from sbi_common.quota import QuotaLimiter, http_status
+from sbi_common.store import open_store
+from sbi_common.telemetry import Telemetry, server_timing
+
+# Static files are served by static_asset() under content-hashed names instead of Flask's default route
+app = Flask(__name__, static_folder=None)
 
 # Department to calendar mapping
 DEPARTMENT_CALENDARS = {
@@ -28,48 +63,419 @@ DEPARTMENT_CALENDARS = {
     'Legal': 'eseoheaigberadion@gmail.com',
 }
 
+DEFAULT_CALENDAR = 'eseoheaigberadion@gmail.com'
+
+# Interview times are entered and shown in Central time
+LOCAL_TIMEZONE = 'America/Chicago'
+LOCAL_TZ = ZoneInfo(LOCAL_TIMEZONE)
+
+# Busy times from the department calendars are cached briefly, per window of days, and dropped after each booking
+FREEBUSY_CACHE_TTL = int(os.environ.get('FREEBUSY_CACHE_TTL', '60'))
+FREEBUSY_CACHE_WINDOWS = 16
+FREEBUSY_RETRY_AFTER = 30
+CALENDAR_HTTP_TIMEOUT = 30
+
 # Department-specific meeting locations are now managed in Google Sheets "Locations" tab
 # Default fallback location if sheet is not configured
 DEFAULT_LOCATION = 'McCombs School of Business, 2110 Speedway, Austin, TX 78705, USA'
 
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
+GOOGLE_SHEET_NAME = "SBI General Interest Form (Responses)"
+AVAILABILITY_TAB = "Director Availability"
+LOCATIONS_TAB = "Locations"
+
+# Availability and locations are served from a snapshot refreshed in the background
+SHEET_CACHE_TTL = int(os.environ.get('SHEET_CACHE_TTL', '300'))
+SHEET_CACHE_RETRY_AFTER = 30
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+# Largest date window the availability API returns in one response
+AVAILABILITY_WINDOW_DAYS = 14
+AVAILABILITY_MAX_DAYS = 31
+
+# Sheet and calendar reads for one page run concurrently; past the budget the page renders
+# with the default location and the slots are filled in by the availability API instead
+PAGE_FETCH_BUDGET = float(os.environ.get('PAGE_FETCH_BUDGET', '2.5'))
+FETCH_WORKERS = 8
+
+# Compiled templates are cached here, and the state store defaults to a directory in it
+DATA_DIR = os.environ.get('BOOKING_DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+
+# Post-booking side effects (invite email) run on a background queue, kept in STATE_STORE, with retries
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '6'))
+JOB_RETRY_BASE = 10
+JOB_RETRY_MAX = 900
+JOB_POLL_INTERVAL = 5
+# A running job whose owner hasn't touched it for this long is assumed lost and run again
+JOB_LEASE = 600
+JOB_DRAIN_TIMEOUT = int(os.environ.get('JOB_DRAIN_TIMEOUT', '20'))
+
+# Page templates and the stylesheet ship next to this file; compiled templates are cached on disk
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+TEMPLATE_CACHE_DIR = os.path.join(DATA_DIR, 'template-cache')
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+# Text responses at least this large are compressed (brotli when installed and accepted, else gzip)
+COMPRESS_MIN_SIZE = 500
+COMPRESS_MIMETYPES = {'text/html', 'text/css', 'application/json', 'application/javascript'}
+
+# Bookings and the slots they hold live in a store every instance shares: gs://<bucket>/<prefix>
+# when deployed, a local directory (one machine only) by default
+STATE_STORE = os.environ.get('STATE_STORE', os.path.join(DATA_DIR, 'state'))
+# A slot held by a /book that never finished (say its instance was stopped) is freed after this long
+RESERVATION_TTL = int(os.environ.get('RESERVATION_TTL', '300'))
+# Slot pages reuse a calendar month's booked slots for this long; /book itself always checks the store
+TAKEN_SLOTS_TTL = 10
+
+# Fetched in the gunicorn parent before workers fork; PREFETCH_SECRETS=0 fetches them on first request
+PREFETCH_SECRETS = os.environ.get('PREFETCH_SECRETS', '1') == '1'
+PREFETCH_SECRET_IDS = ('SERVICE_ACCOUNT_FILE', 'CALENDAR_SERVICE_ACCOUNT_FILE', 'EMAIL_USER', 'GOOGLE_PASS')
+
+# Invite emails go out over a small pool of authenticated sessions (see sbi_common.smtp for the rest)
+SMTP_POOL_SIZE = int(os.environ.get('SMTP_POOL_SIZE', '2'))
+
+# Google and SMTP calls are paced per API and retried on 429/5xx with exponential backoff and
+# full jitter; a page view gives up sooner than the job does (see PAGE_FETCH_BUDGET)
+SHEETS_READS_PER_MINUTE = float(os.environ.get('SHEETS_READS_PER_MINUTE', '60'))
+CALENDAR_REQUESTS_PER_MINUTE = float(os.environ.get('CALENDAR_REQUESTS_PER_MINUTE', '600'))
+SMTP_RATE_PER_SECOND = float(os.environ.get('SMTP_RATE_PER_SECOND', '5'))
+API_MAX_ATTEMPTS = int(os.environ.get('API_MAX_ATTEMPTS', '3'))
+API_BACKOFF_BASE = 0.5
+API_BACKOFF_MAX = 8.0
+
+# Every Secret Manager, Sheets, Calendar and SMTP call is timed into a latency histogram and
+# reported per request in a Server-Timing header
+TELEMETRY_SERVICE = 'sbi-booking-page'
+
+telemetry = Telemetry(TELEMETRY_SERVICE)
+
+# Every Sheets read, Calendar call and SMTP send goes through one of these
+def _quota(name, rate):
+    return QuotaLimiter(name, rate, max_attempts=API_MAX_ATTEMPTS,
+                        backoff_base=API_BACKOFF_BASE, backoff_max=API_BACKOFF_MAX)
+
+_sheets_read_quota = _quota('sheets_read', SHEETS_READS_PER_MINUTE / 60)
+_calendar_quota = _quota('calendar', CALENDAR_REQUESTS_PER_MINUTE / 60)
+_smtp_quota = _quota('smtp', SMTP_RATE_PER_SECOND)
+
+def quota_stats():
+    return {quota.name: quota.stats() for quota in (_sheets_read_quota, _calendar_quota, _smtp_quota)}
+
+# Misses go through backends.secret, looked up per call so a stand-in can replace it
+_secret_cache = SecretCache(telemetry, lambda secret_id: backends.secret(secret_id))
+
 def get_secret(secret_id):
-    """Retrieve a secret from Google Secret Manager."""
-    client = secretmanager.SecretManagerServiceClient()
-    project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
-    name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
-    response = client.access_secret_version(request={"name": name})
-    return response.payload.data.decode("UTF-8")
+    """Retrieve a secret from Google Secret Manager (cached per process)."""
+    return _secret_cache.get(secret_id)
+
+def get_email_credentials():
+    """Retrieve email credentials from Secret Manager."""
+    return get_secret("EMAIL_USER"), get_secret("GOOGLE_PASS")
+
+def smtp_transport(**options):
+    """An SMTPTransport that logs in with the booking page's Gmail credentials."""
+    return SMTPTransport(get_email_credentials, telemetry, **options)
+
+_mailer = None
+_mailer_lock = threading.Lock()
+
+def get_mailer():
+    """Return the process-wide SMTP pool, creating it on first use."""
+    global _mailer
+    with _mailer_lock:
+        if _mailer is None:
+            _mailer = SMTPPool(backends.smtp_transport, SMTP_POOL_SIZE)
+        return _mailer
+
+class CalendarClient:
+    """Process-wide Calendar API service, built once from the bundled discovery document.
+
+    httplib2 connections aren't thread-safe, so every request is executed on
+    an Http object owned by the calling thread; each thread keeps its own
+    connections open between requests. The access token is refreshed under
+    a lock before it expires instead of by whichever request trips over it.
+    """
+
+    def __init__(self):
+        self.builds = 0
+        self.token_refreshes = 0
+        self._credentials = None
+        self._service = None
+        self._lock = threading.Lock()
+        self._token_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _thread_http(self):
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = httplib2.Http(timeout=CALENDAR_HTTP_TIMEOUT)
+        return http
+
+    def _ensure_fresh_token(self):
+        with self._token_lock:
+            if self._credentials.valid:
+                return
+            try:
+                with telemetry.span('calendar.token_refresh'):
+                    self._credentials.refresh(GoogleAuthRequest())
+            except RefreshError:
+                # The key itself was rejected; rebuild from a freshly fetched secret next time
+                _secret_cache.invalidate("CALENDAR_SERVICE_ACCOUNT_FILE")
+                self.reset()
+                raise
+            self.token_refreshes += 1
+
+    def _build_request(self, http, *args, **kwargs):
+        self._ensure_fresh_token()
+        authorized_http = google_auth_httplib2.AuthorizedHttp(self._credentials, http=self._thread_http())
+        return HttpRequest(authorized_http, *args, **kwargs)
+
+    def service(self):
+        with self._lock:
+            if self._service is None:
+                creds_dict = json.loads(get_secret("CALENDAR_SERVICE_ACCOUNT_FILE"))
+                self._credentials = service_account.Credentials.from_service_account_info(
+                    creds_dict,
+                    scopes=SCOPES
+                )
+                with telemetry.span('calendar.build'):
+                    self._service = build(
+                        "calendar", "v3",
+                        http=google_auth_httplib2.AuthorizedHttp(self._credentials, http=httplib2.Http(timeout=CALENDAR_HTTP_TIMEOUT)),
+                        requestBuilder=self._build_request,
+                        static_discovery=True,
+                        cache_discovery=False,
+                    )
+                self.builds += 1
+            return self._service
+
+    def reset(self):
+        with self._lock:
+            self._service = None
+
+    def reset_connections(self):
+        """Forget per-thread Http objects so a forked worker doesn't reuse its parent's sockets."""
+        self._local = threading.local()
+
+    def stats(self):
+        return {'builds': self.builds, 'token_refreshes': self.token_refreshes}
+
+_calendar = CalendarClient()
 
 def get_calendar_service():
-    """Initialize Google Calendar service."""
-    credentials_json = get_secret("CALENDAR_SERVICE_ACCOUNT_FILE")
-    creds_dict = json.loads(credentials_json)
-    creds = service_account.Credentials.from_service_account_info(
-        creds_dict,
-        scopes=SCOPES
-    )
-    return build("calendar", "v3", credentials=creds)
+    """Return the shared Google Calendar service."""
+    return backends.calendar_service()
+
+class SpreadsheetClient:
+    """Process-wide gspread client and Spreadsheet handle, created lazily.
+
+    Credentials come straight from Secret Manager into memory. The underlying
+    AuthorizedSession refreshes the access token as it expires; the refresh is
+    done under a lock so concurrent requests don't all refresh at once. If the
+    key itself is rejected the client is rebuilt from a freshly fetched secret.
+    """
 
-def get_director_availability(department):
-    """Get director availability from Google Sheets for a specific department."""
+    def __init__(self, sheet_name=GOOGLE_SHEET_NAME):
+        self.sheet_name = sheet_name
+        self.opens = 0
+        self.token_refreshes = 0
+        self._credentials = None
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._lock = threading.Lock()
+
+    def _open(self):
+        credentials_dict = json.loads(get_secret("SERVICE_ACCOUNT_FILE"))
+        self._credentials = service_account.Credentials.from_service_account_info(
+            credentials_dict,
+            scopes=gspread.auth.DEFAULT_SCOPES
+        )
+        with telemetry.span('sheets.open', spreadsheet=self.sheet_name):
+            gc = gspread.authorize(self._credentials)
+            self._spreadsheet = _sheets_read_quota.call(gc.open, self.sheet_name)
+        self._worksheets = {}
+        self.opens += 1
+
+    def _ensure_open(self):
+        if self._spreadsheet is None:
+            self._open()
+        if not self._credentials.valid:
+            with telemetry.span('sheets.token_refresh'):
+                self._credentials.refresh(GoogleAuthRequest())
+            self.token_refreshes += 1
+
+    def spreadsheet(self):
+        """Return the shared Spreadsheet handle, opening it on first use."""
+        with self._lock:
+            self._ensure_open()
+            return self._spreadsheet
+
+    def worksheet(self, title):
+        """Return a cached Worksheet handle, opening the spreadsheet on first use."""
+        with self._lock:
+            self._ensure_open()
+            if title not in self._worksheets:
+                self._worksheets[title] = _sheets_read_quota.call(self._spreadsheet.worksheet, title)
+            return self._worksheets[title]
+
+    def reset(self):
+        """Drop the client so the next call re-authenticates from scratch."""
+        with self._lock:
+            self._credentials = None
+            self._spreadsheet = None
+            self._worksheets = {}
+
+    def stats(self):
+        return {'opens': self.opens, 'token_refreshes': self.token_refreshes}
+
+_sheets = SpreadsheetClient()
+
+class Backends:
+    """The external services the app talks to, looked up at call time.
+
+    spreadsheet() returns a gspread Spreadsheet, calendar_service() a Calendar
+    v3 service (freebusy().query and events().insert are used), secret(secret_id)
+    a secret value and smtp_transport() an object with send(sender, recipient,
+    message) and close(). Assigning other callables (e.g. the in-process fakes
+    in benchmarks/fakes.py) runs the app without Google or Gmail.
+    """
+
+    def __init__(self):
+        self.spreadsheet = _sheets.spreadsheet
+        self.calendar_service = _calendar.service
+        self.secret = _secret_cache.fetch
+        self.smtp_transport = smtp_transport
+
+backends = Backends()
+
+def read_tabs_values(titles):
+    """Read several whole tabs with one values_batch_get call.
+
+    Re-authenticates once if the credentials were rejected.
+    Returns {title: rows}.
+    """
+    ranges = ["'" + title.replace("'", "''") + "'" for title in titles]
     try:
-        # Get credentials from Secret Manager
-        credentials_json = get_secret("SERVICE_ACCOUNT_FILE")
-        credentials_dict = json.loads(credentials_json)
-        
-        # Create temporary file for gspread
-        with open('/tmp/credentials.json', 'w') as f:
-            json.dump(credentials_dict, f)
-        
-        gc = gspread.service_account(filename='/tmp/credentials.json')
-        
-        # Open the spreadsheet and the Director Availability tab
-        sh = gc.open("SBI General Interest Form (Responses)").worksheet("Director Availability")
-        
-        # Get all values from the sheet
-        all_values = sh.get_all_values()
+        spreadsheet = backends.spreadsheet()
+        with telemetry.span('sheets.values_batch_get', tabs=len(ranges)) as span:
+            response = _sheets_read_quota.call(spreadsheet.values_batch_get, ranges)
+    except RefreshError as e:
+        print(f"Sheets credentials rejected ({e}), re-authenticating")
+        _secret_cache.invalidate("SERVICE_ACCOUNT_FILE")
+        _sheets.reset()
+        spreadsheet = backends.spreadsheet()
+        with telemetry.span('sheets.values_batch_get', tabs=len(ranges), retry=True) as span:
+            response = _sheets_read_quota.call(spreadsheet.values_batch_get, ranges)
+    value_ranges = response.get('valueRanges', [])
+    tabs = {
+        title: value_range.get('values', [])
+        for title, value_range in zip(titles, value_ranges)
+    }
+    span.set('rows', sum(len(rows) for rows in tabs.values()))
+    return tabs
+
+class SheetSnapshotCache:
+    """Cached snapshot of the availability and locations tabs.
+
+    Reads within `ttl` seconds are served from memory. Once the snapshot is
+    older, the stale copy is still returned and a single background refresh
+    is started (stale-while-revalidate). If Sheets errors out the last good
+    snapshot keeps being served and the refresh is retried after
+    SHEET_CACHE_RETRY_AFTER seconds. Only the very first load blocks.
+    """
+
+    def __init__(self, titles, ttl=SHEET_CACHE_TTL):
+        self.titles = tuple(titles)
+        self.ttl = ttl
+        self.refreshes = 0
+        self.failures = 0
+        self._snapshot = None
+        self._fetched_at = 0.0
+        self._next_refresh = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def get(self):
+        """Return {title: rows}, loading synchronously only if nothing is cached yet."""
+        with self._lock:
+            snapshot = self._snapshot
+            start_background = (
+                snapshot is not None
+                and not self._refreshing
+                and time.monotonic() >= self._next_refresh
+            )
+            if start_background:
+                self._refreshing = True
+        if snapshot is None:
+            return self._load_first()
+        if start_background:
+            threading.Thread(target=self._background_refresh, name="sheet-cache-refresh", daemon=True).start()
+        return snapshot
+
+    def _load_first(self):
+        # Simultaneous cold requests share one fetch
+        with self._load_lock:
+            if self._snapshot is None:
+                self.refresh(raise_errors=True)
+            return self._snapshot
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def refresh(self, raise_errors=False):
+        """Fetch every tab now. Returns True on success; a failure keeps the old snapshot."""
+        try:
+            snapshot = read_tabs_values(self.titles)
+        except Exception as e:
+            self.failures += 1
+            with self._lock:
+                self._next_refresh = time.monotonic() + min(self.ttl, SHEET_CACHE_RETRY_AFTER)
+            print(f"Failed to refresh sheet cache, serving last good snapshot: {e}")
+            if raise_errors:
+                raise
+            return False
+        with self._lock:
+            self._snapshot = snapshot
+            self._fetched_at = time.monotonic()
+            self._next_refresh = self._fetched_at + self.ttl
+        self.refreshes += 1
+        print(f"Refreshed sheet cache: {', '.join(f'{t} ({len(snapshot[t])} rows)' for t in self.titles)}")
+        return True
+
+    def invalidate(self):
+        """Mark the snapshot stale so the next read triggers a refresh."""
+        with self._lock:
+            self._next_refresh = 0.0
+
+    def stats(self):
+        with self._lock:
+            age = time.monotonic() - self._fetched_at if self._snapshot is not None else None
+        return {
+            'warm': self._snapshot is not None,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+        }
+
+_tab_cache = SheetSnapshotCache((AVAILABILITY_TAB, LOCATIONS_TAB))
+
+def get_director_availability(department, tabs=None):
+    """Get director availability from Google Sheets for a specific department.
+
+    `tabs` is a snapshot already in hand ({title: rows}); the cached one is used otherwise.
+    """
+    try:
+        # Get all values from the cached Director Availability tab
+        all_values = (tabs or _tab_cache.get())[AVAILABILITY_TAB]
         
         if not all_values or len(all_values) < 1:
             print("No data in Director Availability sheet")
@@ -102,24 +508,11 @@ def get_director_availability(department):
         traceback.print_exc()
         return []
 
-def get_department_location(department):
+def get_department_location(department, tabs=None):
     """Get meeting location from Google Sheets for a specific department."""
     try:
-        # Get credentials from Secret Manager
-        credentials_json = get_secret("SERVICE_ACCOUNT_FILE")
-        credentials_dict = json.loads(credentials_json)
-        
-        # Create temporary file for gspread
-        with open('/tmp/credentials.json', 'w') as f:
-            json.dump(credentials_dict, f)
-        
-        gc = gspread.service_account(filename='/tmp/credentials.json')
-        
-        # Open the spreadsheet and the Locations tab
-        sh = gc.open("SBI General Interest Form (Responses)").worksheet("Locations")
-        
-        # Get all values from the sheet
-        all_values = sh.get_all_values()
+        # Get all values from the cached Locations tab
+        all_values = (tabs or _tab_cache.get())[LOCATIONS_TAB]
         
         if not all_values or len(all_values) < 1:
             print("No data in Locations sheet")
@@ -263,57 +656,120 @@ def parse_date_string(date_str):
     
     raise ValueError(f"Could not parse date: {date_str}")
 
+def _merge_intervals(intervals):
+    """Sort (start, end) minute ranges and merge the ones that overlap or touch."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+class AvailabilityIndex:
+    """Director availability blocks compiled into sorted, merged minute ranges.
+
+    Blocks are parsed once: undated blocks become one list of recurring
+    ranges and dated blocks keep their date span. The ranges that apply to a
+    given day are merged once per day, after which a slot lookup is a bisect
+    and a whole-day listing is a single sweep over slots and ranges.
+    """
+
+    def __init__(self, blocks):
+        self.always_open = not blocks
+        self.recurring = []
+        self.dated = []
+        self._days = {}
+        recurring = []
+        for block in blocks:
+            try:
+                compiled = self._compile_block(block)
+            except Exception as e:
+                print(f"Error parsing availability block '{block}': {e}")
+                continue
+            if compiled is None:
+                continue
+            start_date, end_date, start_minute, end_minute = compiled
+            if start_minute >= end_minute:
+                continue
+            if start_date is None:
+                recurring.append((start_minute, end_minute))
+            else:
+                self.dated.append((start_date, end_date, start_minute, end_minute))
+        self.recurring = _merge_intervals(recurring)
+
+    @staticmethod
+    def _compile_block(block):
+        start_date, end_date, time_range = parse_availability_block(block)
+        if '-' not in time_range:
+            return None
+        start_str, end_str = time_range.split('-')
+        start_hour, start_minute = parse_time_string(start_str)
+        end_hour, end_minute = parse_time_string(end_str)
+        if start_hour is None or end_hour is None:
+            return None
+        return start_date, end_date, start_hour * 60 + start_minute, end_hour * 60 + end_minute
+
+    def intervals_for(self, day):
+        """Merged (start_minute, end_minute) ranges open on a date."""
+        intervals = self._days.get(day)
+        if intervals is None:
+            dated = [
+                (start_minute, end_minute)
+                for start_date, end_date, start_minute, end_minute in self.dated
+                if start_date <= day <= end_date
+            ]
+            intervals = _merge_intervals(self.recurring + dated) if dated else self.recurring
+            self._days[day] = intervals
+        return intervals
+
+    def is_available(self, slot_start, slot_end):
+        """Whether [slot_start, slot_end) (same-day datetimes) fits inside one open range."""
+        if self.always_open:
+            return True
+        intervals = self.intervals_for(slot_start.date())
+        start = slot_start.hour * 60 + slot_start.minute
+        end = start + int((slot_end - slot_start).total_seconds() // 60)
+        position = bisect.bisect_right(intervals, (start, float('inf'))) - 1
+        return position >= 0 and intervals[position][1] >= end
+
+    def available_slots(self, slots, day):
+        """Filter a day's slots (sorted by start, as generate_time_slots returns them)."""
+        if self.always_open:
+            return list(slots)
+        intervals = self.intervals_for(day)
+        available = []
+        position = 0
+        for slot in slots:
+            start_dt = datetime.fromisoformat(slot['start'])
+            end_dt = datetime.fromisoformat(slot['end'])
+            start = start_dt.hour * 60 + start_dt.minute
+            end = start + int((end_dt - start_dt).total_seconds() // 60)
+            # Ranges ending before this slot ends can't hold it or any later slot
+            while position < len(intervals) and intervals[position][1] < end:
+                position += 1
+            if position == len(intervals):
+                break
+            if intervals[position][0] <= start:
+                available.append(slot)
+        return available
+
+@lru_cache(maxsize=64)
+def _compile_availability(blocks, year):
+    # `year` is part of the key because "M/D" dates resolve against the current year
+    return AvailabilityIndex(list(blocks))
+
+def get_availability_index(availability_blocks):
+    """Compiled index for a list of blocks, reused until the blocks change."""
+    return _compile_availability(tuple(availability_blocks), datetime.now().year)
+
 def is_slot_available(slot_start, availability_blocks, date_str):
     """Check if a time slot falls within any of the director's availability blocks."""
     if not availability_blocks:
         # If no availability is set, show all slots
         return True
-    
     slot_time = datetime.fromisoformat(slot_start)
-    slot_date = slot_time.date()
-    
-    for block in availability_blocks:
-        try:
-            # Parse the availability block
-            start_date, end_date, time_range = parse_availability_block(block)
-            
-            # Check date match
-            if start_date is not None and end_date is not None:
-                # Date-specific availability
-                if not (start_date <= slot_date <= end_date):
-                    # Slot date is outside the specified date range
-                    continue
-            # If start_date and end_date are None, it applies to all dates
-            
-            # Now check time range
-            if '-' not in time_range:
-                continue
-            
-            start_str, end_str = time_range.split('-')
-            
-            start_hour, start_minute = parse_time_string(start_str)
-            end_hour, end_minute = parse_time_string(end_str)
-            
-            if start_hour is None or end_hour is None:
-                continue
-            
-            # Create datetime objects for the availability block
-            date = datetime.strptime(date_str, '%Y-%m-%d')
-            block_start = date.replace(hour=start_hour, minute=start_minute, second=0, microsecond=0)
-            block_end = date.replace(hour=end_hour, minute=end_minute, second=0, microsecond=0)
-            
-            # Check if slot falls within this availability block
-            slot_end = slot_time + timedelta(minutes=30)
-            
-            # Slot is available if it starts at or after block_start and ends at or before block_end
-            if slot_time >= block_start and slot_end <= block_end:
-                return True
-        
-        except Exception as e:
-            print(f"Error parsing availability block '{block}': {e}")
-            continue
-    
-    return False
+    return get_availability_index(availability_blocks).is_available(slot_time, slot_time + timedelta(minutes=30))
 
 def generate_time_slots(date_str):
     """Generate 30-min time slots from 9am to 9pm."""
@@ -332,6 +788,496 @@ def generate_time_slots(date_str):
     
     return slots
 
+def _to_local(timestamp):
+    """RFC 3339 timestamp from the Calendar API -> naive Central-time datetime."""
+    return datetime.fromisoformat(timestamp).astimezone(LOCAL_TZ).replace(tzinfo=None)
+
+class FreeBusyCache:
+    """Busy intervals of every department calendar, from batched freebusy queries.
+
+    Results are cached per window of days. A fetch covers at least
+    AVAILABILITY_WINDOW_DAYS from the requested day so the booking page and
+    the availability API share it, and up to `max_windows` windows are kept
+    side by side. Concurrent misses on one window wait for a single query,
+    made outside the lock. Entries live for `ttl` seconds and are expired
+    whenever /book creates an event; is_free() always asks the Calendar API
+    afresh. If the API fails the window's last result (or nothing) is used
+    and queries are retried after FREEBUSY_RETRY_AFTER seconds.
+    """
+
+    def __init__(self, calendar_ids, ttl=FREEBUSY_CACHE_TTL, max_windows=FREEBUSY_CACHE_WINDOWS):
+        self.calendar_ids = sorted(set(calendar_ids))
+        self.ttl = ttl
+        self.max_windows = max_windows
+        self.queries = 0
+        self.hits = 0
+        self.shared = 0
+        self._windows = {}
+        self._in_flight = {}
+        self._generation = 0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def query_body(calendar_ids, start_day, end_day):
+        """freebusy.query request body covering whole local days [start_day, end_day)."""
+        time_min = datetime.combine(start_day, datetime.min.time(), tzinfo=LOCAL_TZ)
+        time_max = datetime.combine(end_day, datetime.min.time(), tzinfo=LOCAL_TZ)
+        return {
+            'timeMin': time_min.isoformat(),
+            'timeMax': time_max.isoformat(),
+            'timeZone': LOCAL_TIMEZONE,
+            'items': [{'id': calendar_id} for calendar_id in calendar_ids],
+        }
+
+    @staticmethod
+    def parse_response(response):
+        """{calendar_id: merged local (start, end) busy intervals} from a freebusy.query response."""
+        busy = {}
+        for calendar_id, calendar in response.get('calendars', {}).items():
+            if calendar.get('errors'):
+                print(f"Free/busy errors for {calendar_id}: {calendar['errors']}")
+            busy[calendar_id] = _merge_intervals(
+                (_to_local(period['start']), _to_local(period['end']))
+                for period in calendar.get('busy', [])
+            )
+        return busy
+
+    @staticmethod
+    def is_free_in(busy, start, end):
+        """Whether [start, end) overlaps none of the sorted, merged busy intervals."""
+        position = bisect.bisect_left(busy, (end,))
+        return position == 0 or busy[position - 1][1] <= start
+
+    def _cached(self, start_day, end_day, stale_ok=False):
+        """Busy times of a cached window covering [start_day, end_day), else None. Call under the lock."""
+        now = time.monotonic()
+        for (window_start, window_end), (expires, busy) in self._windows.items():
+            if window_start <= start_day and end_day <= window_end and (stale_ok or now < expires):
+                return busy
+        return None
+
+    def _join(self, start_day, end_day, new_flight):
+        """Under the lock: (busy, None) on a hit, else (None, (window, flight, generation)).
+
+        The flight is new_flight() when this caller must make the query, or
+        the one already in flight for the window; window is None while
+        queries are held off after a failure.
+        """
+        now = time.monotonic()
+        busy = self._cached(start_day, end_day, stale_ok=now < self._retry_at)
+        if busy is not None:
+            self.hits += 1
+            return busy, None
+        if now < self._retry_at:
+            return {}, None
+        window = (start_day, max(end_day, start_day + timedelta(days=AVAILABILITY_WINDOW_DAYS)))
+        flight = self._in_flight.get(window)
+        if flight is not None:
+            self.shared += 1
+            return None, (None, flight, None)
+        flight = self._in_flight[window] = new_flight()
+        return None, (window, flight, self._generation)
+
+    def _land(self, window, generation, busy, error, start_day, end_day):
+        """Under the lock: record a query's outcome and return the busy times its callers get."""
+        del self._in_flight[window]
+        if error is not None:
+            print(f"Free/busy query failed, not filtering booked slots: {error}")
+            self._retry_at = time.monotonic() + FREEBUSY_RETRY_AFTER
+            return self._cached(start_day, end_day, stale_ok=True) or {}
+        self.queries += 1
+        # A query that began before invalidate() may predate the new event: use it, but don't keep it fresh
+        expires = time.monotonic() + self.ttl if generation == self._generation else 0.0
+        self._windows[window] = (expires, busy)
+        while len(self._windows) > self.max_windows:
+            del self._windows[min(self._windows, key=lambda key: self._windows[key][0])]
+        return busy
+
+    def _abandon(self, window):
+        """Under the lock: drop a query that never finished, caching nothing, so the next caller makes it again."""
+        del self._in_flight[window]
+
+    def _fetch(self, start_day, end_day, calendar_ids=None):
+        calendar_ids = calendar_ids or self.calendar_ids
+        service = get_calendar_service()
+        with telemetry.span('calendar.freebusy.query', calendars=len(calendar_ids),
+                            days=(end_day - start_day).days) as span:
+            response = _calendar_quota.call(service.freebusy().query(
+                body=self.query_body(calendar_ids, start_day, end_day)).execute)
+            busy = self.parse_response(response)
+            span.set('busy_intervals', sum(len(intervals) for intervals in busy.values()))
+        return busy
+
+    def busy_intervals(self, calendar_id, start_day, end_day):
+        """Merged (start, end) busy datetimes for a calendar between two dates."""
+        while True:
+            with self._lock:
+                busy, joined = self._join(start_day, end_day, Future)
+            if busy is not None:
+                return busy.get(calendar_id, [])
+            window, flight, generation = joined
+            if window is None:
+                try:
+                    return flight.result().get(calendar_id, [])
+                except FuturesCancelledError:
+                    # The caller making the query was interrupted: make it again
+                    continue
+            busy, error = {}, None
+            try:
+                busy = self._fetch(*window)
+            except Exception as e:
+                error = e
+            except BaseException:
+                with self._lock:
+                    self._abandon(window)
+                flight.cancel()
+                raise
+            with self._lock:
+                busy = self._land(window, generation, busy, error, start_day, end_day)
+            flight.set_result(busy)
+            return busy.get(calendar_id, [])
+
+    def is_free(self, calendar_id, start, end):
+        """Whether [start, end) overlaps no busy interval, from a fresh query of that calendar's day."""
+        day = start.date()
+        try:
+            busy = self._fetch(day, day + timedelta(days=1), [calendar_id]).get(calendar_id, [])
+        except Exception as e:
+            print(f"Free/busy re-check failed, using cached busy times: {e}")
+            busy = self.busy_intervals(calendar_id, day, day + timedelta(days=1))
+        return self.is_free_in(busy, start, end)
+
+    def invalidate(self):
+        """Expire every window; the results are still used if the next query fails."""
+        with self._lock:
+            self._generation += 1
+            self._windows = {window: (0.0, busy) for window, (_, busy) in self._windows.items()}
+            self._retry_at = 0.0
+
+    def stats(self):
+        return {'queries': self.queries, 'hits': self.hits, 'shared': self.shared, 'windows': len(self._windows)}
+
+_busy_cache = FreeBusyCache(list(DEPARTMENT_CALENDARS.values()) + [DEFAULT_CALENDAR])
+
+def remove_busy_slots(slots, busy):
+    """Drop slots overlapping any busy interval; both lists sorted by start."""
+    if not busy:
+        return list(slots)
+    free = []
+    position = 0
+    for slot in slots:
+        start = datetime.fromisoformat(slot['start'])
+        end = datetime.fromisoformat(slot['end'])
+        # Busy intervals that ended before this slot can't overlap any later slot
+        while position < len(busy) and busy[position][1] <= start:
+            position += 1
+        if position == len(busy) or busy[position][0] >= end:
+            free.append(slot)
+    return free
+
+class BookingLedger:
+    """Record of bookings made through this service, in the shared state store.
+
+    Each booking is kept under bookings/<booking_id> and holds its slot
+    under slots/<calendar>/<start time>. Both are claimed with the store's
+    atomic create, so at most one booking holds a calendar/start-time pair
+    across every instance, and reserving an existing booking_id returns that
+    booking instead of creating another. A reservation that is never
+    confirmed (the request died part-way) expires after `ttl` seconds; the
+    slot can then be claimed again, and a retry under the same booking_id
+    takes its booking over.
+    """
+
+    RESERVED = 'reserved'
+    EXISTING = 'existing'
+    TAKEN = 'taken'
+
+    def __init__(self, store, ttl=RESERVATION_TTL, cache_ttl=TAKEN_SLOTS_TTL):
+        self.store = store
+        self.ttl = ttl
+        self.cache_ttl = cache_ttl
+        self.lists = 0
+        self.hits = 0
+        self._taken = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _calendar_prefix(calendar_id):
+        return f"slots/{hashlib.sha1(calendar_id.encode('utf-8')).hexdigest()[:16]}/"
+
+    def _slot_key(self, calendar_id, start_time):
+        return self._calendar_prefix(calendar_id) + start_time
+
+    @staticmethod
+    def _booking_key(booking_id):
+        return f"bookings/{booking_id}"
+
+    @staticmethod
+    def _expired(record, now):
+        return record['status'] != 'confirmed' and record['expires_at'] <= now
+
+    def _claim(self, key, record, may_take):
+        """Create `key`, or replace a record for which may_take(record) holds; returns (generation, holder)."""
+        for _ in range(3):
+            generation = self.store.create(key, record)
+            if generation is not None:
+                return generation, None
+            holder, holder_generation = self.store.read(key)
+            if holder is None:
+                continue
+            if not may_take(holder):
+                return None, holder
+            generation = self.store.replace(key, record, holder_generation)
+            if generation is not None:
+                return generation, None
+        return None, self.store.read(key)[0]
+
+    def _update(self, key, when=None, **changes):
+        """Apply changes to a record (if when(record) holds), re-reading it if another writer got there first.
+
+        Returns the updated record, or None when there is none to update.
+        """
+        for _ in range(3):
+            record, generation = self.store.read(key)
+            if record is None or (when is not None and not when(record)):
+                return None
+            record = dict(record, **changes)
+            if self.store.replace(key, record, generation) is not None:
+                return record
+        raise RuntimeError(f"{key} kept changing while being updated")
+
+    def reserve(self, booking):
+        """Try to hold booking['calendar_id'] at booking['start_time'].
+
+        Returns (outcome, record) where outcome is RESERVED, EXISTING (record
+        is the booking already stored under this id) or TAKEN (record is the
+        slot's holder, with its booking_id).
+        """
+        now = time.time()
+        booking_id = booking['booking_id']
+        record = dict(booking, status='reserved', event_id=None, created_at=now, expires_at=now + self.ttl)
+        generation, existing = self._claim(
+            self._booking_key(booking_id), record, lambda existing: self._expired(existing, now))
+        if generation is None:
+            return self.EXISTING, existing
+
+        slot = {
+            'booking_id': booking_id, 'start_time': booking['start_time'], 'end_time': booking['end_time'],
+            'status': 'reserved', 'expires_at': now + self.ttl,
+        }
+        _, holder = self._claim(
+            self._slot_key(booking['calendar_id'], booking['start_time']), slot,
+            lambda holder: holder['booking_id'] == booking_id or self._expired(holder, now))
+        if holder is not None:
+            self.store.delete(self._booking_key(booking_id), generation)
+            return self.TAKEN, holder
+        self._forget(booking['calendar_id'])
+        return self.RESERVED, None
+
+    def confirm(self, booking_id, event_id):
+        record = self._update(self._booking_key(booking_id), status='confirmed', event_id=event_id, expires_at=None)
+        if record is None:
+            return
+        slot = self._update(self._slot_key(record['calendar_id'], record['start_time']),
+                            when=lambda slot: slot['booking_id'] == booking_id, status='confirmed', expires_at=None)
+        if slot is None:
+            print(f"Booking {booking_id} was confirmed after its reservation of {record['start_time']} expired "
+                  f"and the slot was claimed again")
+
+    def release(self, booking_id):
+        key = self._booking_key(booking_id)
+        record, generation = self.store.read(key)
+        if record is None:
+            return
+        slot_key = self._slot_key(record['calendar_id'], record['start_time'])
+        slot, slot_generation = self.store.read(slot_key)
+        if slot is not None and slot['booking_id'] == booking_id:
+            self.store.delete(slot_key, slot_generation)
+        self.store.delete(key, generation)
+        self._forget(record['calendar_id'])
+
+    def get(self, booking_id):
+        return self.store.read(self._booking_key(booking_id))[0]
+
+    def _forget(self, calendar_id):
+        prefix = self._calendar_prefix(calendar_id)
+        with self._lock:
+            for key in [key for key in self._taken if key.startswith(prefix)]:
+                del self._taken[key]
+
+    def _taken_in_month(self, calendar_id, month):
+        """Start times held on a calendar in the month of `month`, from one list of the store."""
+        prefix = self._calendar_prefix(calendar_id) + month.strftime('%Y-%m-')
+        now = time.time()
+        with self._lock:
+            cached = self._taken.get(prefix)
+            if cached is not None and now < cached[0]:
+                self.hits += 1
+                return cached[1]
+        taken = frozenset(
+            slot['start_time'] for _, slot, _ in self.store.list(prefix) if not self._expired(slot, now)
+        )
+        with self._lock:
+            self.lists += 1
+            self._taken[prefix] = (now + self.cache_ttl, taken)
+        return taken
+
+    def taken_between(self, calendar_id, start_day, end_day):
+        """{day ISO string: start times booked or held} for a calendar's days in [start_day, end_day).
+
+        Slot keys sort by start time, so each month the range touches is one
+        list of the store (cached for cache_ttl): a whole availability window
+        costs one or two.
+        """
+        first, last = start_day.isoformat(), end_day.isoformat()
+        taken = {}
+        month = start_day.replace(day=1)
+        while month < end_day:
+            for start_time in self._taken_in_month(calendar_id, month):
+                if first <= start_time[:10] < last:
+                    taken.setdefault(start_time[:10], set()).add(start_time)
+            month = (month + timedelta(days=32)).replace(day=1)
+        return taken
+
+    def taken_slots(self, calendar_id, day):
+        """Set of start times (ISO strings, as in the slot dicts) booked or held on a calendar's day."""
+        return self.taken_between(calendar_id, day, day + timedelta(days=1)).get(day.isoformat(), set())
+
+    def stats(self):
+        return {'store': repr(self.store), 'lists': self.lists, 'hits': self.hits, **self.store.stats()}
+
+_state_store = None
+_ledger = None
+_ledger_lock = threading.Lock()
+
+def get_state_store():
+    """Return the process-wide record store for STATE_STORE."""
+    global _state_store
+    with _ledger_lock:
+        if _state_store is None:
+            _state_store = open_store(STATE_STORE, telemetry)
+        return _state_store
+
+def get_ledger():
+    """Return the process-wide booking ledger."""
+    global _ledger
+    store = get_state_store()
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = BookingLedger(store)
+        return _ledger
+
+def get_open_slots(availability_blocks, day, calendar_id=None, busy=None, taken=None):
+    """Available 30-min slots on a date: inside the director's availability and not already booked.
+
+    `busy` is the calendar's busy intervals and `taken` the ledger's taken
+    start times for the day, when the caller already has them.
+    """
+    all_time_slots = generate_time_slots(day.isoformat())
+    slots = get_availability_index(availability_blocks).available_slots(all_time_slots, day)
+    if calendar_id is None or not slots:
+        return slots
+    # Bookings made here are in the ledger; the cached free/busy index covers everything else
+    if taken is None:
+        taken = get_ledger().taken_slots(calendar_id, day)
+    slots = [slot for slot in slots if slot['start'] not in taken]
+    if busy is None:
+        busy = _busy_cache.busy_intervals(calendar_id, day, day + timedelta(days=1))
+    return remove_busy_slots(slots, busy)
+
+class SingleFlight:
+    """Runs reads on a shared thread pool, once per key for all concurrent callers.
+
+    A second page load asking for a read that is already in flight gets the
+    same Future instead of starting another call. The pool is created lazily
+    (and again after fork) so a preloading server parent never owns threads.
+    """
+
+    def __init__(self, workers=FETCH_WORKERS):
+        self.workers = workers
+        self.calls = 0
+        self.shared = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+
+    def _get_pool(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="booking-fetch")
+            self._pool_pid = os.getpid()
+            self._in_flight = {}
+        return self._pool
+
+    def submit(self, key, fn, *args):
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.shared += 1
+                return future
+            # Run in a copy of the caller's context so the read's spans are reported with its request
+            future = self._get_pool().submit(contextvars.copy_context().run, fn, *args)
+            self._in_flight[key] = future
+            self.calls += 1
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def stats(self):
+        return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._in_flight)}
+
+_flights = SingleFlight()
+
+class PageFetch:
+    """The reads one request needs, started together and collected within a latency budget.
+
+    result() returns `default` for a read that fails or is still running when
+    the budget is spent; the read itself keeps going and fills the caches
+    for the next request.
+    """
+
+    def __init__(self, budget=None):
+        self.deadline = time.monotonic() + budget if budget is not None else None
+        self.missed = []
+
+    def start(self, key, fn, *args):
+        return _flights.submit(key, fn, *args)
+
+    def result(self, future, default=None):
+        timeout = max(self.deadline - time.monotonic(), 0) if self.deadline is not None else None
+        try:
+            return future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            self.missed.append(future)
+            return default
+        except Exception as e:
+            print(f"Page fetch failed: {e}")
+            self.missed.append(future)
+            return default
+
+def fetch_department_data(department, calendar_id, start_day, end_day, budget=None):
+    """Sheet snapshot and the calendar's busy times for a page, fetched concurrently.
+
+    Returns (availability_blocks, location, busy); availability_blocks and
+    busy are None when their read missed the budget.
+    """
+    fetch = PageFetch(budget)
+    tabs_future = fetch.start('sheet-snapshot', _tab_cache.get)
+    busy_future = fetch.start(('freebusy', calendar_id, start_day, end_day),
+                              _busy_cache.busy_intervals, calendar_id, start_day, end_day)
+    tabs = fetch.result(tabs_future)
+    busy = fetch.result(busy_future)
+    if fetch.missed:
+        print(f"Page data for {department} not ready within {budget}s, rendering without it")
+    if tabs is None:
+        return None, DEFAULT_LOCATION, busy
+    return get_director_availability(department, tabs), get_department_location(department, tabs), busy
+
 def create_ics_file(name, email, department, start_time, end_time, location):
     """Generate .ics calendar file content."""
     start_dt = datetime.fromisoformat(start_time)
@@ -360,20 +1306,16 @@ END:VCALENDAR"""
     
     return ics_content
 
-def send_calendar_invite_email(name, email, department, start_time, end_time, ics_content, location):
-    """Send email with .ics calendar attachment."""
-    try:
-        sender_email = get_secret("EMAIL_USER")
-        sender_password = get_secret("GOOGLE_PASS")
-        
-        message = MIMEMultipart()
-        message["Subject"] = f"Your SBI {department} Interview"
-        message["From"] = sender_email
-        message["To"] = email
-        
-        start_dt = datetime.fromisoformat(start_time)
-        
-        body = f"""
+def build_invite_message(sender_email, name, email, department, start_time, location, ics_content):
+    """The confirmation email with the .ics invite attached."""
+    message = MIMEMultipart()
+    message["Subject"] = f"Your SBI {department} Interview"
+    message["From"] = sender_email
+    message["To"] = email
+    
+    start_dt = datetime.fromisoformat(start_time)
+    
+    body = f"""
 Hi {name},
 
 Your interview with Sustainable Building Initiative has been confirmed!
@@ -391,22 +1333,25 @@ We look forward to meeting you!
 Best regards,
 The SBI Team
 """
+    
+    message.attach(MIMEText(body, "plain"))
+    
+    # Attach .ics file
+    part = MIMEBase("text", "calendar", method="REQUEST")
+    part.set_payload(ics_content.encode('utf-8'))
+    encoders.encode_base64(part)
+    part.add_header('Content-Disposition', f'attachment; filename="sbi-interview.ics"')
+    message.attach(part)
+    return message
+
+def send_calendar_invite_email(name, email, department, start_time, end_time, ics_content, location):
+    """Send email with .ics calendar attachment."""
+    try:
+        sender_email = get_secret("EMAIL_USER")
+        message = build_invite_message(sender_email, name, email, department, start_time, location, ics_content)
         
-        message.attach(MIMEText(body, "plain"))
-        
-        # Attach .ics file
-        part = MIMEBase("text", "calendar", method="REQUEST")
-        part.set_payload(ics_content.encode('utf-8'))
-        encoders.encode_base64(part)
-        part.add_header('Content-Disposition', f'attachment; filename="sbi-interview.ics"')
-        message.attach(part)
-        
-        # Send email
-        context = ssl.create_default_context()
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls(context=context)
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, email, message.as_string())
+        # Send over the shared SMTP session
+        _smtp_quota.call(get_mailer().send, sender_email, email, message)
         
         print(f"Calendar invite email sent to {email}")
         return True
@@ -415,6 +1360,358 @@ The SBI Team
         print(f"Failed to send email to {email}: {e}")
         return False
 
+class JobQueue:
+    """Background queue for post-booking side effects, journaled in the shared state store.
+
+    Jobs are stored under jobs/<id> before enqueue() returns, then picked up
+    by a dispatcher thread and run on a small worker pool. A failed job is
+    retried with exponential backoff and jitter until max_attempts and then
+    kept as failed; a job that succeeds is deleted. Claiming a job replaces
+    its record at the generation the dispatcher listed, so every process and
+    instance sharing the store can run the queue without running a job twice
+    at the same time. A running job is taken back from a process that has
+    exited (checked on this host only) or that hasn't finished it within
+    JOB_LEASE seconds, so the jobs of a stopped instance are not lost.
+    """
+
+    PREFIX = 'jobs/'
+
+    def __init__(self, store, handlers, workers=JOB_WORKERS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.completed = 0
+        self.retried = 0
+        self._jobs = []
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._slots = threading.Semaphore(self.workers)
+        self._executor = None
+        self._dispatcher = None
+        self.owner = None
+
+    def start(self):
+        """Start the workers; jobs left pending or running by earlier processes are picked up."""
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="booking-job")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="booking-job-dispatcher", daemon=True)
+        self._dispatcher.start()
+        return self
+
+    def _list(self):
+        self._jobs = self.store.list(self.PREFIX)
+        return self._jobs
+
+    @staticmethod
+    def _due(record, now):
+        return record['status'] == 'pending' and record['next_run_at'] <= now
+
+    @staticmethod
+    def _abandoned(record, now):
+        if record['status'] != 'running':
+            return False
+        # Liveness can only be checked for processes on this host; elsewhere the lease decides
+        owner_host, _, owner_pid = record['claimed_by'].rpartition(':')
+        return record['lease_until'] <= now or (owner_host == socket.gethostname() and not _process_alive(owner_pid))
+
+    def enqueue(self, kind, payload):
+        """Journal a job and wake the dispatcher. Returns the job id."""
+        now = time.time()
+        job_id = f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+        self.store.create(self.PREFIX + job_id, {
+            'id': job_id, 'kind': kind, 'payload': payload, 'status': 'pending', 'attempts': 0,
+            'next_run_at': now, 'last_error': None, 'claimed_by': None, 'lease_until': None,
+            'created_at': now, 'updated_at': now,
+        })
+        self._wake.set()
+        return job_id
+
+    def _claim_due(self, limit):
+        now = time.time()
+        claimed = []
+        for key, record, generation in sorted(self._list(), key=lambda job: job[1]['next_run_at']):
+            if len(claimed) >= limit:
+                break
+            abandoned = self._abandoned(record, now)
+            if not (abandoned or self._due(record, now)):
+                continue
+            running = dict(record, status='running', claimed_by=self.owner, lease_until=now + JOB_LEASE,
+                           updated_at=now)
+            generation = self.store.replace(key, running, generation)
+            if generation is not None:
+                if abandoned:
+                    print(f"Took over interrupted background job {record['id']} from {record['claimed_by']}")
+                claimed.append((key, running, generation))
+        return claimed
+
+    def _seconds_until_next(self):
+        pending = [record['next_run_at'] for _, record, _ in self._jobs if record['status'] == 'pending']
+        if not pending:
+            return JOB_POLL_INTERVAL
+        return min(max(min(pending) - time.time(), 0.0), JOB_POLL_INTERVAL)
+
+    def _dispatch_loop(self):
+        while not self._stopping.is_set():
+            self._wake.clear()
+            try:
+                # Only claim as many jobs as there are idle workers
+                free = 0
+                while free < self.workers and self._slots.acquire(blocking=False):
+                    free += 1
+                claimed = self._claim_due(free) if free else []
+                for _ in range(free - len(claimed)):
+                    self._slots.release()
+                for job in claimed:
+                    self._executor.submit(self._run, *job)
+                if not free:
+                    wait = JOB_POLL_INTERVAL  # woken as soon as a worker finishes
+                elif len(claimed) == free:
+                    wait = 0  # every idle worker got a job; there may be more due
+                else:
+                    wait = self._seconds_until_next()
+            except Exception as e:
+                print(f"Background job dispatcher error: {e}")
+                wait = JOB_POLL_INTERVAL
+            if wait:
+                self._wake.wait(wait)
+
+    def _settle(self, key, record, generation):
+        """Save a job this process ran (delete it when record is None)."""
+        try:
+            if record is None:
+                settled = self.store.delete(key, generation)
+            else:
+                settled = self.store.replace(key, record, generation) is not None
+        except Exception as e:
+            # Left running, the job is run again once its lease runs out
+            print(f"Could not update background job {key}: {e}")
+            return
+        if not settled:
+            print(f"Background job {key} was taken over by another process while it ran")
+
+    def _run(self, key, record, generation):
+        job_id, kind = record['id'], record['kind']
+        try:
+            self.handlers[kind](record['payload'])
+        except Exception as e:
+            attempts = record['attempts'] + 1
+            if attempts >= self.max_attempts:
+                status, next_run_at = 'failed', time.time()
+                print(f"Background job {job_id} ({kind}) failed permanently after {attempts} attempts: {e}")
+            else:
+                delay = min(JOB_RETRY_BASE * 2 ** (attempts - 1), JOB_RETRY_MAX)
+                status, next_run_at = 'pending', time.time() + delay * random.uniform(0.5, 1.5)
+                self.retried += 1
+                print(f"Background job {job_id} ({kind}) failed, retry {attempts} in ~{delay}s: {e}")
+            self._settle(key, dict(record, status=status, attempts=attempts, next_run_at=next_run_at,
+                                   last_error=str(e), claimed_by=None, lease_until=None,
+                                   updated_at=time.time()), generation)
+        else:
+            self._settle(key, None, generation)
+            self.completed += 1
+        finally:
+            self._slots.release()
+            self._wake.set()
+
+    def drain(self, timeout=JOB_DRAIN_TIMEOUT):
+        """Keep running jobs that are already due for up to `timeout` seconds, then shut down.
+
+        Jobs waiting out a retry delay stay in the store for the next process.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            now = time.time()
+            if not any(self._due(record, now) for _, record, _ in self._list()):
+                break
+            self._wake.set()
+            time.sleep(0.5)
+        self.shutdown(timeout=max(deadline - time.monotonic(), 0))
+
+    def shutdown(self, timeout=None):
+        """Stop dispatching and wait for claimed jobs to finish; pending ones stay in the store."""
+        self._stopping.set()
+        self._wake.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout)
+        if self._executor is not None:
+            # Claims never outnumber idle workers, and a claimed job left unrun would wait out its lease
+            self._executor.shutdown(wait=True)
+
+    def stats(self):
+        counts = {}
+        for _, record, _ in self._jobs:
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+        counts.update(completed_here=self.completed, retried_here=self.retried)
+        return counts
+
+def _process_alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def run_invite_email_job(payload):
+    """Background job: build the .ics invite and email it to the candidate."""
+    ics_content = create_ics_file(payload['name'], payload['email'], payload['department'],
+                                  payload['start_time'], payload['end_time'], payload['location'])
+    sent = send_calendar_invite_email(payload['name'], payload['email'], payload['department'],
+                                      payload['start_time'], payload['end_time'], ics_content, payload['location'])
+    if not sent:
+        raise RuntimeError(f"could not send calendar invite to {payload['email']}")
+
+JOB_HANDLERS = {
+    'invite_email': run_invite_email_job,
+}
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+def get_job_queue():
+    """Return the process-wide job queue, starting it (and resuming journaled jobs) on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(get_state_store(), JOB_HANDLERS).start()
+        return _job_queue
+
+def warm_up():
+    """Fill the secret, sheet and free/busy caches so the first requests don't wait on Google APIs."""
+    if PREFETCH_SECRETS:
+        _secret_cache.prefetch(PREFETCH_SECRET_IDS)
+    _tab_cache.refresh()
+    tomorrow = (datetime.now() + timedelta(days=1)).date()
+    _busy_cache.busy_intervals(DEFAULT_CALENDAR, tomorrow, tomorrow + timedelta(days=1))
+
+def release_connections():
+    """Drop network connections but keep cached data and built clients.
+
+    Called in a preloading server's parent once warm_up() is done and again
+    in every forked worker, since sockets and gRPC channels can't be shared
+    across fork().
+    """
+    _secret_cache.reset_client()
+    _calendar.reset_connections()
+    _sheets.reset()
+
+def drain(timeout=JOB_DRAIN_TIMEOUT):
+    """Finish due background jobs and close SMTP connections before the process exits."""
+    if _job_queue is not None:
+        _job_queue.drain(timeout)
+    if _mailer is not None:
+        _mailer.close()
+
+def compress_body(body, encoding, static=False):
+    """Encode a body; static assets are compressed once, so they get the slowest, smallest settings."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=11 if static else 5)
+    return gzip.compress(body, compresslevel=9 if static else 6)
+
+def choose_encoding(accept_encodings):
+    """Best content coding we can produce for an Accept-Encoding header, or None."""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+class StaticAsset:
+    """A file from static/ served at a content-hashed URL, read and compressed once at import.
+
+    The hash changes whenever the file does, so browsers can cache the URL
+    for a year without ever seeing a stale stylesheet.
+    """
+
+    def __init__(self, filename, mimetype):
+        with open(os.path.join(STATIC_DIR, filename), 'rb') as f:
+            body = f.read()
+        self.digest = hashlib.sha256(body).hexdigest()[:12]
+        stem, ext = os.path.splitext(filename)
+        self.name = f"{stem}.{self.digest}{ext}"
+        self.url = f"/static/{self.name}"
+        self.mimetype = mimetype
+        self.bodies = {None: body, 'gzip': compress_body(body, 'gzip', static=True)}
+        if brotli is not None:
+            self.bodies['br'] = compress_body(body, 'br', static=True)
+
+    def response(self):
+        encoding = choose_encoding(request.accept_encodings)
+        response = app.response_class(self.bodies[encoding], mimetype=self.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(self.digest)
+        response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+        return response
+
+STATIC_ASSETS = {asset.name: asset for asset in (
+    StaticAsset('booking.css', 'text/css'),
+)}
+
+def _template_bytecode_cache():
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    except OSError as e:
+        print(f"Template bytecode cache disabled: {e}")
+        return None
+    return FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
+# Templates are compiled once here; auto_reload is off so rendering never stats the files
+_templates = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(['html']),
+    bytecode_cache=_template_bytecode_cache(),
+    auto_reload=False,
+)
+_templates.globals['stylesheet_url'] = next(iter(STATIC_ASSETS.values())).url
+
+BOOKING_TEMPLATE = _templates.get_template('booking.html')
+CONFIRM_TEMPLATE = _templates.get_template('confirm.html')
+BOOKED_TEMPLATE = _templates.get_template('booked.html')
+
+@app.route('/static/<name>')
+def static_asset(name):
+    asset = STATIC_ASSETS.get(name)
+    if asset is None:
+        abort(404)
+    return asset.response()
+
+@app.after_request
+def compress_response(response):
+    """Compress text responses for clients that accept it."""
+    if (response.direct_passthrough or response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The ETag was computed on the uncompressed body, so it only promises semantic equality now
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+@app.before_request
+def start_request_timing():
+    g.request_started = time.perf_counter()
+    g.request_spans = telemetry.collect()
+
+@app.after_request
+def add_server_timing(response):
+    """Report where the request's time went, e.g. in the browser's network panel."""
+    if 'request_started' in g:
+        total_ms = (time.perf_counter() - g.request_started) * 1000
+        response.headers['Server-Timing'] = server_timing(g.request_spans, total_ms)
+    return response
+
+@app.teardown_request
+def stop_request_timing(exc):
+    telemetry.stop_collecting()
+
 @app.route('/')
 def booking_page():
     booking_id = request.args.get('id', '')
@@ -426,161 +1723,77 @@ def booking_page():
     tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
     selected_date = request.args.get('date', tomorrow)
     
-    # Generate all possible time slots
-    all_time_slots = generate_time_slots(selected_date)
-    
-    # Get director availability for this department
-    availability_blocks = get_director_availability(department)
-    
-    # Get location for this department
-    location = get_department_location(department)
-    
-    # Filter time slots based on director availability
-    time_slots = []
-    for slot in all_time_slots:
-        if is_slot_available(slot['start'], availability_blocks, selected_date):
-            time_slots.append(slot)
-    
-    print(f"Showing {len(time_slots)} available slots out of {len(all_time_slots)} total slots")
-    
-    html = '''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Book Your SBI Interview - {{ department }}</title>
-        <style>
-            body {
-                font-family: Arial, sans-serif;
-                max-width: 800px;
-                margin: 50px auto;
-                padding: 20px;
-                background-color: #f5f5f5;
-            }
-            .container {
-                background: white;
-                padding: 30px;
-                border-radius: 10px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }
-            h1 {
-                color: #0066cc;
-                margin-bottom: 10px;
-            }
-            .info {
-                background-color: #f0f8ff;
-                padding: 15px;
-                border-left: 4px solid #0066cc;
-                margin-bottom: 20px;
-            }
-            .location-note {
-                background-color: #fff9e6;
-                border-left: 4px solid #ffcc00;
-                padding: 12px;
-                margin-bottom: 20px;
-                font-size: 14px;
-            }
-            .date-selector {
-                margin: 20px 0;
-            }
-            .date-selector input {
-                padding: 10px;
-                font-size: 16px;
-                border: 1px solid #ddd;
-                border-radius: 5px;
-            }
-            .time-grid {
-                display: grid;
-                grid-template-columns: repeat(auto-fill, minmax(150px, 1fr));
-                gap: 10px;
-                margin-top: 20px;
-            }
-            .time-slot {
-                background-color: #0066cc;
-                color: white;
-                padding: 15px;
-                text-align: center;
-                border-radius: 5px;
-                cursor: pointer;
-                border: none;
-                font-size: 16px;
-                transition: background-color 0.3s;
-            }
-            .time-slot:hover {
-                background-color: #0052a3;
-            }
-            .no-slots {
-                background-color: #fff3cd;
-                border: 1px solid #ffc107;
-                padding: 20px;
-                border-radius: 5px;
-                text-align: center;
-                margin-top: 20px;
+    # Director availability, location and busy times are read concurrently
+    day = datetime.strptime(selected_date, '%Y-%m-%d').date()
+    calendar_id = DEPARTMENT_CALENDARS.get(department, DEFAULT_CALENDAR)
+    with telemetry.span('page_fetch', department=department) as span:
+        availability_blocks, location, busy = fetch_department_data(
+            department, calendar_id, day, day + timedelta(days=1), budget=PAGE_FETCH_BUDGET)
+        span.set('complete', availability_blocks is not None and busy is not None)
+    
+    # Filter time slots based on director availability; if the reads ran out of time the
+    # page's script renders the slots from the availability API once they're in
+    slots_pending = availability_blocks is None or busy is None
+    with telemetry.span('slots', department=department) as span:
+        time_slots = [] if slots_pending else get_open_slots(availability_blocks, day, calendar_id, busy=busy)
+        span.set('slots', len(time_slots))
+    
+    print(f"Showing {len(time_slots)} available slots for {selected_date}")
+    
+    with telemetry.span('render', template='booking.html'):
+        return BOOKING_TEMPLATE.render(
+            booking_id=booking_id,
+            name=name,
+            email=email,
+            department=department,
+            location=location,
+            selected_date=selected_date,
+            tomorrow=tomorrow,
+            time_slots=time_slots,
+            slots_pending=slots_pending,
+            page_context={
+                'booking_id': booking_id,
+                'name': name,
+                'email': email,
+                'department': department,
+                'location': location,
+                'selected_date': selected_date,
+                'window_days': AVAILABILITY_WINDOW_DAYS,
+                'slots_pending': slots_pending,
             }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>Book Your SBI Interview</h1>
-            <div class="info">
-                <strong>Name:</strong> {{ name }}<br>
-                <strong>Email:</strong> {{ email }}<br>
-                <strong>Department:</strong> {{ department }}<br>
-                <strong>Location:</strong> {{ location }}
-            </div>
-            
-            <div class="location-note">
-                📍 <strong>Note:</strong> We will message you through text beforehand about the exact meeting location, or if the location changes.
-            </div>
-            
-            <div class="date-selector">
-                <label for="date"><strong>Select Date:</strong></label><br>
-                <input type="date" id="date" value="{{ selected_date }}" 
-                       min="{{ tomorrow }}"
-                       onchange="window.location.href='?id={{ booking_id }}&name={{ name }}&email={{ email }}&dept={{ department }}&date=' + this.value">
-            </div>
-            
-            <h2>Available Time Slots</h2>
-            {% if time_slots %}
-            <div class="time-grid">
-                {% for slot in time_slots %}
-                <form method="POST" action="/confirm" style="margin: 0;">
-                    <input type="hidden" name="booking_id" value="{{ booking_id }}">
-                    <input type="hidden" name="name" value="{{ name }}">
-                    <input type="hidden" name="email" value="{{ email }}">
-                    <input type="hidden" name="department" value="{{ department }}">
-                    <input type="hidden" name="start_time" value="{{ slot.start }}">
-                    <input type="hidden" name="end_time" value="{{ slot.end }}">
-                    <input type="hidden" name="selected_date" value="{{ selected_date }}">
-                    <input type="hidden" name="location" value="{{ location }}">
-                    <button type="submit" class="time-slot">{{ slot.display }}</button>
-                </form>
-                {% endfor %}
-            </div>
-            {% else %}
-            <div class="no-slots">
-                <strong>No available time slots for this date.</strong><br>
-                The director is not available on this date. Please select a different date.
-            </div>
-            {% endif %}
-        </div>
-    </body>
-    </html>
-    '''
-    
-    from jinja2 import Template
-    template = Template(html)
-    return template.render(
-        booking_id=booking_id,
-        name=name,
-        email=email,
-        department=department,
-        location=location,
-        selected_date=selected_date,
-        tomorrow=tomorrow,
-        time_slots=time_slots
-    )
+        )
+
+@app.route('/api/availability')
+def availability_api():
+    """Open slots for a department over a date window, as JSON with an ETag."""
+    department = request.args.get('dept', 'Tech')
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    try:
+        start = datetime.strptime(request.args.get('start', tomorrow), '%Y-%m-%d').date()
+        days = int(request.args.get('days', AVAILABILITY_WINDOW_DAYS))
+    except ValueError:
+        return jsonify(error='start must be YYYY-MM-DD and days an integer'), 400
+    days = min(max(days, 1), AVAILABILITY_MAX_DAYS)
+    
+    calendar_id = DEPARTMENT_CALENDARS.get(department, DEFAULT_CALENDAR)
+    with telemetry.span('page_fetch', department=department):
+        availability_blocks, location, _ = fetch_department_data(department, calendar_id, start, start + timedelta(days=days))
+    availability_blocks = availability_blocks or []
+    
+    dates = {}
+    with telemetry.span('slots', department=department, days=days) as span:
+        taken = get_ledger().taken_between(calendar_id, start, start + timedelta(days=days))
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            dates[day.isoformat()] = get_open_slots(
+                availability_blocks, day, calendar_id, taken=taken.get(day.isoformat(), set()))
+        span.set('slots', sum(len(slots) for slots in dates.values()))
+    
+    response = jsonify(department=department, location=location, start=start.isoformat(), days=days, dates=dates)
+    # Clients revalidate with If-None-Match and get a bodyless 304 while nothing changed
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 @app.route('/confirm', methods=['POST'])
 def confirm_booking():
@@ -601,133 +1814,86 @@ def confirm_booking():
     start_dt = datetime.fromisoformat(start_time)
     end_dt = datetime.fromisoformat(end_time)
     
-    confirmation_html = f'''
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Confirm Your Interview Time</title>
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                max-width: 600px;
-                margin: 50px auto;
-                padding: 20px;
-                background-color: #f5f5f5;
-            }}
-            .container {{
-                background: white;
-                padding: 30px;
-                border-radius: 10px;
-                box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-            }}
-            h1 {{
-                color: #0066cc;
-                margin-bottom: 20px;
-            }}
-            .confirmation-box {{
-                background-color: #fff9e6;
-                border: 2px solid #ffcc00;
-                padding: 20px;
-                border-radius: 8px;
-                margin: 20px 0;
-            }}
-            .detail-row {{
-                margin: 10px 0;
-                font-size: 16px;
-            }}
-            .detail-row strong {{
-                display: inline-block;
-                width: 120px;
-            }}
-            .button-container {{
-                display: flex;
-                gap: 15px;
-                margin-top: 30px;
-                justify-content: center;
-            }}
-            .btn {{
-                padding: 15px 30px;
-                font-size: 16px;
-                font-weight: bold;
-                border: none;
-                border-radius: 5px;
-                cursor: pointer;
-                text-decoration: none;
-                display: inline-block;
-                transition: background-color 0.3s;
-            }}
-            .btn-confirm {{
-                background-color: #28a745;
-                color: white;
-            }}
-            .btn-confirm:hover {{
-                background-color: #218838;
-            }}
-            .btn-cancel {{
-                background-color: #dc3545;
-                color: white;
-            }}
-            .btn-cancel:hover {{
-                background-color: #c82333;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>⚠️ Confirm Your Interview Time</h1>
-            
-            <p style="font-size: 18px; margin-bottom: 20px;">
-                Are you sure you want to book this interview time?
-            </p>
-            
-            <div class="confirmation-box">
-                <div class="detail-row">
-                    <strong>Name:</strong> {name}
-                </div>
-                <div class="detail-row">
-                    <strong>Email:</strong> {email}
-                </div>
-                <div class="detail-row">
-                    <strong>Department:</strong> {department}
-                </div>
-                <div class="detail-row">
-                    <strong>Date:</strong> {start_dt.strftime('%B %d, %Y')}
-                </div>
-                <div class="detail-row">
-                    <strong>Time:</strong> {start_dt.strftime('%I:%M %p')} - {end_dt.strftime('%I:%M %p')} CST
-                </div>
-                <div class="detail-row">
-                    <strong>Location:</strong> {location}
-                </div>
-            </div>
-            
-            <div class="button-container">
-                <form method="POST" action="/book" style="margin: 0;">
-                    <input type="hidden" name="booking_id" value="{booking_id}">
-                    <input type="hidden" name="name" value="{name}">
-                    <input type="hidden" name="email" value="{email}">
-                    <input type="hidden" name="department" value="{department}">
-                    <input type="hidden" name="start_time" value="{start_time}">
-                    <input type="hidden" name="end_time" value="{end_time}">
-                    <input type="hidden" name="location" value="{location}">
-                    <button type="submit" class="btn btn-confirm">
-                        ✓ Yes, Book This Time
-                    </button>
-                </form>
-                
-                <a href="/?id={booking_id}&name={quote(name)}&email={quote(email)}&dept={quote(department)}&date={selected_date}" 
-                   class="btn btn-cancel">
-                    ✗ No, Choose Different Time
-                </a>
-            </div>
-        </div>
-    </body>
-    </html>
-    '''
-    
-    return confirmation_html
+    return CONFIRM_TEMPLATE.render(
+        booking_id=booking_id,
+        name=name,
+        email=email,
+        department=department,
+        start_time=start_time,
+        end_time=end_time,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        selected_date=selected_date,
+        location=location,
+    )
+
+def render_booked_page(email, department, start_time, location, email_queued):
+    """Confirmation page shown once an interview is on the calendar."""
+    return BOOKED_TEMPLATE.render(
+        email=email,
+        department=department,
+        start_dt=datetime.fromisoformat(start_time),
+        location=location,
+        email_queued=email_queued,
+    )
+
+def interview_event_id(booking_id):
+    """Calendar event id for a booking, the same on every attempt so a repeated insert can't add a second event."""
+    # Hex digits are valid base32hex, the alphabet Calendar accepts for ids chosen by the client
+    return hashlib.sha1(booking_id.encode('utf-8')).hexdigest()
+
+def find_interview_event(calendar_id, event_id):
+    """The event an earlier attempt of a booking created, or None (never created, or since cancelled)."""
+    service = get_calendar_service()
+    try:
+        with telemetry.span('calendar.events.get'):
+            event = _calendar_quota.call(service.events().get(calendarId=calendar_id, eventId=event_id).execute)
+    except Exception as e:
+        if http_status(e) in (404, 410):
+            return None
+        raise
+    return event if event.get('status') != 'cancelled' else None
+
+def build_interview_event(name, email, department, start_time, end_time, location, event_id=None):
+    """Calendar event body for a booked interview."""
+    event = {
+        'summary': f'SBI {department} Interview - {name}',
+        'description': f'Department: {department}\nCandidate: {name}\nEmail: {email}\n\nWe will message you through text beforehand about the exact location, or if the location changes.',
+        'location': location,
+        'start': {
+            'dateTime': start_time,
+            'timeZone': 'America/Chicago',
+        },
+        'end': {
+            'dateTime': end_time,
+            'timeZone': 'America/Chicago',
+        },
+    }
+    if event_id is not None:
+        event['id'] = event_id
+    return event
+
+def parse_booking_request(booking_id, start_time, end_time):
+    """Check a posted booking before any of it reaches the ledger; returns the slot's (start, end) datetimes.
+
+    The booking id must be a UUID (as the email job issues) and the times one
+    of generate_time_slots' slots, exactly as the booking page posts them.
+    Raises ValueError otherwise.
+    """
+    if str(uuid.UUID(booking_id)) != booking_id:
+        raise ValueError(f"booking id {booking_id!r} is not a UUID")
+    start = datetime.fromisoformat(start_time)
+    if not any(slot['start'] == start_time and slot['end'] == end_time
+               for slot in generate_time_slots(start.date().isoformat())):
+        raise ValueError(f"{start_time} to {end_time} is not a bookable slot")
+    return start, datetime.fromisoformat(end_time)
+
+def render_slot_taken_page(booking_id, name, email, department, start_time):
+    return (
+        '<h1>That time was just booked</h1>'
+        f'<p>Please <a href="/?id={quote(booking_id)}&name={quote(name)}&email={quote(email)}&dept={quote(department)}'
+        f'&date={quote(start_time[:10])}">choose a different time</a>.</p>'
+    ), 409
 
 @app.route('/book', methods=['POST'])
 def create_booking():
@@ -742,94 +1908,91 @@ def create_booking():
     if not location:
         location = get_department_location(department)
     
-    calendar_id = DEPARTMENT_CALENDARS.get(department, 'eseoheaigberadion@gmail.com')
+    calendar_id = DEPARTMENT_CALENDARS.get(department, DEFAULT_CALENDAR)
     
+    # Links without an id still get a stable key, so a double submit stays idempotent
+    booking_id = request.form.get('booking_id') or str(
+        uuid.uuid5(uuid.NAMESPACE_URL, f"{email}|{calendar_id}|{start_time}"))
     try:
-        # Create calendar event on YOUR calendar
-        service = get_calendar_service()
-        
-        event = {
-            'summary': f'SBI {department} Interview - {name}',
-            'description': f'Department: {department}\nCandidate: {name}\nEmail: {email}\n\nWe will message you through text beforehand about the exact location, or if the location changes.',
+        start, end = parse_booking_request(booking_id, start_time, end_time)
+    except (TypeError, ValueError) as e:
+        print(f"Rejected booking request: {e}")
+        return '<h1>Invalid booking request</h1><p>Please choose a time from the booking page.</p>', 400
+    
+    try:
+        ledger = get_ledger()
+        outcome, record = ledger.reserve({
+            'booking_id': booking_id,
+            'calendar_id': calendar_id,
+            'start_time': start_time,
+            'end_time': end_time,
+            'name': name,
+            'email': email,
+            'department': department,
             'location': location,
-            'start': {
-                'dateTime': start_time,
-                'timeZone': 'America/Chicago',
-            },
-            'end': {
-                'dateTime': end_time,
-                'timeZone': 'America/Chicago',
-            },
-        }
+        })
         
-        created_event = service.events().insert(
-            calendarId=calendar_id,
-            body=event
-        ).execute()
+        if outcome == ledger.EXISTING:
+            # Refresh or double submit: show the booking already made under this id
+            print(f"Booking {booking_id} already exists ({record['status']}), not creating another event")
+            if record['status'] != 'confirmed':
+                return '<h1>Your booking is being confirmed</h1><p>Please refresh this page in a moment.</p>', 202
+            return render_booked_page(record['email'], record['department'], record['start_time'],
+                                      record['location'], email_queued=False)
         
-        # Create .ics file and send email to candidate
-        ics_content = create_ics_file(name, email, department, start_time, end_time, location)
-        email_sent = send_calendar_invite_email(name, email, department, start_time, end_time, ics_content, location)
+        if outcome == ledger.TAKEN:
+            print(f"Slot {start_time} on {calendar_id} is held by booking {record['booking_id'] if record else '?'}")
+            return render_slot_taken_page(booking_id, name, email, department, start_time)
         
-        start_dt = datetime.fromisoformat(start_time)
+        event_id = interview_event_id(booking_id)
         
-        confirmation_html = f'''
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Interview Booked!</title>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    max-width: 600px;
-                    margin: 50px auto;
-                    padding: 20px;
-                    background-color: #f5f5f5;
-                }}
-                .container {{
-                    background: white;
-                    padding: 30px;
-                    border-radius: 10px;
-                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                    text-align: center;
-                }}
-                h1 {{
-                    color: #0066cc;
-                }}
-                .success {{
-                    background-color: #d4edda;
-                    border: 1px solid #c3e6cb;
-                    color: #155724;
-                    padding: 15px;
-                    border-radius: 5px;
-                    margin: 20px 0;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>✅ Interview Booked!</h1>
-                <div class="success">
-                    <strong>Your interview has been scheduled!</strong><br><br>
-                    <strong>Date & Time:</strong> {start_dt.strftime('%B %d, %Y at %I:%M %p')} CST<br>
-                    <strong>Department:</strong> {department}<br>
-                    <strong>Location:</strong> {location}<br><br>
-                    {'✉️ A calendar invite has been sent to your email!' if email_sent else 'Check your email for confirmation.'}
-                </div>
-                <p>Check your inbox at <strong>{email}</strong> for the calendar invitation.<br>
-                Simply click on the attachment to add it to your calendar!</p>
-                <p style="font-size: 14px; color: #666; margin-top: 20px;">
-                We will message you through text beforehand about the exact location, or if the location changes.
-                </p>
-                <p>We look forward to meeting you!</p>
-            </div>
-        </body>
-        </html>
-        '''
+        # Re-check the calendar (a fresh query) for events made outside this service before booking
+        if not _busy_cache.is_free(calendar_id, start, end):
+            # The event in the way may be this booking's own, from an attempt that died before confirming
+            created_event = find_interview_event(calendar_id, event_id)
+            if created_event is None:
+                print(f"Slot {start_time} on {calendar_id} is already booked")
+                ledger.release(booking_id)
+                return render_slot_taken_page(booking_id, name, email, department, start_time)
+            print(f"Booking {booking_id} already has event {event_id}, confirming it")
+        else:
+            # Create calendar event on YOUR calendar
+            service = get_calendar_service()
+            event = build_interview_event(name, email, department, start_time, end_time, location, event_id=event_id)
+            
+            try:
+                with telemetry.span('calendar.events.insert', department=department):
+                    # Safe to retry: with the fixed event id a repeat that follows a lost response gets a 409
+                    created_event = _calendar_quota.call(service.events().insert(
+                        calendarId=calendar_id,
+                        body=event
+                    ).execute)
+            except Exception as e:
+                created_event = find_interview_event(calendar_id, event_id) if http_status(e) == 409 else None
+                if created_event is None:
+                    # Free the slot again so the candidate can retry
+                    ledger.release(booking_id)
+                    raise
+        # Slot pages must not offer this time again
+        _busy_cache.invalidate()
+        ledger.confirm(booking_id, created_event.get('id'))
         
-        return confirmation_html
+        # The .ics email goes out in the background so the candidate isn't kept waiting on SMTP
+        try:
+            get_job_queue().enqueue('invite_email', {
+                'name': name,
+                'email': email,
+                'department': department,
+                'start_time': start_time,
+                'end_time': end_time,
+                'location': location,
+            })
+            email_queued = True
+        except Exception as e:
+            print(f"Could not queue calendar invite for {email}: {e}")
+            email_queued = False
+        
+        return render_booked_page(email, department, start_time, location, email_queued)
         
     except Exception as e:
         print(f"ERROR creating calendar event: {str(e)}")
@@ -837,6 +2000,64 @@ def create_booking():
         traceback.print_exc()
         return f'<h1>Error booking interview</h1><p>{str(e)}</p>', 500
 
+@app.route('/readyz')
+def readiness():
+    """Ready once the sheet snapshot is loaded and the job queue is running; also reports cache warmth."""
+    sheet_cache = _tab_cache.stats()
+    checks = {
+        'sheet_cache': sheet_cache['warm'],
+        'job_queue': _job_queue is not None,
+    }
+    ready = all(checks.values())
+    response = jsonify(
+        ready=ready,
+        checks=checks,
+        pid=os.getpid(),
+        secrets=_secret_cache.stats(),
+        sheet_cache=sheet_cache,
+        freebusy=_busy_cache.stats(),
+        calendar=_calendar.stats(),
+    )
+    response.status_code = 200 if ready else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/admin/refresh-cache', methods=['POST'])
+def refresh_cache():
+    """Force a synchronous refresh of the availability/locations snapshot."""
+    token = request.headers.get('X-Admin-Token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return 'Forbidden', 403
+    refreshed = _tab_cache.refresh()
+    return jsonify(refreshed=refreshed, cache=_tab_cache.stats()), (200 if refreshed else 502)
+
+@app.route('/admin/stats')
+def admin_stats():
+    """Counters for the process-wide clients and caches."""
+    token = request.headers.get('X-Admin-Token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return 'Forbidden', 403
+    return jsonify(
+        secrets=_secret_cache.stats(),
+        sheets=_sheets.stats(),
+        sheet_cache=_tab_cache.stats(),
+        freebusy=_busy_cache.stats(),
+        calendar=_calendar.stats(),
+        smtp=_mailer.stats() if _mailer is not None else None,
+        jobs=_job_queue.stats() if _job_queue is not None else None,
+        page_fetches=_flights.stats(),
+        ledger=_ledger.stats() if _ledger is not None else None,
+        quotas=quota_stats(),
+        telemetry=telemetry.histograms(),
+    )
+
 if __name__ == '__main__':
+    # Development server; production runs under gunicorn with gunicorn.conf.py
+    warm_up()
+    # Resume any side effects journaled before the last restart
+    get_job_queue()
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
\ No newline at end of file
+    try:
+        app.run(host='0.0.0.0', port=port)
+    finally:
+        drain()
\ No newline at end of file
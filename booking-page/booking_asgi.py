@@ -0,0 +1,685 @@
+"""ASGI variant of the booking service: uvicorn booking_asgi:app
+
+Serves the same pages and booking flow as booking.py on one asyncio event
+loop. Sheets and Calendar are called through their REST APIs with aiohttp
+and invite emails go out through aiosmtplib, so a request waiting on Google
+or Gmail holds no thread and one process can keep hundreds of candidates in
+flight during an invite wave. Parsing, templates, the booking ledger and the
+job journal are shared with booking.py.
+"""
+
+from quart import Quart, request, jsonify, abort, Response, g
+from google.oauth2 import service_account
+from google.auth.transport.requests import Request as GoogleAuthRequest
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import asyncio
+import json
+import os
+import ssl
+import time
+import uuid
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+import aiohttp
+import aiosmtplib
+import gspread
+
+from booking import (
+    DEPARTMENT_CALENDARS, DEFAULT_CALENDAR, SCOPES, AVAILABILITY_TAB, LOCATIONS_TAB,
+    SHEET_CACHE_TTL, SHEET_CACHE_RETRY_AFTER,
+    AVAILABILITY_WINDOW_DAYS, AVAILABILITY_MAX_DAYS, PREFETCH_SECRETS, PREFETCH_SECRET_IDS,
+    SMTP_POOL_SIZE, JOB_DRAIN_TIMEOUT, STATIC_ASSETS, STATIC_MAX_AGE,
+    COMPRESS_MIN_SIZE, COMPRESS_MIMETYPES, BOOKING_TEMPLATE, CONFIRM_TEMPLATE,
+    FreeBusyCache, JobQueue, SpreadsheetClient, _secret_cache, telemetry, server_timing,
+    _sheets_read_quota, _calendar_quota, _smtp_quota, quota_stats,
+    get_secret, get_email_credentials, get_director_availability, get_department_location,
+    get_open_slots, get_ledger, get_state_store, create_ics_file, build_invite_message, build_interview_event, interview_event_id,
+    parse_booking_request, render_booked_page, render_slot_taken_page, choose_encoding, compress_body,
+)
+from sbi_common.quota import http_status
+from sbi_common.smtp import (
+    SMTP_SERVER, SMTP_PORT, SMTP_STARTTLS, SMTP_MAX_MESSAGES_PER_CONNECTION, SMTP_IDLE_TIMEOUT, SMTP_TIMEOUT,
+)
+
+app = Quart(__name__, static_folder=None)
+
+SHEETS_API = "https://sheets.googleapis.com/v4/spreadsheets"
+CALENDAR_API = "https://www.googleapis.com/calendar/v3"
+
+# Upper bound on one Google API call, including connection setup
+GOOGLE_API_TIMEOUT = int(os.environ.get('GOOGLE_API_TIMEOUT', '20'))
+
+class GoogleAPIError(Exception):
+    def __init__(self, status, body, headers=None):
+        super().__init__(f"{status}: {body[:200]}")
+        self.status = status
+        self.headers = headers or {}
+
+class AsyncGoogleAPI:
+    """Service-account access to a Google REST API over a shared aiohttp session.
+
+    The access token is refreshed in a worker thread, under an asyncio lock,
+    before it expires. A 401 drops the cached key and retries once with one
+    built from a freshly fetched secret.
+    """
+
+    def __init__(self, secret_id, scopes):
+        self.secret_id = secret_id
+        self.scopes = scopes
+        self.calls = 0
+        self.token_refreshes = 0
+        self._credentials = None
+        self._session = None
+        self._lock = asyncio.Lock()
+
+    async def _token(self):
+        async with self._lock:
+            if self._credentials is None:
+                info = json.loads(await asyncio.to_thread(get_secret, self.secret_id))
+                self._credentials = service_account.Credentials.from_service_account_info(info, scopes=self.scopes)
+            if not self._credentials.valid:
+                with telemetry.span('google.token_refresh', secret_id=self.secret_id):
+                    await asyncio.to_thread(self._credentials.refresh, GoogleAuthRequest())
+                self.token_refreshes += 1
+            return self._credentials.token
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=GOOGLE_API_TIMEOUT))
+        return self._session
+
+    async def request(self, method, url, retry_auth=True, **kwargs):
+        """Send a request and return the decoded JSON body."""
+        headers = {'Authorization': f"Bearer {await self._token()}"}
+        self.calls += 1
+        async with self._get_session().request(method, url, headers=headers, **kwargs) as response:
+            if response.status == 401 and retry_auth:
+                print(f"Credentials for {self.secret_id} rejected, re-authenticating")
+                _secret_cache.invalidate(self.secret_id)
+                self._credentials = None
+                return await self.request(method, url, retry_auth=False, **kwargs)
+            if response.status >= 400:
+                raise GoogleAPIError(response.status, await response.text(), response.headers)
+            return await response.json()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    def stats(self):
+        return {'calls': self.calls, 'token_refreshes': self.token_refreshes}
+
+_sheets_api = AsyncGoogleAPI("SERVICE_ACCOUNT_FILE", gspread.auth.DEFAULT_SCOPES)
+_calendar_api = AsyncGoogleAPI("CALENDAR_SERVICE_ACCOUNT_FILE", SCOPES)
+
+class AsyncSheetSnapshot:
+    """Async counterpart of booking.SheetSnapshotCache.
+
+    The spreadsheet is found by name once (through gspread, in a thread);
+    after that every refresh is a single values:batchGet. Concurrent callers
+    share one in-flight refresh, and a stale snapshot is served while the
+    next one loads in the background.
+    """
+
+    def __init__(self, titles, ttl=SHEET_CACHE_TTL):
+        self.titles = titles
+        self.ttl = ttl
+        self.refreshes = 0
+        self.failures = 0
+        self._spreadsheet_id = None
+        self._snapshot = None
+        self._fetched_at = 0.0
+        self._next_refresh = 0.0
+        self._refresh_task = None
+
+    async def _fetch(self):
+        if self._spreadsheet_id is None:
+            self._spreadsheet_id = await asyncio.to_thread(lambda: SpreadsheetClient().spreadsheet().id)
+        ranges = [("ranges", "'" + title.replace("'", "''") + "'") for title in self.titles]
+        with telemetry.span('sheets.values_batch_get', tabs=len(ranges)) as span:
+            response = await _sheets_read_quota.call_async(
+                _sheets_api.request, 'GET', f"{SHEETS_API}/{self._spreadsheet_id}/values:batchGet", params=ranges)
+            value_ranges = response.get('valueRanges', [])
+            tabs = {
+                title: value_range.get('values', [])
+                for title, value_range in zip(self.titles, value_ranges)
+            }
+            span.set('rows', sum(len(rows) for rows in tabs.values()))
+        return tabs
+
+    async def _refresh(self):
+        try:
+            snapshot = await self._fetch()
+        except Exception as e:
+            self.failures += 1
+            self._next_refresh = time.monotonic() + min(self.ttl, SHEET_CACHE_RETRY_AFTER)
+            print(f"Failed to refresh sheet cache, serving last good snapshot: {e}")
+            return False
+        self._snapshot = snapshot
+        self._fetched_at = time.monotonic()
+        self._next_refresh = self._fetched_at + self.ttl
+        self.refreshes += 1
+        return True
+
+    def refresh(self):
+        """Start a refresh unless one is already running; returns the task to await."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh())
+        return self._refresh_task
+
+    async def get(self):
+        if self._snapshot is None:
+            await self.refresh()
+            return self._snapshot or {title: [] for title in self.titles}
+        if time.monotonic() >= self._next_refresh:
+            self.refresh()
+        return self._snapshot
+
+    def stats(self):
+        age = time.monotonic() - self._fetched_at if self._snapshot is not None else None
+        return {
+            'warm': self._snapshot is not None,
+            'age_seconds': round(age, 1) if age is not None else None,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+        }
+
+class AsyncFreeBusyCache(FreeBusyCache):
+    """Async counterpart of booking.FreeBusyCache: the same windows and bookkeeping, queried over aiohttp.
+
+    Concurrent misses on a window await one freeBusy call, and nothing
+    waits on the event loop while it is in flight.
+    """
+
+    async def _fetch(self, start_day, end_day, calendar_ids=None):
+        calendar_ids = calendar_ids or self.calendar_ids
+        with telemetry.span('calendar.freebusy.query', calendars=len(calendar_ids),
+                            days=(end_day - start_day).days):
+            response = await _calendar_quota.call_async(
+                _calendar_api.request, 'POST', f"{CALENDAR_API}/freeBusy",
+                json=self.query_body(calendar_ids, start_day, end_day))
+        return self.parse_response(response)
+
+    async def busy_intervals(self, calendar_id, start_day, end_day):
+        while True:
+            with self._lock:
+                busy, joined = self._join(start_day, end_day, asyncio.get_running_loop().create_future)
+            if busy is not None:
+                return busy.get(calendar_id, [])
+            window, flight, generation = joined
+            if window is None:
+                try:
+                    return (await asyncio.shield(flight)).get(calendar_id, [])
+                except asyncio.CancelledError:
+                    if not flight.cancelled():
+                        raise
+                    # The page load making the query went away: make it again
+                    continue
+            busy, error = {}, None
+            try:
+                busy = await self._fetch(*window)
+            except Exception as e:
+                error = e
+            except BaseException:
+                # Cancelled mid-query (e.g. the client disconnected): there is no answer to cache or share
+                with self._lock:
+                    self._abandon(window)
+                flight.cancel()
+                raise
+            with self._lock:
+                busy = self._land(window, generation, busy, error, start_day, end_day)
+            flight.set_result(busy)
+            return busy.get(calendar_id, [])
+
+    async def is_free(self, calendar_id, start, end):
+        day = start.date()
+        try:
+            busy = (await self._fetch(day, day + timedelta(days=1), [calendar_id])).get(calendar_id, [])
+        except Exception as e:
+            print(f"Free/busy re-check failed, using cached busy times: {e}")
+            busy = await self.busy_intervals(calendar_id, day, day + timedelta(days=1))
+        return self.is_free_in(busy, start, end)
+
+_tab_cache = AsyncSheetSnapshot((AVAILABILITY_TAB, LOCATIONS_TAB))
+_busy_cache = AsyncFreeBusyCache(set(DEPARTMENT_CALENDARS.values()) | {DEFAULT_CALENDAR})
+
+class AsyncSMTPTransport:
+    """aiosmtplib counterpart of sbi_common.smtp.SMTPTransport, with the same reconnect rules."""
+
+    def __init__(self, host=SMTP_SERVER, port=SMTP_PORT, max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION,
+                 idle_timeout=SMTP_IDLE_TIMEOUT, timeout=SMTP_TIMEOUT, starttls=SMTP_STARTTLS):
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self._client = None
+        self._sent_on_connection = 0
+        self._last_used = 0.0
+
+    async def _connect(self):
+        await self._disconnect()
+        sender_email, sender_password = await asyncio.to_thread(get_email_credentials)
+        client = aiosmtplib.SMTP(hostname=self.host, port=self.port, start_tls=self.starttls,
+                                 tls_context=ssl.create_default_context(), timeout=self.timeout)
+        with telemetry.span('smtp.connect', host=self.host):
+            await client.connect()
+            try:
+                await client.login(sender_email, sender_password)
+            except Exception:
+                client.close()
+                raise
+        self._client = client
+        self._sent_on_connection = 0
+        self.connections_opened += 1
+
+    async def _disconnect(self):
+        if self._client is None:
+            return
+        try:
+            await self._client.quit()
+        except Exception:
+            self._client.close()
+        self._client = None
+
+    def _is_stale(self):
+        return (
+            self._client is None
+            or not self._client.is_connected
+            or self._sent_on_connection >= self.max_messages
+            or time.monotonic() - self._last_used > self.idle_timeout
+        )
+
+    async def send(self, sender, recipient, message):
+        with telemetry.span('smtp.send') as span:
+            if self._is_stale():
+                await self._connect()
+            try:
+                await self._client.send_message(message, sender=sender, recipients=[recipient])
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionError) as e:
+                print(f"SMTP connection lost ({e}), reconnecting")
+                span.set('reconnected', True)
+                await self._connect()
+                await self._client.send_message(message, sender=sender, recipients=[recipient])
+            except aiosmtplib.SMTPResponseException as e:
+                # 421 means the server is closing the session, so retry on a fresh one
+                if e.code != 421:
+                    raise
+                print(f"SMTP server closed the session ({e.code}), reconnecting")
+                span.set('reconnected', True)
+                await self._connect()
+                await self._client.send_message(message, sender=sender, recipients=[recipient])
+        self._sent_on_connection += 1
+        self.messages_sent += 1
+        self._last_used = time.monotonic()
+
+    async def close(self):
+        await self._disconnect()
+
+class AsyncSMTPPool:
+    """Fixed set of AsyncSMTPTransport sessions handed out one send at a time."""
+
+    def __init__(self, size=SMTP_POOL_SIZE, transport_factory=AsyncSMTPTransport):
+        self._transports = [transport_factory() for _ in range(max(1, size))]
+        self._idle = None
+
+    async def send(self, sender, recipient, message):
+        if self._idle is None:
+            self._idle = asyncio.LifoQueue()
+            for transport in reversed(self._transports):
+                self._idle.put_nowait(transport)
+        transport = await self._idle.get()
+        try:
+            await transport.send(sender, recipient, message)
+        finally:
+            self._idle.put_nowait(transport)
+
+    async def close(self):
+        for transport in self._transports:
+            await transport.close()
+
+    def stats(self):
+        return {
+            'connections_opened': sum(t.connections_opened for t in self._transports),
+            'messages_sent': sum(t.messages_sent for t in self._transports),
+        }
+
+_mailer = AsyncSMTPPool()
+
+async def send_calendar_invite_email(name, email, department, start_time, end_time, location):
+    """Build the .ics invite and send it over the async SMTP pool."""
+    sender_email = await asyncio.to_thread(get_secret, "EMAIL_USER")
+    ics_content = create_ics_file(name, email, department, start_time, end_time, location)
+    message = build_invite_message(sender_email, name, email, department, start_time, location, ics_content)
+    await _smtp_quota.call_async(_mailer.send, sender_email, email, message)
+    print(f"Calendar invite email sent to {email}")
+
+_loop = None
+
+def run_invite_email_job(payload):
+    """Job-queue handler: runs on a journal worker thread and sends on the event loop."""
+    future = asyncio.run_coroutine_threadsafe(send_calendar_invite_email(
+        payload['name'], payload['email'], payload['department'],
+        payload['start_time'], payload['end_time'], payload['location']), _loop)
+    try:
+        future.result(timeout=SMTP_TIMEOUT * 3)
+    except FuturesTimeoutError:
+        # The queue will retry the job, so this attempt must not go on to send the invite as well
+        future.cancel()
+        raise
+
+# Same store-backed queue (and retry/backoff) as booking.py, started with the app; only the send itself is async
+_job_queue = None
+
+async def fetch_page_data(department, calendar_id, start_day, end_day):
+    """Sheet snapshot and free/busy for a department, fetched concurrently.
+
+    Availability and location both come from the one snapshot (a single
+    batchGet), which is awaited alongside the calendar's freeBusy query.
+    """
+    tabs, _ = await asyncio.gather(
+        _tab_cache.get(),
+        _busy_cache.busy_intervals(calendar_id, start_day, end_day),
+    )
+    availability_blocks = get_director_availability(department, tabs)
+    location = get_department_location(department, tabs)
+    return availability_blocks, location
+
+async def open_slots(availability_blocks, day, calendar_id, taken=None):
+    busy = await _busy_cache.busy_intervals(calendar_id, day, day + timedelta(days=1))
+    # Without `taken`, get_open_slots reads the ledger from the state store, so keep it off the loop
+    return await asyncio.to_thread(get_open_slots, availability_blocks, day, calendar_id, busy=busy, taken=taken)
+
+async def find_interview_event(calendar_id, event_id):
+    """Async counterpart of booking.find_interview_event."""
+    try:
+        with telemetry.span('calendar.events.get'):
+            event = await _calendar_quota.call_async(
+                _calendar_api.request, 'GET',
+                f"{CALENDAR_API}/calendars/{quote(calendar_id, safe='')}/events/{event_id}")
+    except Exception as e:
+        if http_status(e) in (404, 410):
+            return None
+        raise
+    return event if event.get('status') != 'cancelled' else None
+
+@app.before_serving
+async def start_background():
+    global _loop, _job_queue
+    _loop = asyncio.get_running_loop()
+    if PREFETCH_SECRETS:
+        results = await asyncio.gather(
+            *(asyncio.to_thread(get_secret, secret_id) for secret_id in PREFETCH_SECRET_IDS),
+            return_exceptions=True)
+        for secret_id, result in zip(PREFETCH_SECRET_IDS, results):
+            if isinstance(result, Exception):
+                print(f"Warning: Could not prefetch secret '{secret_id}': {result}")
+    tomorrow = (datetime.now() + timedelta(days=1)).date()
+    await asyncio.gather(
+        _tab_cache.get(),
+        _busy_cache.busy_intervals(DEFAULT_CALENDAR, tomorrow, tomorrow + timedelta(days=1)),
+    )
+    # Resume any side effects journaled before the last restart
+    _job_queue = await asyncio.to_thread(
+        lambda: JobQueue(get_state_store(), {'invite_email': run_invite_email_job}).start())
+
+@app.after_serving
+async def stop_background():
+    # drain() blocks until queued emails are sent, and those sends need this loop
+    if _job_queue is not None:
+        await asyncio.to_thread(_job_queue.drain, JOB_DRAIN_TIMEOUT)
+    await _mailer.close()
+    await _sheets_api.close()
+    await _calendar_api.close()
+
+@app.before_request
+async def start_request_timing():
+    g.request_started = time.perf_counter()
+    g.request_spans = telemetry.collect()
+
+@app.after_request
+async def add_server_timing(response):
+    if 'request_started' in g:
+        total_ms = (time.perf_counter() - g.request_started) * 1000
+        response.headers['Server-Timing'] = server_timing(g.request_spans, total_ms)
+    return response
+
+@app.teardown_request
+async def stop_request_timing(exc):
+    telemetry.stop_collecting()
+
+@app.after_request
+async def compress_response(response):
+    """Compress text responses for clients that accept it."""
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    body = await response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+@app.route('/static/<name>')
+async def static_asset(name):
+    asset = STATIC_ASSETS.get(name)
+    if asset is None:
+        abort(404)
+    encoding = choose_encoding(request.accept_encodings)
+    response = Response(asset.bodies[encoding], mimetype=asset.mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(asset.digest)
+    response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+    return response
+
+@app.route('/')
+async def booking_page():
+    booking_id = request.args.get('id', '')
+    name = request.args.get('name', '')
+    email = request.args.get('email', '')
+    department = request.args.get('dept', 'Tech')
+
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    selected_date = request.args.get('date', tomorrow)
+    day = datetime.strptime(selected_date, '%Y-%m-%d').date()
+    calendar_id = DEPARTMENT_CALENDARS.get(department, DEFAULT_CALENDAR)
+
+    with telemetry.span('page_fetch', department=department):
+        availability_blocks, location = await fetch_page_data(department, calendar_id, day, day + timedelta(days=1))
+    with telemetry.span('slots', department=department) as span:
+        time_slots = await open_slots(availability_blocks, day, calendar_id)
+        span.set('slots', len(time_slots))
+
+    return BOOKING_TEMPLATE.render(
+        booking_id=booking_id,
+        name=name,
+        email=email,
+        department=department,
+        location=location,
+        selected_date=selected_date,
+        tomorrow=tomorrow,
+        time_slots=time_slots,
+        page_context={
+            'booking_id': booking_id,
+            'name': name,
+            'email': email,
+            'department': department,
+            'location': location,
+            'selected_date': selected_date,
+            'window_days': AVAILABILITY_WINDOW_DAYS,
+        }
+    )
+
+@app.route('/api/availability')
+async def availability_api():
+    """Open slots for a department over a date window, as JSON with an ETag."""
+    department = request.args.get('dept', 'Tech')
+    tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    try:
+        start = datetime.strptime(request.args.get('start', tomorrow), '%Y-%m-%d').date()
+        days = int(request.args.get('days', AVAILABILITY_WINDOW_DAYS))
+    except ValueError:
+        return jsonify(error='start must be YYYY-MM-DD and days an integer'), 400
+    days = min(max(days, 1), AVAILABILITY_MAX_DAYS)
+
+    calendar_id = DEPARTMENT_CALENDARS.get(department, DEFAULT_CALENDAR)
+    availability_blocks, location = await fetch_page_data(department, calendar_id, start, start + timedelta(days=days))
+    window = [start + timedelta(days=offset) for offset in range(days)]
+    ledger = await asyncio.to_thread(get_ledger)
+    taken = await asyncio.to_thread(ledger.taken_between, calendar_id, start, start + timedelta(days=days))
+    slots = await asyncio.gather(*(
+        open_slots(availability_blocks, day, calendar_id, taken=taken.get(day.isoformat(), set())) for day in window
+    ))
+    dates = {day.isoformat(): day_slots for day, day_slots in zip(window, slots)}
+
+    response = jsonify(department=department, location=location, start=start.isoformat(), days=days, dates=dates)
+    await response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return await response.make_conditional(request)
+
+@app.route('/confirm', methods=['POST'])
+async def confirm_booking():
+    """Show confirmation page before booking."""
+    form = await request.form
+    department = form.get('department')
+    location = form.get('location')
+    if not location:
+        location = get_department_location(department, await _tab_cache.get())
+    return CONFIRM_TEMPLATE.render(
+        booking_id=form.get('booking_id'),
+        name=form.get('name'),
+        email=form.get('email'),
+        department=department,
+        start_time=form.get('start_time'),
+        end_time=form.get('end_time'),
+        start_dt=datetime.fromisoformat(form.get('start_time')),
+        end_dt=datetime.fromisoformat(form.get('end_time')),
+        selected_date=form.get('selected_date'),
+        location=location,
+    )
+
+@app.route('/book', methods=['POST'])
+async def create_booking():
+    form = await request.form
+    name = form.get('name')
+    email = form.get('email')
+    department = form.get('department')
+    start_time = form.get('start_time')
+    end_time = form.get('end_time')
+    location = form.get('location')
+
+    calendar_id = DEPARTMENT_CALENDARS.get(department, DEFAULT_CALENDAR)
+    if not location:
+        location = get_department_location(department, await _tab_cache.get())
+
+    # Links without an id still get a stable key, so a double submit stays idempotent
+    booking_id = form.get('booking_id') or str(
+        uuid.uuid5(uuid.NAMESPACE_URL, f"{email}|{calendar_id}|{start_time}"))
+    try:
+        start, end = parse_booking_request(booking_id, start_time, end_time)
+    except (TypeError, ValueError) as e:
+        print(f"Rejected booking request: {e}")
+        return '<h1>Invalid booking request</h1><p>Please choose a time from the booking page.</p>', 400
+
+    try:
+        ledger = await asyncio.to_thread(get_ledger)
+        outcome, record = await asyncio.to_thread(ledger.reserve, {
+            'booking_id': booking_id,
+            'calendar_id': calendar_id,
+            'start_time': start_time,
+            'end_time': end_time,
+            'name': name,
+            'email': email,
+            'department': department,
+            'location': location,
+        })
+
+        if outcome == ledger.EXISTING:
+            print(f"Booking {booking_id} already exists ({record['status']}), not creating another event")
+            if record['status'] != 'confirmed':
+                return '<h1>Your booking is being confirmed</h1><p>Please refresh this page in a moment.</p>', 202
+            return render_booked_page(record['email'], record['department'], record['start_time'],
+                                      record['location'], email_queued=False)
+
+        if outcome == ledger.TAKEN:
+            print(f"Slot {start_time} on {calendar_id} is held by booking {record['booking_id'] if record else '?'}")
+            return render_slot_taken_page(booking_id, name, email, department, start_time)
+
+        event_id = interview_event_id(booking_id)
+
+        # Re-check the calendar (a fresh query) for events made outside this service before booking
+        if not await _busy_cache.is_free(calendar_id, start, end):
+            # The event in the way may be this booking's own, from an attempt that died before confirming
+            created_event = await find_interview_event(calendar_id, event_id)
+            if created_event is None:
+                print(f"Slot {start_time} on {calendar_id} is already booked")
+                await asyncio.to_thread(ledger.release, booking_id)
+                return render_slot_taken_page(booking_id, name, email, department, start_time)
+            print(f"Booking {booking_id} already has event {event_id}, confirming it")
+        else:
+            try:
+                with telemetry.span('calendar.events.insert', department=department):
+                    # Safe to retry: with the fixed event id a repeat that follows a lost response gets a 409
+                    created_event = await _calendar_quota.call_async(
+                        _calendar_api.request, 'POST', f"{CALENDAR_API}/calendars/{quote(calendar_id, safe='')}/events",
+                        json=build_interview_event(name, email, department, start_time, end_time, location,
+                                                   event_id=event_id))
+            except Exception as e:
+                created_event = await find_interview_event(calendar_id, event_id) if http_status(e) == 409 else None
+                if created_event is None:
+                    await asyncio.to_thread(ledger.release, booking_id)
+                    raise
+        # Slot pages must not offer this time again
+        _busy_cache.invalidate()
+        await asyncio.to_thread(ledger.confirm, booking_id, created_event.get('id'))
+
+        try:
+            await asyncio.to_thread(_job_queue.enqueue, 'invite_email', {
+                'name': name,
+                'email': email,
+                'department': department,
+                'start_time': start_time,
+                'end_time': end_time,
+                'location': location,
+            })
+            email_queued = True
+        except Exception as e:
+            print(f"Could not queue calendar invite for {email}: {e}")
+            email_queued = False
+
+        return render_booked_page(email, department, start_time, location, email_queued)
+
+    except Exception as e:
+        print(f"ERROR creating calendar event: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return f'<h1>Error booking interview</h1><p>{str(e)}</p>', 500
+
+@app.route('/readyz')
+async def readiness():
+    """Ready once the sheet snapshot is loaded; also reports cache and client counters."""
+    sheet_cache = _tab_cache.stats()
+    response = jsonify(
+        ready=sheet_cache['warm'],
+        sheet_cache=sheet_cache,
+        freebusy=_busy_cache.stats(),
+        sheets_api=_sheets_api.stats(),
+        calendar_api=_calendar_api.stats(),
+        smtp=_mailer.stats(),
+        quotas=quota_stats(),
+        telemetry=telemetry.histograms(),
+    )
+    response.status_code = 200 if sheet_cache['warm'] else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,47 @@
+# Production server settings for the booking page: gunicorn -c gunicorn.conf.py booking:app
+#
+# Requests mostly wait on Sheets, Calendar and SMTP, so each worker process
+# runs a pool of threads. The app is preloaded: secrets, the sheet snapshot
+# and free/busy are fetched once in the parent and inherited by every worker.
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+preload_app = True
+
+# Cloud Run enforces its own request timeout; this only catches a stuck worker
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+# Time a stopping worker gets to finish requests and drain the background job queue
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+
+def when_ready(server):
+    import booking
+    try:
+        booking.warm_up()
+    except Exception as e:
+        server.log.warning(f"Cache warm-up failed, workers will load lazily: {e}")
+    booking.release_connections()
+
+
+def post_fork(server, worker):
+    import booking
+    booking.release_connections()
+
+
+def post_worker_init(worker):
+    import booking
+    # Resume side effects journaled before the last restart
+    booking.get_job_queue()
+
+
+def worker_exit(server, worker):
+    import booking
+    booking.drain()
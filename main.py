@@ -1,43 +1,124 @@
-import smtplib
-import ssl
 import os
-import pandas as pd
 import gspread
 import json
-from google.cloud import secretmanager
+import hashlib
+import string
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
+from email.utils import make_msgid
 from datetime import datetime
 import uuid
 from urllib.parse import quote
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 
-import os.path
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+from sbi_common.secret_cache import SecretCache
+from sbi_common.smtp import SMTPPool, SMTPTransport
+from sbi_common.quota import QuotaLimiter
+from sbi_common.store import is_shared, open_store
+from sbi_common.telemetry import Telemetry
 
-
-# If modifying these scopes, delete the file token.json.
-SCOPES = ["https://www.googleapis.com/auth/calendar"]
+# pandas/numpy and the Cloud Storage and Secret Manager clients are imported inside the functions
+# that use them: most runs find nothing new and exit before pandas is needed.
+# Track startup cost with: python benchmarks/import_time_report.py
 
 
 #--- CONFIG ---
 GOOGLE_SHEET_NAME = "SBI General Interest Form (Responses)"
 LOGO_FILE = "EmailSignature.gif"
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
 BOOKING_BASE_URL = "https://sbi-booking-400556956516.us-central1.run.app"
 
+# The job's secrets are fetched once before the first read; PREFETCH_SECRETS=0 fetches them on first use
+PREFETCH_SECRETS = os.environ.get("PREFETCH_SECRETS", "1") == "1"
+PREFETCH_SECRET_IDS = ("EMAIL_USER", "GOOGLE_PASS", "SERVICE_ACCOUNT_FILE")
+
+# Outgoing mail reuses authenticated SMTP sessions instead of one login per email
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", "3"))
+
+# Status columns are written back in batches instead of one update_cell per row
+EMAIL_SENT_COLUMN = "Automated Email Sent"
+INTERVIEW_SENT_COLUMN = "Interview Sent"
+STATUS_FLUSH_EVERY = int(os.environ.get("STATUS_FLUSH_EVERY", "25"))
+STATUS_BATCH_CHUNK_SIZE = 500
+
+# Every send is claimed in the shared state store before it goes out, so neither a run
+# that dies part-way nor overlapping tasks mail a row twice. Deployed, STATE_STORE is
+# gs://<bucket>/<prefix>; a local directory only serves one machine
+STATE_STORE = os.environ.get("STATE_STORE", "/tmp/sbi-email-job")
+SEND_IN_DOUBT_HOURS = float(os.environ.get("SEND_IN_DOUBT_HOURS", "24"))
+SEND_JOURNAL_RETENTION_DAYS = 30
+
+# Cloud Run sets these on each task of a job execution; with several tasks every task
+# handles its own slice of the pending rows (see Shard)
+TASK_INDEX = int(os.environ.get("CLOUD_RUN_TASK_INDEX", "0"))
+TASK_COUNT = int(os.environ.get("CLOUD_RUN_TASK_COUNT", "1"))
+EXECUTION_ID = os.environ.get("CLOUD_RUN_EXECUTION", f"local-{datetime.now():%Y-%m-%d}")
+
+# Emails are sent by a bounded worker pool; the rate keeps bursts under Gmail's sending caps
+DISPATCH_CONCURRENCY = int(os.environ.get("DISPATCH_CONCURRENCY", str(SMTP_POOL_SIZE)))
+DISPATCH_RATE_PER_SECOND = float(os.environ.get("DISPATCH_RATE_PER_SECOND", "5"))
+
+# Sheets calls are paced to the per-user quota (60 reads and 60 writes a minute by default);
+# 429s and 5xx responses are retried with exponential backoff and full jitter
+SHEETS_READS_PER_MINUTE = float(os.environ.get("SHEETS_READS_PER_MINUTE", "60"))
+SHEETS_WRITES_PER_MINUTE = float(os.environ.get("SHEETS_WRITES_PER_MINUTE", "60"))
+API_MAX_ATTEMPTS = int(os.environ.get("API_MAX_ATTEMPTS", "5"))
+API_BACKOFF_BASE = 1.0
+API_BACKOFF_MAX = 32.0
+
+# Incremental ingestion reads only rows after the last processed one; state lives in its own tab
+RESPONSES_WORKSHEET_NAME = "Form Responses 1"
+STATE_WORKSHEET_NAME = "Automation State"
+INCREMENTAL_INGEST = os.environ.get("INCREMENTAL_INGEST", "1") == "1"
+TIMESTAMP_COLUMN = "Timestamp"
+GIVE_INTERVIEW_COLUMN = "Give Interview"
+INGEST_BATCH_GET_CHUNK = 100
+
+# Form questions the send jobs are built from
+NAME_COLUMN = "What is your name?"
+EMAIL_COLUMN = "What is your email?"
+DEPARTMENTS_COLUMN = "Which department(s) do you want to be in? (Pick up to 2)"
+DEFAULT_BOOKING_DEPARTMENT = "Tech"
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+# Every Secret Manager, Sheets and SMTP call is timed into a latency histogram under this service name
+TELEMETRY_SERVICE = "sbi-email-job"
+
+
+
+
+telemetry = Telemetry(TELEMETRY_SERVICE)
+
+
+
+
+# Every Sheets read, Sheets write and SMTP send goes through one of these
+def _quota(name, rate):
+    return QuotaLimiter(name, rate, max_attempts=API_MAX_ATTEMPTS,
+                        backoff_base=API_BACKOFF_BASE, backoff_max=API_BACKOFF_MAX)
+
 
+_sheets_read_quota = _quota("sheets_read", SHEETS_READS_PER_MINUTE / 60)
+_sheets_write_quota = _quota("sheets_write", SHEETS_WRITES_PER_MINUTE / 60)
+_smtp_quota = _quota("smtp", DISPATCH_RATE_PER_SECOND)
+
+
+def quota_stats():
+    return {quota.name: quota.stats() for quota in (_sheets_read_quota, _sheets_write_quota, _smtp_quota)}
+
+
+
+
+# Misses go through backends.secret, looked up per call so a stand-in can replace it
+_secret_cache = SecretCache(telemetry, lambda secret_id: backends.secret(secret_id))
 
 
 def get_secret(secret_id):
-    """Retrieve a secret from Google Secret Manager."""
-    client = secretmanager.SecretManagerServiceClient()
-    project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
-    name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
-    response = client.access_secret_version(request={"name": name})
-    return response.payload.data.decode("UTF-8")
+    """Retrieve a secret from Google Secret Manager (cached per process)."""
+    return _secret_cache.get(secret_id)
 
 
 
@@ -51,24 +132,319 @@ def get_email_credentials():
 
 
 
-def get_new_signups():
-    """Retrieve all records from Google Sheets Database."""
+def smtp_transport(**options):
+    """An SMTPTransport that logs in with the job's Gmail credentials."""
+    return SMTPTransport(get_email_credentials, telemetry, **options)
+
+
+
+
+def deliver_message(transport, sender, recipient, message):
+    """Send through a shared transport, or a one-off session when none is given.
+
+    Sends are paced by the SMTP quota and transient 4xx replies are retried.
+    """
+    if transport is not None:
+        _smtp_quota.call(transport.send, sender, recipient, message)
+        return
+    one_off = backends.smtp_transport()
     try:
-        # Get credentials from Secret Manager
-        credentials_json = get_secret("SERVICE_ACCOUNT_FILE")
-        credentials_dict = json.loads(credentials_json)
-       
-        # Create temporary file
-        with open('/tmp/credentials.json', 'w') as f:
-            json.dump(credentials_dict, f)
-       
+        _smtp_quota.call(one_off.send, sender, recipient, message)
+    finally:
+        one_off.close()
+
+
+
+
+class SheetStateStore:
+    """Tiny key/value store kept as JSON in a tab of the responses spreadsheet.
+
+    The job has no disk that survives between runs, so run state lives next to
+    the data it describes. The tab is created on first save. New keys are
+    appended, so tasks of a sharded run can save their own keys at once.
+    """
+
+    def __init__(self, spreadsheet, title=STATE_WORKSHEET_NAME):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self._worksheet = None
+        self._rows = None
+
+    def _load_rows(self):
+        if self._rows is None:
+            try:
+                with telemetry.span("sheets.worksheet", worksheet=self.title):
+                    self._worksheet = _sheets_read_quota.call(self.spreadsheet.worksheet, self.title)
+                with telemetry.span("sheets.get_all_values", worksheet=self.title) as span:
+                    self._rows = _sheets_read_quota.call(self._worksheet.get_all_values)
+                    span.set("rows", len(self._rows))
+            except gspread.exceptions.WorksheetNotFound:
+                self._rows = []
+        return self._rows
+
+    def load(self, key):
+        for row in self._load_rows():
+            if row and row[0] == key and len(row) > 1 and row[1]:
+                return json.loads(row[1])
+        return None
+
+    def refresh(self):
+        """Forget the cached tab so the next load sees other tasks' saves."""
+        self._rows = None
+
+    def save(self, key, value):
+        rows = self._load_rows()
+        if self._worksheet is None:
+            try:
+                with telemetry.span("sheets.add_worksheet", worksheet=self.title):
+                    self._worksheet = _sheets_write_quota.call(
+                        self.spreadsheet.add_worksheet, title=self.title, rows=20, cols=2, idempotent=False)
+            except gspread.exceptions.APIError:
+                # Another task created the tab first
+                self.refresh()
+                rows = self._load_rows()
+                if self._worksheet is None:
+                    raise
+        cells = [key, json.dumps(value)]
+        index = next((i for i, row in enumerate(rows) if row and row[0] == key), None)
+        if index is None:
+            with telemetry.span("sheets.append_row", worksheet=self.title, key=key):
+                _sheets_write_quota.call(self._worksheet.append_row, cells, idempotent=False)
+            # Other tasks may have appended too, so the new row's position is only known after a reload
+            self.refresh()
+            return
+        with telemetry.span("sheets.update", worksheet=self.title, key=key):
+            _sheets_write_quota.call(self._worksheet.update, range_name=f"A{index + 1}:B{index + 1}", values=[cells])
+        rows[index] = cells
+
+
+def _column_letter(col):
+    return gspread.utils.rowcol_to_a1(1, col).rstrip("0123456789")
+
+
+def _header_checksum(headers):
+    return hashlib.sha256("\x1f".join(headers).encode("utf-8")).hexdigest()
+
+
+def _records_frame(headers, rows, row_numbers):
+    """Build the responses DataFrame exactly as get_all_records() would, for selected rows."""
+    import pandas as pd
+    width = len(headers)
+    values = [
+        gspread.utils.numericise_all(list(row[:width]) + [""] * (width - len(row)))
+        for row in rows
+    ]
+    df = pd.DataFrame(gspread.utils.to_records(headers, values), columns=headers)
+    df['original_row_index'] = list(row_numbers)
+    return df
+
+
+class IngestCursor:
+    """High-water mark for incremental reads of the responses worksheet.
+
+    The mark is the last sheet row up to which every welcome email is settled
+    (sent or skipped), stored with a checksum of the header row and that row's
+    Timestamp. Later runs fetch only the rows after the mark, plus the two
+    interview columns for older rows because "Give Interview" is set by hand
+    long after a response arrives. A changed header or a moved anchor row
+    falls back to a full scan.
+    """
+
+    def __init__(self, store, key="ingest"):
+        self.store = store
+        self.key = key
+        self.headers = None
+        self.start_row = 2
+        self.full_scan = True
+        self._pending = None
+
+    def probe(self, sh):
+        """Cheap "anything new?" check that runs before pandas is loaded.
+
+        Does the incremental fetch and keeps its rows for read(). Returns the
+        number of rows to look at, or None when a full scan is needed.
+        """
+        try:
+            self._pending = self._fetch_incremental(sh)
+        except Exception as e:
+            print(f"Incremental read failed, falling back to a full scan: {e}")
+            self._pending = None
+        return len(self._pending[1]) if self._pending is not None else None
+
+    def read(self, sh):
+        """Return the DataFrame of rows this run needs to look at."""
+        pending, self._pending = self._pending, None
+        if pending is None:
+            try:
+                pending = self._fetch_incremental(sh)
+            except Exception as e:
+                print(f"Incremental read failed, falling back to a full scan: {e}")
+        if pending is not None:
+            return _records_frame(*pending)
+        return self._read_full(sh)
+
+    def _read_full(self, sh):
+        with telemetry.span("sheets.get_all_values", worksheet=RESPONSES_WORKSHEET_NAME) as span:
+            all_values = _sheets_read_quota.call(sh.get_all_values)
+            span.set("rows", len(all_values))
+        if not all_values:
+            import pandas as pd
+            return pd.DataFrame()
+        self.headers = all_values[0]
+        self.start_row = 2
+        self.full_scan = True
+        rows = all_values[1:]
+        return _records_frame(self.headers, rows, range(2, len(rows) + 2))
+
+    def _fetch_incremental(self, sh):
+        """(headers, rows, row_numbers) to process, or None when a full scan is needed."""
+        state = self.store.load(self.key)
+        if not state:
+            print("No ingestion checkpoint yet, doing a full scan")
+            return None
+
+        mark = state["last_row"]
+        columns = state["columns"]
+        last_col = _column_letter(state["header_width"])
+        give_col = _column_letter(columns[GIVE_INTERVIEW_COLUMN])
+        sent_col = _column_letter(columns[INTERVIEW_SENT_COLUMN])
+        ts_col = _column_letter(columns[TIMESTAMP_COLUMN])
+
+        # Header, anchor row, new rows and the interview columns of old rows in one call
+        header_range, anchor_range, tail_range = "1:1", f"{ts_col}{max(mark, 1)}", f"A{mark + 1}:{last_col}"
+        ranges = [header_range, anchor_range, tail_range]
+        if mark >= 2:
+            ranges += [f"{give_col}2:{give_col}{mark}", f"{sent_col}2:{sent_col}{mark}"]
+        with telemetry.span("sheets.batch_get", ranges=len(ranges)) as span:
+            results = _sheets_read_quota.call(sh.batch_get, ranges)
+            span.set("rows", len(results[2]))
+
+        headers = results[0][0] if results[0] else []
+        if _header_checksum(headers) != state["header_sha"]:
+            print("Header row changed since the last run, doing a full scan")
+            return None
+        anchor = results[1][0][0] if results[1] and results[1][0] else ""
+        if mark >= 2 and anchor != state["last_timestamp"]:
+            print(f"Row {mark} no longer matches the checkpoint, doing a full scan")
+            return None
+
+        rows = list(results[2])
+        row_numbers = list(range(mark + 1, mark + 1 + len(rows)))
+
+        # Older rows only matter if an interview was approved but not sent yet
+        if mark >= 2:
+            give_values, sent_values = list(results[3]), list(results[4])
+            candidates = []
+            for offset in range(mark - 1):
+                give = give_values[offset][0] if offset < len(give_values) and give_values[offset] else ""
+                sent = sent_values[offset][0] if offset < len(sent_values) and sent_values[offset] else ""
+                if give.strip().lower() == "yes" and sent == "":
+                    candidates.append(offset + 2)
+            for start in range(0, len(candidates), INGEST_BATCH_GET_CHUNK):
+                chunk = candidates[start:start + INGEST_BATCH_GET_CHUNK]
+                with telemetry.span("sheets.batch_get", ranges=len(chunk), rows=len(chunk)):
+                    fetched = _sheets_read_quota.call(sh.batch_get, [f"A{row}:{last_col}{row}" for row in chunk])
+                for row_number, value_range in zip(chunk, fetched):
+                    rows.append(value_range[0] if value_range else [])
+                    row_numbers.append(row_number)
+
+        self.headers = headers
+        self.start_row = mark + 1
+        self.full_scan = False
+        print(f"Incremental read from row {mark + 1}: {len(rows)} rows fetched")
+        return headers, rows, row_numbers
+
+    def commit(self, df, settled_rows):
+        """Advance the mark over contiguous settled rows and persist it."""
+        if self.headers is None or df.empty:
+            return
+        missing = [c for c in (TIMESTAMP_COLUMN, GIVE_INTERVIEW_COLUMN, INTERVIEW_SENT_COLUMN) if c not in self.headers]
+        if missing:
+            print(f"Not saving ingestion checkpoint, missing columns: {missing}")
+            return
+
+        already_sent = df.loc[df[EMAIL_SENT_COLUMN] != '', 'original_row_index']
+        settled = set(settled_rows) | set(int(r) for r in already_sent)
+        timestamps = dict(zip(df['original_row_index'], df[TIMESTAMP_COLUMN].astype(str)))
+
+        mark = self.start_row - 1
+        while mark + 1 in settled:
+            mark += 1
+
+        previous = self.store.load(self.key) if not self.full_scan else None
+        state = {
+            "last_row": mark,
+            "last_timestamp": timestamps.get(mark, previous["last_timestamp"] if previous else ""),
+            "header_sha": _header_checksum(self.headers),
+            "header_width": len(self.headers),
+            "columns": {c: self.headers.index(c) + 1 for c in (TIMESTAMP_COLUMN, GIVE_INTERVIEW_COLUMN, INTERVIEW_SENT_COLUMN)},
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        self.store.save(self.key, state)
+        print(f"Saved ingestion checkpoint at row {mark}")
+
+
+
+
+def open_google_spreadsheet():
+    """Open the responses spreadsheet with the service account from Secret Manager."""
+    credentials_json = get_secret("SERVICE_ACCOUNT_FILE")
+    credentials_dict = json.loads(credentials_json)
+
+    # Create temporary file
+    with open('/tmp/credentials.json', 'w') as f:
+        json.dump(credentials_dict, f)
+
+    with telemetry.span("sheets.open", spreadsheet=GOOGLE_SHEET_NAME):
         gc = gspread.service_account(filename='/tmp/credentials.json')
-       
+        return _sheets_read_quota.call(gc.open, GOOGLE_SHEET_NAME)
+
+
+class Backends:
+    """The external services the job talks to, looked up at call time.
+
+    spreadsheet() returns a gspread Spreadsheet, secret(secret_id) a secret
+    value and smtp_transport() an object with send(sender, recipient, message)
+    and close(). Assigning other callables (e.g. the in-process fakes in
+    benchmarks/fakes.py) runs the job without Google or Gmail.
+    """
+
+    def __init__(self):
+        self.spreadsheet = open_google_spreadsheet
+        self.secret = _secret_cache.fetch
+        self.smtp_transport = smtp_transport
+
+
+backends = Backends()
+
+
+
+
+def get_new_signups(incremental=INCREMENTAL_INGEST, checkpoint_key="ingest"):
+    """Retrieve pending records from Google Sheets Database.
+
+    Returns (worksheet, DataFrame, cursor); cursor is None unless incremental.
+    The DataFrame is None when the incremental probe found nothing to do.
+    """
+    try:
         # Open the spreadsheet
-        sh = gc.open(GOOGLE_SHEET_NAME).worksheet("Form Responses 1")
+        spreadsheet = backends.spreadsheet()
+        with telemetry.span("sheets.worksheet", worksheet=RESPONSES_WORKSHEET_NAME):
+            sh = _sheets_read_quota.call(spreadsheet.worksheet, RESPONSES_WORKSHEET_NAME)
+
+        if incremental:
+            cursor = IngestCursor(SheetStateStore(spreadsheet), key=checkpoint_key)
+            if cursor.probe(sh) == 0:
+                return sh, None, cursor
+            df = cursor.read(sh)
+            print(f"DataFrame shape: {df.shape}")
+            return sh, df, cursor
 
         # Get all records from the sheet and convert to a pandas DataFrame
-        records = sh.get_all_records()
+        import pandas as pd
+        with telemetry.span("sheets.get_all_records", worksheet=RESPONSES_WORKSHEET_NAME) as span:
+            records = _sheets_read_quota.call(sh.get_all_records)
+            span.set("rows", len(records))
         print(f"Total records found: {len(records)}")
        
         df = pd.DataFrame(records)
@@ -77,57 +453,61 @@ def get_new_signups():
        
         df['original_row_index'] = df.index + 2
        
-        return sh, df  # Return ALL records
+        return sh, df, None  # Return ALL records
    
     except gspread.exceptions.SpreadsheetNotFound:
         print(f"Error: Spreadsheet '{GOOGLE_SHEET_NAME}' not found.")
-        return None, pd.DataFrame()
+        return None, None, None
    
     except Exception as e:
         print(f"An error occurred while fetching data: {e}")
-        return None, pd.DataFrame()
+        return None, None, None
 
 
 
 
-def send_welcome_email(recipient_name, recipient_email, departments_str):
-    """Create custom welcome email body based on user input."""
-    try:
-        sender_email, sender_password = get_email_credentials()
-    except Exception as e:
-        print(f"Error: Could not retrieve email credentials: {e}")
-        return False
-   
-    try:
-        message = MIMEMultipart("related")
-        message["Subject"] = "Next Steps With SBI!"
-        message["From"] = sender_email
-        message["To"] = recipient_email
-       
-        # Department descriptions
-        department_info = {
-            'Research and Development': 'Researches and advises on cutting-edge sustainable materials, technologies, and methodologies, and conducts post-project analysis.',
-            'Finance': 'Manages all financial aspects of projects, from initial budgeting and expense tracking, invoicing, and final financial reporting.',
-            'Tech': 'Identifies, designs, and implements internal and external technologies with AI integration, managing software and system installation.',
-            'Engineering': 'Designs and oversees the structural, mechanical (HVAC, plumbing), and electrical systems, including renewable energy integration and site planning.',
-            'Architecture': 'Responsible for the aesthetic and functional design of projects, creating concepts, detailed drawings, and selecting sustainable materials.',
-            'Public Relations': 'Handles recruitment, internal and external communications, project announcements, and public events, maintaining team morale.',
-            'Legal': 'Manages contracts, ensures regulatory compliance, handles permitting, and oversees all legal aspects of the project.',
-        }
+class EmailTemplate:
+    """HTML email body compiled once into literal chunks and named field slots.
 
-        departments_list = [dep.strip() for dep in departments_str.split(',') if dep.strip()]
-       
-        # Generate the HTML for the department selections
-        departments_html = ''
-        for dep in departments_list:
-            if dep in department_info:
-                departments_html += f"<strong>{dep}:</strong> {department_info[dep]}<br><br>"
-            else:
-                print(f"Warning: Unknown department '{dep}'")
-                departments_html += f"<strong>{dep}:</strong> Department information not available.<br><br>"
-       
-        # The HTML email content
-        html_content = f"""
+    Rendering only joins the chunks with the per-recipient values, instead of
+    re-evaluating the whole page for every message.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._chunks = []
+        self._fields = []
+        for literal, field, _, _ in string.Formatter().parse(source):
+            self._chunks.append(literal)
+            self._fields.append(field)
+
+    def render(self, **values):
+        parts = []
+        for literal, field in zip(self._chunks, self._fields):
+            parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+        return "".join(parts)
+
+
+# Department descriptions
+DEPARTMENT_INFO = {
+    'Research and Development': 'Researches and advises on cutting-edge sustainable materials, technologies, and methodologies, and conducts post-project analysis.',
+    'Finance': 'Manages all financial aspects of projects, from initial budgeting and expense tracking, invoicing, and final financial reporting.',
+    'Tech': 'Identifies, designs, and implements internal and external technologies with AI integration, managing software and system installation.',
+    'Engineering': 'Designs and oversees the structural, mechanical (HVAC, plumbing), and electrical systems, including renewable energy integration and site planning.',
+    'Architecture': 'Responsible for the aesthetic and functional design of projects, creating concepts, detailed drawings, and selecting sustainable materials.',
+    'Public Relations': 'Handles recruitment, internal and external communications, project announcements, and public events, maintaining team morale.',
+    'Legal': 'Manages contracts, ensures regulatory compliance, handles permitting, and oversees all legal aspects of the project.',
+}
+
+# Pre-rendered HTML snippet for each known department
+DEPARTMENT_HTML = {
+    dep: f"<strong>{dep}:</strong> {description}<br><br>"
+    for dep, description in DEPARTMENT_INFO.items()
+}
+
+WELCOME_TEMPLATE = EmailTemplate("""
 <!DOCTYPE html>
 <html>
 <head>
@@ -177,49 +557,9 @@ def send_welcome_email(recipient_name, recipient_email, departments_str):
     </div>
 </body>
 </html>
-"""
-
-        html_part = MIMEText(html_content, "html")
-        message.attach(html_part)
-       
-        # Add logo if file exists
-        if os.path.exists(LOGO_FILE):
-            with open(LOGO_FILE, "rb") as f:
-                logo_data = f.read()
-                logo = MIMEImage(logo_data)
-                logo.add_header("Content-ID", "<logo>")
-                message.attach(logo)
-               
-        # Create SMTP session and send email
-        context = ssl.create_default_context()
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls(context=context)
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, recipient_email, message.as_string())
-               
-        print(f"Welcome email sent successfully to {recipient_email}")
-        return True
-   
-    except Exception as e:
-        print(f"Failed to send welcome email to {recipient_email}: {e}")
-        return False
+""")
 
-
-def send_interview_email(recipient_name, recipient_email, department, booking_link):
-    """Send separate interview scheduling email."""
-    try:
-        sender_email, sender_password = get_email_credentials()
-    except Exception as e:
-        print(f"Error: Could not retrieve email credentials: {e}")
-        return False
-   
-    try:
-        message = MIMEMultipart("related")
-        message["Subject"] = "Schedule Your SBI Interview"
-        message["From"] = sender_email
-        message["To"] = recipient_email
-       
-        html_content = f"""
+INTERVIEW_TEMPLATE = EmailTemplate("""
 <!DOCTYPE html>
 <html>
 <head>
@@ -264,25 +604,122 @@ def send_interview_email(recipient_name, recipient_email, department, booking_li
     </div>
 </body>
 </html>
-"""
+""")
 
-        html_part = MIMEText(html_content, "html")
-        message.attach(html_part)
-       
-        # Add logo if file exists
-        if os.path.exists(LOGO_FILE):
+
+_logo_part = None
+_logo_lock = threading.Lock()
+
+
+def get_logo_part():
+    """Return the signature logo as a MIME part, read and base64-encoded only once.
+
+    The part is attached to every message as-is and never modified afterwards,
+    so one instance is shared by all sends.
+    """
+    global _logo_part
+    with _logo_lock:
+        if _logo_part is None and os.path.exists(LOGO_FILE):
             with open(LOGO_FILE, "rb") as f:
-                logo_data = f.read()
-                logo = MIMEImage(logo_data)
-                logo.add_header("Content-ID", "<logo>")
-                message.attach(logo)
+                logo = MIMEImage(f.read())
+            logo.add_header("Content-ID", "<logo>")
+            _logo_part = logo
+        return _logo_part
+
+
+def render_departments_html(departments_str):
+    """Generate the HTML for the department selections."""
+    departments_html = ''
+    for dep in departments_str.split(','):
+        dep = dep.strip()
+        if not dep:
+            continue
+        if dep in DEPARTMENT_HTML:
+            departments_html += DEPARTMENT_HTML[dep]
+        else:
+            print(f"Warning: Unknown department '{dep}'")
+            departments_html += f"<strong>{dep}:</strong> Department information not available.<br><br>"
+    return departments_html
+
+
+# Fixed per-process MIME boundary: the generator would otherwise regex-scan the
+# whole ~70 KiB body (mostly the logo) on every message just to pick one. The
+# parts are base64-encoded, so the boundary can never occur inside them.
+MESSAGE_BOUNDARY = "===============" + uuid.uuid4().hex + "=="
+
+
+def _build_message(subject, sender_email, recipient_email, html_content, message_id=None):
+    message = MIMEMultipart("related", boundary=MESSAGE_BOUNDARY)
+    message["Subject"] = subject
+    message["From"] = sender_email
+    message["To"] = recipient_email
+    if message_id:
+        message["Message-ID"] = message_id
+    message.attach(MIMEText(html_content, "html"))
+
+    # Add logo if file exists
+    logo = get_logo_part()
+    if logo is not None:
+        message.attach(logo)
+    return message
+
+
+def build_welcome_message(sender_email, recipient_name, recipient_email, departments_str, message_id=None):
+    """Render the welcome email for one recipient."""
+    html_content = WELCOME_TEMPLATE.render(
+        recipient_name=recipient_name,
+        departments_html=render_departments_html(departments_str),
+    )
+    return _build_message("Next Steps With SBI!", sender_email, recipient_email, html_content, message_id)
+
+
+def build_interview_message(sender_email, recipient_name, recipient_email, department, booking_link, message_id=None):
+    """Render the interview scheduling email for one recipient."""
+    html_content = INTERVIEW_TEMPLATE.render(
+        recipient_name=recipient_name,
+        department=department,
+        booking_link=booking_link,
+    )
+    return _build_message("Schedule Your SBI Interview", sender_email, recipient_email, html_content, message_id)
+
+
+
+
+def send_welcome_email(recipient_name, recipient_email, departments_str, transport=None, message_id=None):
+    """Create custom welcome email body based on user input."""
+    try:
+        sender_email, sender_password = get_email_credentials()
+    except Exception as e:
+        print(f"Error: Could not retrieve email credentials: {e}")
+        return False
+   
+    try:
+        message = build_welcome_message(sender_email, recipient_name, recipient_email, departments_str, message_id)
+
+        # Send over the shared SMTP session
+        deliver_message(transport, sender_email, recipient_email, message)
                
-        # Create SMTP session and send email
-        context = ssl.create_default_context()
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls(context=context)
-            server.login(sender_email, sender_password)
-            server.sendmail(sender_email, recipient_email, message.as_string())
+        print(f"Welcome email sent successfully to {recipient_email}")
+        return True
+   
+    except Exception as e:
+        print(f"Failed to send welcome email to {recipient_email}: {e}")
+        return False
+
+
+def send_interview_email(recipient_name, recipient_email, department, booking_link, transport=None, message_id=None):
+    """Send separate interview scheduling email."""
+    try:
+        sender_email, sender_password = get_email_credentials()
+    except Exception as e:
+        print(f"Error: Could not retrieve email credentials: {e}")
+        return False
+   
+    try:
+        message = build_interview_message(sender_email, recipient_name, recipient_email, department, booking_link, message_id)
+
+        # Send over the shared SMTP session
+        deliver_message(transport, sender_email, recipient_email, message)
                
         print(f"Interview email sent successfully to {recipient_email}")
         return True
@@ -294,31 +731,97 @@ def send_interview_email(recipient_name, recipient_email, department, booking_li
 
 
 
-def update_email_sent_status(sheet, row_index):
-    """Updates Google Sheets to mark sent."""
+class StatusWriteBuffer:
+    """Collects per-row status updates and writes them back with batch_update.
+
+    Header columns are resolved once per run. Pending cells are flushed every
+    flush_every rows and at the end of the run, in chunks of at most
+    chunk_size cells, so a crash mid-run loses at most one batch of progress.
+    on_written, if given, is called with the (row_index, header, value) of
+    every cell once its chunk is in the sheet.
+    """
+
+    def __init__(self, sheet, headers=None, flush_every=STATUS_FLUSH_EVERY,
+                 chunk_size=STATUS_BATCH_CHUNK_SIZE, on_written=None):
+        self.sheet = sheet
+        self.flush_every = max(1, flush_every)
+        self.chunk_size = max(1, chunk_size)
+        self.on_written = on_written
+        self.api_calls = 0
+        self.cells_written = 0
+        self._headers = list(headers) if headers is not None else None
+        self._columns = {}
+        self._pending = []
+        self._lock = threading.RLock()
+
+    def column(self, header):
+        """Return the 1-based column index for a header, reading row 1 at most once."""
+        with self._lock:
+            if header not in self._columns:
+                if self._headers is None:
+                    with telemetry.span("sheets.row_values", row=1):
+                        self._headers = _sheets_read_quota.call(self.sheet.row_values, 1)
+                    self.api_calls += 1
+                self._columns[header] = self._headers.index(header) + 1
+            return self._columns[header]
+
+    def record(self, row_index, header, value):
+        """Queue one cell update, flushing when enough rows have accumulated."""
+        with self._lock:
+            col = self.column(header)
+            self._pending.append((row_index, col, value, header))
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+    def flush(self):
+        """Write all pending cells; failed chunks stay queued for the next flush."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            ok = True
+            for start in range(0, len(pending), self.chunk_size):
+                chunk = pending[start:start + self.chunk_size]
+                try:
+                    with telemetry.span("sheets.batch_update", cells=len(chunk)):
+                        _sheets_write_quota.call(self.sheet.batch_update, [
+                            {"range": gspread.utils.rowcol_to_a1(row, col), "values": [[value]]}
+                            for row, col, value, _ in chunk
+                        ])
+                    self.api_calls += 1
+                    self.cells_written += len(chunk)
+                    print(f"Wrote {len(chunk)} status updates to the sheet")
+                    if self.on_written is not None:
+                        self.on_written([(row, header, value) for row, _, value, header in chunk])
+                except Exception as e:
+                    print(f"Failed to write {len(chunk)} status updates: {e}")
+                    self._pending.extend(chunk)
+                    ok = False
+            return ok
+
+    def stats(self):
+        return {"api_calls": self.api_calls, "cells_written": self.cells_written, "pending": len(self._pending)}
+
+
+
+
+def update_email_sent_status(status_buffer, row_index):
+    """Queue the 'Automated Email Sent' mark for a row."""
     try:
-        headers = sheet.row_values(1)
-        email_sent_col = headers.index("Automated Email Sent") + 1
-       
-        sheet.update_cell(row_index, email_sent_col, "Yes")
-        print(f"Updated row {row_index} - marked email as sent")
+        status_buffer.record(row_index, EMAIL_SENT_COLUMN, "Yes")
+        print(f"Queued row {row_index} - mark email as sent")
         return True
-   
+
     except Exception as e:
         print(f"Failed to update row {row_index}: {e}")
         return False
 
 
-def update_interview_sent_status(sheet, row_index, booking_id):
-    """Updates Google Sheets with booking link ID."""
+def update_interview_sent_status(status_buffer, row_index, booking_id):
+    """Queue the booking link ID for a row's 'Interview Sent' column."""
     try:
-        headers = sheet.row_values(1)
-        interview_sent_col = headers.index("Interview Sent") + 1
-       
-        sheet.update_cell(row_index, interview_sent_col, booking_id)
-        print(f"Updated row {row_index} - marked interview link sent: {booking_id}")
+        status_buffer.record(row_index, INTERVIEW_SENT_COLUMN, booking_id)
+        print(f"Queued row {row_index} - mark interview link sent: {booking_id}")
         return True
-   
+
     except Exception as e:
         print(f"Failed to update row {row_index}: {e}")
         return False
@@ -326,71 +829,607 @@ def update_interview_sent_status(sheet, row_index, booking_id):
 
 
 
-def main():  
+SendJob = namedtuple("SendJob", "kind row_index name email departments booking_id booking_link")
+
+
+class SendJournal:
+    """Record of every email the job sends, kept in the shared state store (STATE_STORE).
+
+    A send is claimed before it goes out by creating its record, pending and
+    carrying the Message-ID the email will have. Creation is atomic, so
+    however many runs or tasks overlap only one of them sends a given email.
+    The record is marked sent when SMTP accepts the message and deleted once
+    the row's status mark is in the sheet; a failed send drops its claim so
+    the next run tries again. The next run skips rows the journal has as
+    sent and replays their status marks instead.
+
+    A claim still pending means a run died during that send, which may or
+    may not have been delivered. It is held back for in_doubt_hours (check
+    the sender's mailbox for its Message-ID meanwhile) and then taken as
+    delivered; resolve_in_doubt() settles such claims sooner, either way.
+    """
+
+    STATUS_COLUMNS = {"welcome": EMAIL_SENT_COLUMN, "interview": INTERVIEW_SENT_COLUMN}
+    PREFIX = "sends/"
+
+    def __init__(self, store, in_doubt_hours=SEND_IN_DOUBT_HOURS, retention_days=SEND_JOURNAL_RETENTION_DAYS):
+        self.store = store
+        self.in_doubt_hours = in_doubt_hours
+        self.retention_days = retention_days
+        self.run_id = uuid.uuid4().hex[:12]
+        self.replayed = 0
+        self.in_doubt = 0
+        self.resolved = 0
+        self.contended = 0
+        self._entries = {}
+        # Claims being sent, by key, and sent claims awaiting their status mark, by (kind, row_index)
+        self._pending = {}
+        self._claims = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def key(cls, job):
+        digest = hashlib.sha256(job.email.lower().encode("utf-8")).hexdigest()[:16]
+        return f"{cls.PREFIX}{job.kind}/{job.row_index}-{digest}"
+
+    def load(self):
+        """Read the journal's entries, dropping any untouched for retention_days."""
+        cutoff = time.time() - self.retention_days * 86400
+        pruned = 0
+        for key, record, generation in self.store.list(self.PREFIX):
+            if record["updated_at"] < cutoff:
+                pruned += self.store.delete(key, generation)
+            else:
+                self._entries[key] = (record, generation)
+        if pruned:
+            print(f"Pruned {pruned} send journal entries older than {self.retention_days} days")
+        return self
+
+    def _mark_sent(self, key, record, generation):
+        return self.store.replace(key, dict(record, status="sent", updated_at=time.time()), generation)
+
+    def resume(self, jobs):
+        """Split jobs into (to_send, replay): replay are journaled sends whose status mark must be rewritten."""
+        expiry = time.time() - self.in_doubt_hours * 3600
+        to_send, replay = [], []
+        for job in jobs:
+            key = self.key(job)
+            if key not in self._entries:
+                to_send.append(job)
+                continue
+            record, generation = self._entries[key]
+            if record["status"] == "pending":
+                if record["updated_at"] >= expiry:
+                    print(f"Not resending {job.kind} email for row {job.row_index}: an earlier run died while "
+                          f"sending it, check the mailbox for {record['message_id']}")
+                    self.in_doubt += 1
+                    continue
+                generation = self._mark_sent(key, record, generation)
+                if generation is None:
+                    print(f"Not resending {job.kind} email for row {job.row_index}: another run settled it")
+                    self.contended += 1
+                    continue
+                print(f"Taking the {job.kind} email for row {job.row_index} as delivered: it has been in doubt "
+                      f"for over {self.in_doubt_hours:g} hours ({record['message_id']})")
+                self.resolved += 1
+            self._claims[(job.kind, job.row_index)] = (key, generation)
+            replay.append(job._replace(booking_id=record["booking_id"]))
+            self.replayed += 1
+        if replay:
+            print(f"Send journal: {len(replay)} emails already sent, replaying their status marks")
+        return to_send, replay
+
+    def resolve_in_doubt(self, action):
+        """Settle every pending claim now: "sent" takes them as delivered (the next run writes
+        their status marks), "resend" drops them so the next run sends them again.
+
+        Only run this while no execution of the job is running. Returns how many were settled.
+        """
+        settled = 0
+        for key, (record, generation) in sorted(self._entries.items()):
+            if record["status"] != "pending":
+                continue
+            if action == "sent":
+                done = self._mark_sent(key, record, generation) is not None
+            else:
+                done = self.store.delete(key, generation)
+            if done:
+                print(f"{key} ({record['message_id']}): {action}")
+                settled += 1
+        return settled
+
+    def begin(self, job):
+        """Claim a send and return the Message-ID it should carry, or None if another run holds it."""
+        key = self.key(job)
+        message_id = make_msgid(domain="sbi-email-job")
+        record = {
+            "kind": job.kind, "row_index": job.row_index, "email": job.email, "booking_id": job.booking_id,
+            "message_id": message_id, "status": "pending", "run_id": self.run_id, "updated_at": time.time(),
+        }
+        generation = self.store.create(key, record)
+        if generation is None:
+            print(f"Not sending {job.kind} email for row {job.row_index}: another run has claimed it")
+            with self._lock:
+                self.contended += 1
+            return None
+        with self._lock:
+            self._pending[key] = (record, generation)
+        return message_id
+
+    def finish(self, job, ok):
+        """Mark a claimed send sent, or drop the claim of a failed one so the next run retries it."""
+        key = self.key(job)
+        with self._lock:
+            record, generation = self._pending.pop(key)
+        try:
+            if ok:
+                # If this fails the claim stays pending and a later run treats the send as in doubt
+                generation = self._mark_sent(key, record, generation)
+                if generation is not None:
+                    with self._lock:
+                        self._claims[(job.kind, job.row_index)] = (key, generation)
+            else:
+                self.store.delete(key, generation)
+        except Exception as e:
+            print(f"Failed to update the send journal for row {job.row_index}: {e}")
+
+    def _clear(self, claim):
+        try:
+            self.store.delete(*claim)
+        except Exception as e:
+            # Left behind, the entry is replayed next run or pruned after retention_days
+            print(f"Failed to clear send journal entry {claim[0]}: {e}")
+
+    def written(self, cells):
+        """StatusWriteBuffer callback: clear the sends whose status cells reached the sheet."""
+        kinds = {column: kind for kind, column in self.STATUS_COLUMNS.items()}
+        with self._lock:
+            claims = [
+                self._claims.pop((kinds[header], row_index))
+                for row_index, header, _ in cells
+                if header in kinds and (kinds[header], row_index) in self._claims
+            ]
+        if claims:
+            with ThreadPoolExecutor(max_workers=min(8, len(claims)), thread_name_prefix="journal") as pool:
+                list(pool.map(self._clear, claims))
+
+    def stats(self):
+        with self._lock:
+            unwritten = len(self._claims)
+        return {
+            "unwritten": unwritten, "replayed": self.replayed, "in_doubt": self.in_doubt,
+            "resolved": self.resolved, "contended": self.contended, "store": self.store.stats(),
+        }
+
+
+def journaled(journal, send):
+    """Wrap a send(job, message_id) so it is claimed before and journaled after it runs."""
+    def run(job):
+        message_id = journal.begin(job)
+        if message_id is None:
+            return False
+        ok = send(job, message_id)
+        journal.finish(job, ok)
+        return ok
+    return run
+
+
+class DispatchPhase:
+    """One batch of send jobs running on a DispatchEngine.
+
+    Results are recorded in submission order: a finished job is only passed to
+    `record` once every job before it has finished, so buffered status marks
+    always cover a contiguous prefix of the phase.
+    """
+
+    def __init__(self, name, jobs, send, record):
+        self.name = name
+        self.jobs = list(jobs)
+        self.send = send
+        self.record = record
+        self.sent = 0
+        self.failed = 0
+        self._results = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        if not self.jobs:
+            self._done.set()
+
+    def _complete(self, index, ok):
+        with self._lock:
+            self._results[index] = ok
+            while self._next in self._results:
+                job = self.jobs[self._next]
+                if self._results.pop(self._next):
+                    self.record(job)
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                self._next += 1
+            if self._next == len(self.jobs):
+                self._done.set()
+
+    def wait(self):
+        self._done.wait()
+        return self.sent, self.failed
+
+
+class DispatchEngine:
+    """Runs the render -> send -> record-status pipeline over a bounded thread pool.
+
+    Phases submitted to the same engine share its workers, so the welcome
+    and interview phases can run at the same time. Sends are paced by the
+    shared SMTP quota in deliver_message().
+    """
+
+    def __init__(self, concurrency=DISPATCH_CONCURRENCY):
+        self._executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="dispatch")
+
+    def submit(self, name, jobs, send, record):
+        """Queue every job of a phase and return the DispatchPhase to wait on."""
+        phase = DispatchPhase(name, jobs, send, record)
+        for index, job in enumerate(phase.jobs):
+            self._executor.submit(self._run, phase, index, job)
+        return phase
+
+    def _run(self, phase, index, job):
+        ok = False
+        try:
+            ok = phase.send(job)
+        except Exception as e:
+            print(f"Unexpected error in {phase.name} job for row {job.row_index}: {e}")
+        finally:
+            phase._complete(index, ok)
+
+    def shutdown(self, cancel_pending=False):
+        self._executor.shutdown(wait=True, cancel_futures=cancel_pending)
+
+
+
+
+def _text_column(df, column):
+    """A column as stripped strings, '' where the column or the value is missing."""
+    import pandas as pd
+    if column not in df:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[column].fillna("").astype(str).str.strip()
+
+
+def _map_unique(series, fn):
+    """Apply fn once per distinct value; answers like departments repeat across thousands of rows."""
+    uniques = series.unique()
+    return series.map(dict(zip(uniques, map(fn, uniques))))
+
+
+def prepare_candidates(df):
+    """Normalise the fields every send job needs, column-wise.
+
+    Returns a frame indexed like df with the title-cased name, the trimmed
+    lower-case email, the department list re-joined as "A, B", and
+    skip_reason ('' when the row can be emailed).
+    """
+    import numpy as np
+    import pandas as pd
+    name = _text_column(df, NAME_COLUMN).str.title()
+    email = _text_column(df, EMAIL_COLUMN).str.lower()
+    departments = _map_unique(
+        _text_column(df, DEPARTMENTS_COLUMN),
+        lambda value: ", ".join(dep.strip() for dep in value.split(",") if dep.strip()),
+    )
+    skip_reason = np.select(
+        [name == "", email == "", ~email.str.match(EMAIL_PATTERN)],
+        ["missing name", "missing email", "invalid email"],
+        default="",
+    )
+    return pd.DataFrame(
+        {"name": name, "email": email, "departments": departments, "skip_reason": skip_reason},
+        index=df.index,
+    )
+
+
+def build_send_jobs(df):
+    """Select the welcome and interview sends for a responses frame without a per-row loop.
+
+    Returns (welcome_jobs, interview_jobs, skipped_welcome_rows). Rows due a
+    welcome email that can't be emailed are returned as skipped so the
+    ingest checkpoint can move past them.
+    """
+    import pandas as pd
+    give_interview = df[GIVE_INTERVIEW_COLUMN].fillna("") if GIVE_INTERVIEW_COLUMN in df else pd.Series("", index=df.index)
+    welcome_due = df[EMAIL_SENT_COLUMN] == ''
+    interview_due = _map_unique(give_interview, lambda value: str(value).strip().lower() == "yes") & (df[INTERVIEW_SENT_COLUMN] == '')
+    print(f"Found {int(welcome_due.sum())} new signups for welcome emails.")
+    print(f"Found {int(interview_due.sum())} people needing interview emails.")
+
+    # Only rows owed an email are cleaned up; on a mature sheet that's a small fraction
+    due = welcome_due | interview_due
+    fields = prepare_candidates(df[due])
+    rows = df["original_row_index"][due]
+    welcome_due = welcome_due[due]
+    interview_due = interview_due[due]
+    sendable = fields["skip_reason"] == ""
+
+    skipped = fields[~sendable]
+    if len(skipped):
+        print("\n".join(
+            f"Skipping row {row}: {reason}"
+            for row, reason in zip(rows[skipped.index], skipped["skip_reason"])
+        ))
+    skipped_welcome_rows = rows[welcome_due & ~sendable].tolist()
+
+    welcome = fields[welcome_due & sendable]
+    welcome_jobs = [
+        SendJob("welcome", row, name, email, departments, None, None)
+        for row, name, email, departments in zip(
+            rows[welcome.index].tolist(), welcome["name"].tolist(),
+            welcome["email"].tolist(), welcome["departments"].tolist())
+    ]
+
+    interview = fields[interview_due & sendable]
+    dept_param = interview["departments"].where(interview["departments"] != "", DEFAULT_BOOKING_DEPARTMENT)
+    booking_ids = pd.Series([str(uuid.uuid4()) for _ in range(len(interview))], index=interview.index, dtype=object)
+    booking_links = (
+        BOOKING_BASE_URL + "?id=" + booking_ids
+        + "&name=" + _map_unique(interview["name"], quote)
+        + "&email=" + _map_unique(interview["email"], quote)
+        + "&dept=" + _map_unique(dept_param, quote)
+    )
+    interview_jobs = [
+        SendJob("interview", row, name, email, departments, booking_id, booking_link)
+        for row, name, email, departments, booking_id, booking_link in zip(
+            rows[interview.index].tolist(), interview["name"].tolist(), interview["email"].tolist(),
+            dept_param.tolist(), booking_ids.tolist(), booking_links.tolist())
+    ]
+
+    if welcome_jobs:
+        print("\n".join(f"Processing welcome email: {job.name} ({job.email})" for job in welcome_jobs))
+    if interview_jobs:
+        print("\n".join(f"Processing interview email: {job.name} ({job.email})" for job in interview_jobs))
+    return welcome_jobs, interview_jobs, skipped_welcome_rows
+
+
+
+
+def _shard_of(key, count):
+    """Stable shard number for a key: the same in every process, unlike hash()."""
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big") % count
+
+
+class Shard:
+    """This task's slice of the responses when the job runs as several Cloud Run tasks.
+
+    Rows are assigned by a stable hash of the normalised email, so the same
+    candidate always goes to the same task and no two tasks write the same
+    status cells. Each shard keeps its own ingest checkpoint and run
+    summary; the send journal is shared. With one task nothing changes.
+    """
+
+    def __init__(self, index=TASK_INDEX, count=TASK_COUNT, execution=EXECUTION_ID):
+        if not 0 <= index < count:
+            raise ValueError(f"shard index {index} is not in 0..{count - 1}")
+        self.index = index
+        self.count = count
+        self.execution = execution
+
+    def __str__(self):
+        return f"{self.index} of {self.count}"
+
+    @property
+    def sharded(self):
+        return self.count > 1
+
+    @property
+    def checkpoint_key(self):
+        return f"ingest-{self.index}-of-{self.count}" if self.sharded else "ingest"
+
+    @property
+    def summary_key(self):
+        return f"run-{self.index}-of-{self.count}"
+
+    def owns(self, df):
+        """Boolean Series marking the rows of a responses frame that belong to this shard."""
+        import pandas as pd
+        if not self.sharded:
+            return pd.Series(True, index=df.index)
+        email = _text_column(df, EMAIL_COLUMN).str.lower()
+        return _map_unique(email, lambda value: _shard_of(value, self.count) == self.index).astype(bool)
+
+
+
+
+def open_journal():
+    """The send journal in STATE_STORE, with its entries loaded."""
+    store = open_store(STATE_STORE, telemetry)
+    if os.environ.get("CLOUD_RUN_JOB") and not is_shared(store):
+        print(f"Warning: STATE_STORE ({STATE_STORE}) is a local directory, which is lost when this task ends; "
+              "set it to gs://<bucket>/<prefix>")
+    return SendJournal(store).load()
+
+
+def main(shard=None):
+    """One pass over the responses (this task's shard of them); returns the run summary."""
+    shard = shard or Shard()
+    summary = {
+        "status": "error", "rows": 0, "welcome_sent": 0, "welcome_failed": 0,
+        "interview_sent": 0, "interview_failed": 0, "replayed": 0, "in_doubt": 0,
+    }
+    if shard.sharded:
+        print(f"Running shard {shard} of execution {shard.execution}")
+
     # Get all records from Google Sheets
-    sheet, all_records_df = get_new_signups()
+    sheet, all_records_df, cursor = get_new_signups(checkpoint_key=shard.checkpoint_key)
+
+    if sheet is not None and all_records_df is None:
+        print("No new signups or approved interviews since the last run.")
+        summary["status"] = "nothing new"
+        return summary
    
     if sheet is None or all_records_df.empty:
         print("No records found or error accessing sheet.")
-        return
-   
-    # Process welcome emails (for those who haven't received it yet)
-    new_signups_df = all_records_df[all_records_df["Automated Email Sent"] == ''].copy()
-    print(f"Found {len(new_signups_df)} new signups for welcome emails.")
-   
-    for index, row in new_signups_df.iterrows():
-        name = row.get("What is your name?", "")
-        email = row.get("What is your email?", "")
-        departments = row.get("Which department(s) do you want to be in? (Pick up to 2)", "")
-        original_row = row.get("original_row_index")
-
-        if not email or not name:
-            print(f"Skipping row {original_row}: missing name or email")
-            continue
-       
-        print(f"Processing welcome email: {name} ({email})")
-        name = name.title()
+        if sheet is not None:
+            summary["status"] = "nothing new"
+        return summary
 
-        if send_welcome_email(name, email, departments):
-            update_email_sent_status(sheet, original_row)
-            print(f"Successfully sent welcome email to {name}")
-        else:
-            print(f"Failed to send welcome email to {name}")
-    
-    # Process interview emails (separate from welcome emails)
-    # Filter for: Give Interview = "Yes" AND Interview Sent is empty
-    interview_needed_df = all_records_df[
-        (all_records_df["Give Interview"].astype(str).str.strip().str.lower() == "yes") &
-        (all_records_df["Interview Sent"] == '')
-    ].copy()
-    
-    print(f"\nFound {len(interview_needed_df)} people needing interview emails.")
-    
-    for index, row in interview_needed_df.iterrows():
-        name = row.get("What is your name?", "")
-        email = row.get("What is your email?", "")
-        departments = row.get("Which department(s) do you want to be in? (Pick up to 2)", "")
-        original_row = row.get("original_row_index")
-
-        if not email or not name:
-            print(f"Skipping row {original_row}: missing name or email")
-            continue
-       
-        print(f"Processing interview email: {name} ({email})")
-        name = name.title()
-        
-        booking_id = str(uuid.uuid4())
-        dept_param = str(departments) if departments else "Tech"
-        booking_link = f"{BOOKING_BASE_URL}?id={booking_id}&name={quote(name)}&email={quote(email)}&dept={quote(dept_param)}"
-        
-        if send_interview_email(name, email, dept_param, booking_link):
-            update_interview_sent_status(sheet, original_row, booking_id)
-            print(f"Successfully sent interview email to {name}")
-        else:
-            print(f"Failed to send interview email to {name}")
-   
+    # Sends already journaled by an earlier run are never repeated
+    try:
+        journal = open_journal()
+    except Exception as e:
+        print(f"Error: Could not read the send journal in {STATE_STORE}: {e}")
+        return summary
+
+    # Only now is there mail to send, so fetch the SMTP secrets up front
+    if PREFETCH_SECRETS:
+        _secret_cache.prefetch(PREFETCH_SECRET_IDS)
+
+    # One pool of authenticated SMTP sessions is shared by both phases, and
+    # status marks are buffered and written back in batches
+    mailer = SMTPPool(backends.smtp_transport, SMTP_POOL_SIZE)
+    status_buffer = StatusWriteBuffer(sheet, on_written=journal.written)
+    engine = DispatchEngine()
+
+    try:
+        # Welcome emails go to rows not yet marked sent; interview emails to rows
+        # marked Give Interview = "Yes" whose Interview Sent is still empty
+        with telemetry.span("select_send_jobs", rows=len(all_records_df)):
+            owned = shard.owns(all_records_df)
+            welcome_jobs, interview_jobs, skipped_welcome_rows = build_send_jobs(all_records_df[owned])
+        # Other shards' rows are theirs to send; this shard's checkpoint just moves past them
+        settled_rows = set(skipped_welcome_rows) | set(all_records_df["original_row_index"][~owned].tolist())
+        summary["rows"] = int(owned.sum())
+
+        def record_welcome(job):
+            if update_email_sent_status(status_buffer, job.row_index):
+                settled_rows.add(job.row_index)
+
+        def record_interview(job):
+            update_interview_sent_status(status_buffer, job.row_index, job.booking_id)
+
+        # Rows a previous run mailed but never marked only get their status mark
+        to_send, replay = journal.resume(welcome_jobs + interview_jobs)
+        welcome_jobs = [job for job in to_send if job.kind == "welcome"]
+        interview_jobs = [job for job in to_send if job.kind == "interview"]
+        for job in replay:
+            if job.kind == "welcome":
+                record_welcome(job)
+            else:
+                record_interview(job)
+
+        # Both phases share the engine's workers and run concurrently
+        welcome_phase = engine.submit(
+            "welcome", welcome_jobs,
+            send=journaled(journal, lambda job, message_id: send_welcome_email(
+                job.name, job.email, job.departments, transport=mailer, message_id=message_id)),
+            record=record_welcome,
+        )
+        interview_phase = engine.submit(
+            "interview", interview_jobs,
+            send=journaled(journal, lambda job, message_id: send_interview_email(
+                job.name, job.email, job.departments, job.booking_link, transport=mailer, message_id=message_id)),
+            record=record_interview,
+        )
+
+        sent, failed = welcome_phase.wait()
+        print(f"Welcome emails: {sent} sent, {failed} failed")
+        summary.update(welcome_sent=sent, welcome_failed=failed)
+        sent, failed = interview_phase.wait()
+        print(f"Interview emails: {sent} sent, {failed} failed")
+        summary.update(interview_sent=sent, interview_failed=failed)
+
+    finally:
+        # Always write back whatever was sent, even if the run is cut short
+        engine.shutdown(cancel_pending=True)
+        written = status_buffer.flush()
+        mailer.close()
+        journal_stats = journal.stats()
+
+    # Only move the checkpoint once every mark it covers is safely in the sheet
+    if cursor is not None and written:
+        try:
+            cursor.commit(all_records_df, settled_rows)
+        except Exception as e:
+            print(f"Failed to save ingestion checkpoint: {e}")
+
+    print(f"Sheet write-back stats: {status_buffer.stats()}")
+    print(f"SMTP stats: {mailer.stats()}")
+    print(f"Secret cache stats: {_secret_cache.stats()}")
+    print(f"API quota stats: {quota_stats()}")
+    print(f"Send journal stats: {journal_stats}")
     print("\nEmail automation process completed.")
+    summary.update(
+        status="ok" if written else "status marks pending",
+        replayed=journal_stats["replayed"], in_doubt=journal_stats["in_doubt"],
+    )
+    return summary
+
+
+def publish_shard_summary(shard, summary):
+    """Save this shard's summary in the state tab; the last shard to finish prints the total.
+
+    Returns the combined summary, or None while other shards of the
+    execution are still running.
+    """
+    store = SheetStateStore(backends.spreadsheet())
+    store.save(shard.summary_key, dict(summary, execution=shard.execution,
+                                       finished_at=datetime.now().isoformat(timespec="seconds")))
+    store.refresh()
+    summaries = [store.load(Shard(i, shard.count).summary_key) for i in range(shard.count)]
+    finished = [s for s in summaries if s and s.get("execution") == shard.execution]
+    if len(finished) < shard.count:
+        print(f"{len(finished)} of {shard.count} shards finished; the last one prints the execution summary")
+        return None
+
+    total = {"shards": shard.count, "statuses": {}}
+    for s in finished:
+        total["statuses"][s["status"]] = total["statuses"].get(s["status"], 0) + 1
+        for key, value in s.items():
+            if key == "seconds":
+                total[key] = max(total.get(key, 0), value)
+            elif isinstance(value, int) and not isinstance(value, bool):
+                total[key] = total.get(key, 0) + value
+    print(f"Execution {shard.execution} summary: {total}")
+    return total
+
+
+def run_job(shard):
+    """Entry point for one task: main() on its shard, then the cross-shard summary."""
+    if shard.sharded:
+        # Sheets and Gmail quotas are per account, so each task gets its share
+        for quota in (_sheets_read_quota, _sheets_write_quota, _smtp_quota):
+            quota.scale(1 / shard.count)
+    start = time.monotonic()
+    summary = main(shard)
+    summary["seconds"] = round(time.monotonic() - start, 1)
+    print(f"Run summary: {summary}")
+    if shard.sharded:
+        try:
+            publish_shard_summary(shard, summary)
+        except Exception as e:
+            print(f"Failed to publish the shard summary: {e}")
+    return summary
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Send welcome and interview emails for new form responses.")
+    parser.add_argument("--shard-index", type=int, default=TASK_INDEX,
+                        help="this task's shard (default: CLOUD_RUN_TASK_INDEX, else 0)")
+    parser.add_argument("--shard-count", type=int, default=TASK_COUNT,
+                        help="number of shards (default: CLOUD_RUN_TASK_COUNT, else 1)")
+    parser.add_argument("--execution", default=EXECUTION_ID,
+                        help="ID shared by the shards of one run (default: CLOUD_RUN_EXECUTION, else local-<date>)")
+    parser.add_argument("--resolve-in-doubt", choices=("sent", "resend"),
+                        help="settle the sends a crashed run left in doubt, as delivered or to be sent again, and exit")
+    args = parser.parse_args()
+    try:
+        shard = Shard(args.shard_index, args.shard_count, args.execution)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        if args.resolve_in_doubt:
+            print(f"Settled {open_journal().resolve_in_doubt(args.resolve_in_doubt)} in-doubt sends")
+        else:
+            run_job(shard)
+    finally:
+        # Latency histograms of every external call, including runs that exit early
+        telemetry.report()
@@ -0,0 +1,9 @@
+"""Clients and policies shared by the email job (main.py) and the booking page (booking-page/).
+
+Each service configures its own instances: service name, pool sizes and
+retry budgets differ, while the environment variables read here mean the
+same thing in both. The booking page's image is built from the repository
+root so this package is in its context:
+
+    docker build -f booking-page/Dockerfile .
+"""
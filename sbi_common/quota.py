@@ -0,0 +1,236 @@
+"""Client-side pacing and retries for calls to quota-limited APIs."""
+import random
+import smtplib
+import sys
+import threading
+import time
+
+QUOTA_BURST = 10
+# A 429 halves the pace (down to this fraction of the quota) at most once per interval;
+# each interval without one adds back a step
+QUOTA_MIN_RATE_FRACTION = 0.125
+QUOTA_RECOVERY_STEP = 0.05
+QUOTA_ADJUST_INTERVAL = 1.0
+RETRYABLE_HTTP_STATUSES = {429, 500, 502, 503, 504}
+RETRYABLE_SMTP_CODES = {421, 450, 451, 452}
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second after an initial burst.
+
+    Callers reserve a token and sleep off any debt, so waiters are served in
+    arrival order. `waiting` is the number of callers currently held back
+    and `throttled_seconds` the total time they were made to wait.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.waiting = 0
+        self.throttled_seconds = 0.0
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """Take a token and return the seconds to wait before using it (0 when one was free)."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.throttled_seconds += wait
+            return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait <= 0:
+            return
+        with self._lock:
+            self.waiting += 1
+        try:
+            time.sleep(wait)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    async def acquire_async(self):
+        """acquire() for coroutines: waits on the event loop instead of blocking a thread."""
+        import asyncio
+        wait = self.reserve()
+        if wait <= 0:
+            return
+        with self._lock:
+            self.waiting += 1
+        try:
+            await asyncio.sleep(wait)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+
+def http_status(error):
+    """The HTTP status an API error carries, else None."""
+    # gspread APIError carries a requests response, googleapiclient HttpError an httplib2 one
+    # and booking_asgi's GoogleAPIError the status itself
+    response = getattr(error, "response", None)
+    status = (getattr(response, "status_code", None) or getattr(getattr(error, "resp", None), "status", None)
+              or getattr(error, "status", None))
+    return int(status) if isinstance(status, (int, str)) else None
+
+
+def smtp_code(error):
+    """The SMTP reply code of a smtplib or aiosmtplib error, else None.
+
+    An aiosmtplib connection that drops, is refused or times out counts as
+    421, the code a server sends when it closes the session itself.
+    """
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code
+    # Only the booking page's async sender uses aiosmtplib, so don't import it for everyone else
+    aiosmtplib = sys.modules.get("aiosmtplib")
+    if aiosmtplib is None:
+        return None
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return error.code
+    if isinstance(error, (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, aiosmtplib.SMTPTimeoutError)):
+        return 421
+    return None
+
+
+def transient_status(error):
+    """The HTTP status or SMTP code of an error worth retrying (rate limit or server-side), else None."""
+    code = smtp_code(error)
+    if code is not None:
+        return code if code in RETRYABLE_SMTP_CODES else None
+    status = http_status(error)
+    return status if status in RETRYABLE_HTTP_STATUSES else None
+
+
+def retry_after(error):
+    """Seconds an error's Retry-After header asks to wait, else None."""
+    # A requests Response for a 4xx/5xx is falsy, so test for presence rather than truth
+    response = getattr(error, "response", None)
+    if response is None:
+        response = getattr(error, "resp", None)
+    headers = getattr(response, "headers", response) if response is not None else getattr(error, "headers", None)
+    try:
+        return float(headers.get("Retry-After") or headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class QuotaLimiter:
+    """Token bucket plus retry policy shared by every call to one external API.
+
+    Each attempt waits for a token. A 429 or 5xx (or a transient SMTP 4xx) is
+    retried up to max_attempts with exponential backoff (backoff_base doubling
+    per attempt, capped at backoff_max) and full jitter, never sooner than a
+    Retry-After header asks. Calls that aren't safe to repeat
+    (idempotent=False) are only retried on 429, which means the request was
+    rejected unprocessed. A 429 also halves the pace, which then climbs back
+    towards `rate` a step per second while calls succeed, so a long backlog
+    settles just under the real quota instead of failing.
+    """
+
+    def __init__(self, name, rate, burst=QUOTA_BURST, max_attempts=5, backoff_base=1.0, backoff_max=32.0):
+        self.name = name
+        self.rate = rate
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = RateLimiter(rate, burst)
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.backoff_seconds = 0.0
+        self._next_adjust = 0.0
+        self._lock = threading.Lock()
+
+    def call(self, fn, *args, idempotent=True, **kwargs):
+        attempt = 1
+        while True:
+            self.bucket.acquire()
+            with self._lock:
+                self.calls += 1
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, idempotent)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._recover()
+            return result
+
+    async def call_async(self, fn, *args, idempotent=True, **kwargs):
+        """call() for coroutine functions, sleeping on the event loop."""
+        import asyncio
+        attempt = 1
+        while True:
+            await self.bucket.acquire_async()
+            with self._lock:
+                self.calls += 1
+            try:
+                result = await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt, idempotent)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._recover()
+            return result
+
+    def _recover(self):
+        if self.bucket.rate < self.rate and time.monotonic() >= self._next_adjust:
+            with self._lock:
+                self._next_adjust = time.monotonic() + QUOTA_ADJUST_INTERVAL
+            self.bucket.set_rate(min(self.rate, self.bucket.rate + self.rate * QUOTA_RECOVERY_STEP))
+
+    def _retry_delay(self, error, attempt, idempotent):
+        status = transient_status(error)
+        if status is None or attempt >= self.max_attempts or (status != 429 and not idempotent):
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        delay = max(delay, retry_after(error) or 0)
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+            # Callers rejected by the same overload only slow the pace once
+            if status == 429:
+                self.rate_limited += 1
+                if time.monotonic() >= self._next_adjust:
+                    self.bucket.set_rate(max(self.rate * QUOTA_MIN_RATE_FRACTION, self.bucket.rate / 2))
+                    self._next_adjust = time.monotonic() + QUOTA_ADJUST_INTERVAL
+        print(f"{self.name}: got {status}, retry {attempt}/{self.max_attempts - 1} in {delay:.1f}s")
+        return delay
+
+    def scale(self, factor):
+        """Pace at `factor` times the configured rate, e.g. one task's share of a quota."""
+        self.rate *= factor
+        self.bucket.set_rate(self.bucket.rate * factor)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "waiting": self.bucket.waiting,
+            "throttled_seconds": round(self.bucket.throttled_seconds + self.backoff_seconds, 3),
+            "rate_per_second": round(self.bucket.rate, 3),
+        }
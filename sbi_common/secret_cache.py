@@ -0,0 +1,79 @@
+"""Secret Manager reads behind a process-wide TTL cache."""
+import os
+import threading
+import time
+
+SECRET_CACHE_TTL = int(os.environ.get("SECRET_CACHE_TTL", "3600"))
+
+
+class SecretCache:
+    """Process-wide secret cache: TTL expiry and hit/miss counters.
+
+    Misses go through `source` (the service's backends.secret, which is
+    fetch() unless a stand-in has been installed) and are timed as a
+    secretmanager.access span.
+    """
+
+    def __init__(self, telemetry, source=None, ttl=SECRET_CACHE_TTL):
+        self.telemetry = telemetry
+        self.source = source or self.fetch
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._client = None
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, secret_id):
+        """Return a cached secret, fetching it when missing or expired."""
+        with self._lock:
+            cached = self._values.get(secret_id)
+            if cached is not None and cached[1] > time.monotonic():
+                self.hits += 1
+                return cached[0]
+
+            # Fetch under the lock so concurrent callers share a single RPC
+            self.misses += 1
+            with self.telemetry.span("secretmanager.access", secret_id=secret_id):
+                value = self.source(secret_id)
+            self._values[secret_id] = (value, time.monotonic() + self.ttl)
+            return value
+
+    def fetch(self, secret_id):
+        """Read the latest version of a secret from Secret Manager, bypassing the cache."""
+        if self._client is None:
+            from google.cloud import secretmanager
+            self._client = secretmanager.SecretManagerServiceClient()
+        project_id = os.environ.get("GOOGLE_CLOUD_PROJECT")
+        name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
+        response = self._client.access_secret_version(request={"name": name})
+        return response.payload.data.decode("UTF-8")
+
+    def prefetch(self, secret_ids):
+        """Warm the cache at startup so the first caller doesn't pay for the fetch."""
+        for secret_id in secret_ids:
+            try:
+                self.get(secret_id)
+            except Exception as e:
+                print(f"Warning: Could not prefetch secret '{secret_id}': {e}")
+
+    def reset_client(self):
+        """Close the gRPC client, which can't be shared across fork(); cached values are kept."""
+        with self._lock:
+            if self._client is not None:
+                try:
+                    self._client.transport.close()
+                except Exception:
+                    pass
+            self._client = None
+
+    def invalidate(self, secret_id=None):
+        """Drop one cached secret, or all of them."""
+        with self._lock:
+            if secret_id is None:
+                self._values.clear()
+            else:
+                self._values.pop(secret_id, None)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "cached": len(self._values)}
@@ -0,0 +1,148 @@
+"""Pooled, long-lived SMTP sessions for outgoing mail."""
+import os
+import queue
+import smtplib
+import ssl
+import threading
+import time
+
+SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+# Set SMTP_STARTTLS=0 only for a plain-text local server such as the benchmark sink
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") == "1"
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.environ.get("SMTP_MAX_MESSAGES_PER_CONNECTION", "90"))
+SMTP_IDLE_TIMEOUT = int(os.environ.get("SMTP_IDLE_TIMEOUT", "240"))
+SMTP_TIMEOUT = 30
+
+
+class SMTPTransport:
+    """Authenticated SMTP session that stays open across sends.
+
+    The connection is opened lazily and re-established when the server drops
+    it, when it has sat idle longer than idle_timeout, or once max_messages
+    have gone through it. credentials_provider() returns (user, password)
+    and is called on every login, so rotated credentials are picked up.
+    """
+
+    def __init__(self, credentials_provider, telemetry, host=SMTP_SERVER, port=SMTP_PORT,
+                 max_messages=SMTP_MAX_MESSAGES_PER_CONNECTION, idle_timeout=SMTP_IDLE_TIMEOUT,
+                 timeout=SMTP_TIMEOUT, starttls=SMTP_STARTTLS):
+        self.credentials_provider = credentials_provider
+        self.telemetry = telemetry
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.connections_opened = 0
+        self.messages_sent = 0
+        self._server = None
+        self._sent_on_connection = 0
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._disconnect()
+        sender_email, sender_password = self.credentials_provider()
+        with self.telemetry.span("smtp.connect", host=self.host):
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    server.starttls(context=ssl.create_default_context())
+                server.login(sender_email, sender_password)
+            except Exception:
+                server.close()
+                raise
+        self._server = server
+        self._sent_on_connection = 0
+        self.connections_opened += 1
+
+    def _disconnect(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+    def _is_stale(self):
+        return (
+            self._server is None
+            or self._sent_on_connection >= self.max_messages
+            or time.monotonic() - self._last_used > self.idle_timeout
+        )
+
+    def send(self, sender, recipient, message):
+        """Send a MIME message, reconnecting once if the session was dropped."""
+        body = message.as_string()
+        with self._lock, self.telemetry.span("smtp.send", bytes=len(body)) as span:
+            if self._is_stale():
+                self._connect()
+            try:
+                self._server.sendmail(sender, recipient, body)
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                print(f"SMTP connection lost ({e}), reconnecting")
+                span.set("reconnected", True)
+                self._connect()
+                self._server.sendmail(sender, recipient, body)
+            except smtplib.SMTPResponseException as e:
+                # 421 means the server is closing the session, so retry on a fresh one
+                if e.smtp_code != 421:
+                    raise
+                print(f"SMTP server closed the session ({e.smtp_code}), reconnecting")
+                span.set("reconnected", True)
+                self._connect()
+                self._server.sendmail(sender, recipient, body)
+            self._sent_on_connection += 1
+            self.messages_sent += 1
+            self._last_used = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SMTPPool:
+    """Small fixed-size pool of transports, safe to share between threads.
+
+    Idle sessions are handed out most-recently-used first, so a sequential caller
+    keeps reusing one warm connection and extra sessions are only opened under
+    concurrent load.
+    """
+
+    def __init__(self, transport_factory, size):
+        self._transports = [transport_factory() for _ in range(max(1, size))]
+        self._idle = queue.LifoQueue()
+        for transport in reversed(self._transports):
+            self._idle.put(transport)
+
+    def send(self, sender, recipient, message):
+        transport = self._idle.get()
+        try:
+            transport.send(sender, recipient, message)
+        finally:
+            self._idle.put(transport)
+
+    def close(self):
+        for transport in self._transports:
+            transport.close()
+
+    def stats(self):
+        return {
+            "connections_opened": sum(t.connections_opened for t in self._transports),
+            "messages_sent": sum(t.messages_sent for t in self._transports),
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
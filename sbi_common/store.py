@@ -0,0 +1,260 @@
+"""Small JSON records in a store every task and instance shares, with atomic claims.
+
+Records are addressed by slash-separated keys. create() only succeeds when
+the key is new, and replace()/delete() only when the record is still at the
+generation the caller read, so two processes racing for the same key can't
+both win. In production the store is a Cloud Storage bucket (object
+generations and if_generation_match preconditions do the work); locally it
+is a directory guarded by a file lock.
+
+open_store() picks the backend from a location: "gs://bucket/prefix" or a
+directory path.
+"""
+import abc
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+
+def open_store(location, telemetry):
+    """RecordStore for a "gs://bucket/prefix" location, or a LocalRecordStore for a directory."""
+    if location.startswith("gs://"):
+        from google.cloud import storage
+        bucket_name, _, prefix = location[len("gs://"):].partition("/")
+        return GCSRecordStore(storage.Client().bucket(bucket_name), prefix, telemetry)
+    return LocalRecordStore(location)
+
+
+def is_shared(store):
+    """Whether other machines see this store's records (a local directory only serves one host)."""
+    return not isinstance(store, LocalRecordStore)
+
+
+class RecordStore(abc.ABC):
+    """JSON records with create-if-absent and compare-and-swap updates.
+
+    Generations are opaque: pass back what read(), create() or replace()
+    returned. A None generation or False result means another writer got
+    there first; errors reaching the store itself are raised.
+    """
+
+    @abc.abstractmethod
+    def create(self, key, record):
+        """Store `record` under a new key; returns its generation, or None if the key exists."""
+
+    @abc.abstractmethod
+    def read(self, key):
+        """Returns (record, generation), or (None, None) when there is no such key."""
+
+    @abc.abstractmethod
+    def replace(self, key, record, generation):
+        """Overwrite a record still at `generation`; returns the new generation, or None if it changed."""
+
+    @abc.abstractmethod
+    def delete(self, key, generation=None):
+        """Remove a record (only if still at `generation`, when given); returns whether it was removed."""
+
+    @abc.abstractmethod
+    def list(self, prefix):
+        """[(key, record, generation)] for every record whose key starts with `prefix`."""
+
+    def stats(self):
+        return {}
+
+
+class LocalRecordStore(RecordStore):
+    """RecordStore in a directory: one JSON file per key, written atomically under an flock.
+
+    The lock is taken per operation, so processes on the same host (e.g.
+    gunicorn workers) see each other's writes. Only suitable for a single
+    machine: development, tests and the benchmarks.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock_path = os.path.join(directory, ".lock")
+        self._thread_lock = threading.Lock()
+
+    def __repr__(self):
+        return f"LocalRecordStore({self.directory!r})"
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock, open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, key):
+        # Keys can carry request data, so one must never name a file outside the directory
+        parts = key.split("/")
+        if any(part in ("", ".", "..") for part in parts):
+            raise ValueError(f"Invalid record key: {key!r}")
+        path = os.path.join(self.directory, *parts) + ".json"
+        root = os.path.realpath(self.directory)
+        if os.path.commonpath([root, os.path.realpath(path)]) != root:
+            raise ValueError(f"Record key {key!r} points outside {self.directory}")
+        return path
+
+    def _load(self, key):
+        try:
+            with open(self._path(key)) as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return None, None
+        return stored["record"], stored["generation"]
+
+    def _write(self, key, record, generation):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"generation": generation, "record": record}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        return generation
+
+    def create(self, key, record):
+        with self._locked():
+            if self._load(key)[1] is not None:
+                return None
+            return self._write(key, record, 1)
+
+    def read(self, key):
+        with self._locked():
+            return self._load(key)
+
+    def replace(self, key, record, generation):
+        with self._locked():
+            if self._load(key)[1] != generation:
+                return None
+            return self._write(key, record, generation + 1)
+
+    def delete(self, key, generation=None):
+        with self._locked():
+            current = self._load(key)[1]
+            if current is None or (generation is not None and current != generation):
+                return False
+            os.remove(self._path(key))
+            return True
+
+    def list(self, prefix):
+        records = []
+        with self._locked():
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(".json"):
+                        continue
+                    relative = os.path.relpath(os.path.join(root, name[:-len(".json")]), self.directory)
+                    key = relative.replace(os.sep, "/")
+                    if key.startswith(prefix):
+                        record, generation = self._load(key)
+                        if generation is not None:
+                            records.append((key, record, generation))
+        return sorted(records, key=lambda item: item[0])
+
+
+class GCSRecordStore(RecordStore):
+    """RecordStore in a Cloud Storage bucket: one JSON object per key under `prefix`.
+
+    Preconditions on the object generation make create, replace and delete
+    atomic across every process using the bucket. The client retries
+    conditional writes by itself, so a 412 may be our own earlier attempt
+    landing: the object is read back and the write counts as done when it
+    holds exactly what was written. Records are cached per generation, so
+    list() only downloads objects that changed since the last call.
+    """
+
+    def __init__(self, bucket, prefix, telemetry):
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.telemetry = telemetry
+        self.downloads = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"GCSRecordStore(gs://{self.bucket.name}/{self.prefix})"
+
+    @staticmethod
+    def _encode(record):
+        return json.dumps(record, sort_keys=True)
+
+    def _download(self, blob, generation=None):
+        from google.api_core import exceptions
+        with self.telemetry.span("gcs.download"):
+            try:
+                data = blob.download_as_bytes(if_generation_match=generation)
+            except (exceptions.NotFound, exceptions.PreconditionFailed):
+                return None, None
+        self.downloads += 1
+        record = json.loads(data)
+        with self._lock:
+            self._cache[blob.name] = (blob.generation, record)
+        return record, blob.generation
+
+    def _upload(self, key, record, generation):
+        from google.api_core import exceptions
+        blob = self.bucket.blob(self.prefix + key)
+        data = self._encode(record)
+        with self.telemetry.span("gcs.upload", create=generation == 0):
+            try:
+                blob.upload_from_string(data, content_type="application/json", if_generation_match=generation)
+            except exceptions.PreconditionFailed:
+                current, current_generation = self.read(key)
+                return current_generation if current is not None and self._encode(current) == data else None
+        with self._lock:
+            self._cache[blob.name] = (blob.generation, record)
+        return blob.generation
+
+    def create(self, key, record):
+        return self._upload(key, record, 0)
+
+    def read(self, key):
+        return self._download(self.bucket.blob(self.prefix + key))
+
+    def replace(self, key, record, generation):
+        return self._upload(key, record, generation)
+
+    def delete(self, key, generation=None):
+        from google.api_core import exceptions
+        blob = self.bucket.blob(self.prefix + key)
+        with self.telemetry.span("gcs.delete"):
+            try:
+                blob.delete(if_generation_match=generation)
+            except (exceptions.NotFound, exceptions.PreconditionFailed):
+                return False
+        with self._lock:
+            self._cache.pop(blob.name, None)
+        return True
+
+    def list(self, prefix):
+        with self.telemetry.span("gcs.list") as span:
+            blobs = list(self.bucket.list_blobs(prefix=self.prefix + prefix))
+            span.set("objects", len(blobs))
+        records = []
+        for blob in blobs:
+            with self._lock:
+                cached = self._cache.get(blob.name)
+            if cached is not None and cached[0] == blob.generation:
+                record = cached[1]
+            else:
+                # Pin the listed generation; an object replaced or deleted since is skipped
+                record, _ = self._download(blob, blob.generation)
+                if record is None:
+                    continue
+            records.append((blob.name[len(self.prefix):], record, blob.generation))
+        with self._lock:
+            listed = {blob.name for blob in blobs}
+            for name in [name for name in self._cache if name.startswith(self.prefix + prefix) and name not in listed]:
+                del self._cache[name]
+        return records
+
+    def stats(self):
+        return {"downloads": self.downloads, "cached": len(self._cache)}
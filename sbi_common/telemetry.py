@@ -0,0 +1,138 @@
+"""Timed spans around external calls, aggregated into latency histograms."""
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    from opentelemetry import trace as otel_trace, metrics as otel_metrics
+except ImportError:  # optional: spans are still timed and exported locally
+    otel_trace = otel_metrics = None
+
+# TELEMETRY_EXPORT=console or json also prints each span (json: one object per line)
+TELEMETRY_EXPORT = os.environ.get("TELEMETRY_EXPORT", "")
+# OpenTelemetry's default explicit bucket boundaries
+HISTOGRAM_BOUNDS_MS = (0, 5, 10, 25, 50, 75, 100, 250, 500, 750, 1000, 2500, 5000, 7500, 10000)
+
+
+class Span:
+    """One timed call; attributes set while it runs are exported with it."""
+
+    def __init__(self, name, attributes, otel_span=None):
+        self.name = name
+        self.attributes = attributes
+        self.duration_ms = None
+        self._otel_span = otel_span
+
+    def set(self, key, value):
+        self.attributes[key] = value
+        if self._otel_span is not None:
+            self._otel_span.set_attribute(key, value)
+
+
+class Telemetry:
+    """Timed spans around external calls, aggregated into per-call latency histograms.
+
+    Spans are also handed to the OpenTelemetry API when it is installed (a
+    no-op until an SDK and exporter are configured), so the same calls show
+    up in a real tracing backend without code changes. While a context is
+    collecting (see collect()), its spans are also kept in a list, e.g. for
+    a request's Server-Timing header.
+    """
+
+    def __init__(self, service, export=TELEMETRY_EXPORT, bounds=HISTOGRAM_BOUNDS_MS):
+        self.service = service
+        self.export = export
+        self.bounds = bounds
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._collected = contextvars.ContextVar("collected_spans", default=None)
+        self._tracer = otel_trace.get_tracer(service) if otel_trace else None
+        self._otel_histogram = otel_metrics.get_meter(service).create_histogram(
+            "external_call.duration", unit="ms", description="Duration of calls to external services",
+        ) if otel_metrics else None
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Time the enclosed call; yields a Span for adding attributes such as row counts."""
+        otel_context = self._tracer.start_as_current_span(name, attributes=attributes) if self._tracer else nullcontext()
+        with otel_context as otel_span:
+            span = Span(name, attributes, otel_span)
+            start = time.perf_counter()
+            try:
+                yield span
+            except Exception as e:
+                span.set("error", type(e).__name__)
+                raise
+            finally:
+                span.duration_ms = (time.perf_counter() - start) * 1000
+                self._record(span)
+
+    def collect(self):
+        """Start keeping the spans of the current context; returns the list they are appended to."""
+        spans = []
+        self._collected.set(spans)
+        return spans
+
+    def stop_collecting(self):
+        self._collected.set(None)
+
+    def _record(self, span):
+        with self._lock:
+            histogram = self._histograms.get(span.name)
+            if histogram is None:
+                histogram = self._histograms[span.name] = {
+                    "count": 0, "errors": 0, "sum_ms": 0.0, "min_ms": span.duration_ms, "max_ms": 0.0,
+                    "bucket_counts": [0] * (len(self.bounds) + 1),
+                }
+            histogram["count"] += 1
+            histogram["errors"] += "error" in span.attributes
+            histogram["sum_ms"] += span.duration_ms
+            histogram["min_ms"] = min(histogram["min_ms"], span.duration_ms)
+            histogram["max_ms"] = max(histogram["max_ms"], span.duration_ms)
+            histogram["bucket_counts"][bisect.bisect_left(self.bounds, span.duration_ms)] += 1
+        collected = self._collected.get()
+        if collected is not None:
+            collected.append(span)
+        if self._otel_histogram is not None:
+            self._otel_histogram.record(span.duration_ms, {"call": span.name, "error": "error" in span.attributes})
+        if self.export == "json":
+            print(json.dumps({"service": self.service, "span": span.name,
+                              "duration_ms": round(span.duration_ms, 3), "attributes": span.attributes}))
+        elif self.export == "console":
+            details = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+            print(f"[span] {span.name} {span.duration_ms:.1f}ms {details}".rstrip())
+
+    def histograms(self):
+        """{span name: count, errors, sum/min/max ms and bucket counts over bounds_ms}."""
+        with self._lock:
+            return {
+                name: dict(histogram, bucket_counts=list(histogram["bucket_counts"]), bounds_ms=list(self.bounds))
+                for name, histogram in sorted(self._histograms.items())
+            }
+
+    def report(self):
+        """Print the histograms: one JSON object per call with TELEMETRY_EXPORT=json, else a summary line each."""
+        for name, histogram in self.histograms().items():
+            if self.export == "json":
+                print(json.dumps({"service": self.service, "histogram": name, **histogram}))
+            else:
+                print(f"{name}: {histogram['count']} calls, {histogram['errors']} errors, "
+                      f"avg {histogram['sum_ms'] / histogram['count']:.1f}ms, max {histogram['max_ms']:.1f}ms")
+
+
+def server_timing(spans, total_ms):
+    """Server-Timing header value: time per call name (summed over repeats) and the request total."""
+    totals = {}
+    for span in spans:
+        duration, count = totals.get(span.name, (0.0, 0))
+        totals[span.name] = (duration + span.duration_ms, count + 1)
+    entries = [
+        f'{name};dur={duration:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for name, (duration, count) in totals.items()
+    ]
+    entries.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(entries)
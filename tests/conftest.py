@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# main.py lives at the root, booking.py and the stand-ins in their own directories
+for path in (ROOT, os.path.join(ROOT, "booking-page"), os.path.join(ROOT, "benchmarks")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture(params=["local", "gcs"])
+def store(request, tmp_path):
+    """A state store of each backend: a local directory, and a Cloud Storage bucket faked in memory."""
+    from fakes import FakeBucket
+    from sbi_common.store import GCSRecordStore, LocalRecordStore
+    from sbi_common.telemetry import Telemetry
+
+    if request.param == "local":
+        return LocalRecordStore(str(tmp_path / "state"))
+    return GCSRecordStore(FakeBucket(), "tests", Telemetry("tests"))
+
+
+@pytest.fixture
+def unpaced(monkeypatch):
+    """Lift the job's Sheets pacing: the fakes have no quota to protect."""
+    import main
+
+    for quota in (main._sheets_read_quota, main._sheets_write_quota):
+        monkeypatch.setattr(quota.bucket, "rate", 0)
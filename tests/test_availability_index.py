@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import booking
+
+YEAR = datetime.now().year
+DAYS = [date(YEAR, 2, 10), date(YEAR, 2, 11), date(YEAR, 2, 13), date(YEAR, 2, 16), date(YEAR + 1, 2, 11)]
+BLOCK_LISTS = [
+    ["10AM-6PM"],
+    ["9AM-11AM", "1PM-3:30PM", "7PM-9PM"],
+    ["9:30AM-12PM", "2/11&1PM-5PM"],
+    ["2/11-2/15&10AM-2PM", f"2/16/{YEAR}&6PM-9PM"],
+    [f"{YEAR}-02-13&9AM-10AM", "11AM-11:30AM"],
+    ["not a block", "2/30&10AM-2PM", "3PM-1PM", "10AM-12PM"],
+]
+
+
+def per_slot_check(slot_start, availability_blocks, date_str):
+    """is_slot_available as it was before the index: every block re-parsed for every slot."""
+    if not availability_blocks:
+        return True
+    slot_time = datetime.fromisoformat(slot_start)
+    for block in availability_blocks:
+        try:
+            start_date, end_date, time_range = booking.parse_availability_block(block)
+            if start_date is not None and end_date is not None and not (start_date <= slot_time.date() <= end_date):
+                continue
+            if '-' not in time_range:
+                continue
+            start_str, end_str = time_range.split('-')
+            start_hour, start_minute = booking.parse_time_string(start_str)
+            end_hour, end_minute = booking.parse_time_string(end_str)
+            if start_hour is None or end_hour is None:
+                continue
+            day = datetime.strptime(date_str, '%Y-%m-%d')
+            block_start = day.replace(hour=start_hour, minute=start_minute)
+            block_end = day.replace(hour=end_hour, minute=end_minute)
+            if slot_time >= block_start and slot_time + timedelta(minutes=30) <= block_end:
+                return True
+        except Exception:
+            continue
+    return False
+
+
+@pytest.mark.parametrize("blocks", BLOCK_LISTS + [[]])
+def test_index_gives_the_per_slot_answers(blocks):
+    index = booking.AvailabilityIndex(blocks)
+    for day in DAYS:
+        slots = booking.generate_time_slots(day.isoformat())
+        expected = [slot for slot in slots if per_slot_check(slot['start'], blocks, day.isoformat())]
+
+        assert index.available_slots(slots, day) == expected
+        assert [slot for slot in slots if booking.is_slot_available(slot['start'], blocks, day.isoformat())] == expected
+
+
+def test_overlapping_blocks_are_merged():
+    # The per-slot check needed one block to hold the whole slot; the index merges 10-10:45 and 10:30-12
+    index = booking.AvailabilityIndex(["10AM-10:45AM", "10:30AM-12PM"])
+    day = DAYS[0]
+
+    assert index.is_available(datetime(day.year, day.month, day.day, 10, 30), datetime(day.year, day.month, day.day, 11))
+    assert [slot['start'][11:16] for slot in index.available_slots(booking.generate_time_slots(day.isoformat()), day)] \
+        == ["10:00", "10:30", "11:00", "11:30"]
@@ -0,0 +1,179 @@
+import time
+import uuid
+from datetime import date
+
+import pytest
+
+import booking
+from fakes import FakeCalendarService
+from sbi_common.store import LocalRecordStore
+
+CALENDAR = booking.DEFAULT_CALENDAR
+START, END = "2030-03-04T10:00:00", "2030-03-04T10:30:00"
+B1, B2 = str(uuid.uuid4()), str(uuid.uuid4())
+
+
+@pytest.fixture
+def ledger(store):
+    return booking.BookingLedger(store, ttl=300, cache_ttl=0)
+
+
+def reservation(booking_id, calendar_id=CALENDAR, start_time=START):
+    return {
+        "booking_id": booking_id, "calendar_id": calendar_id, "start_time": start_time, "end_time": END,
+        "name": "Ann", "email": "ann@example.com", "department": "Tech", "location": "Room 1",
+    }
+
+
+@pytest.fixture
+def later(monkeypatch):
+    """Move the clock forward by some seconds."""
+    def advance(seconds):
+        now = time.time() + seconds
+        monkeypatch.setattr(time, "time", lambda: now)
+    return advance
+
+
+def test_reserving_a_booking_id_twice_returns_the_first_booking(ledger):
+    assert ledger.reserve(reservation("b1")) == (ledger.RESERVED, None)
+
+    outcome, record = ledger.reserve(reservation("b1"))
+    assert (outcome, record["status"]) == (ledger.EXISTING, "reserved")
+
+    ledger.confirm("b1", "event-1")
+    outcome, record = ledger.reserve(reservation("b1"))
+    assert (outcome, record["status"], record["event_id"]) == (ledger.EXISTING, "confirmed", "event-1")
+
+
+def test_a_slot_is_held_by_one_booking(ledger):
+    ledger.reserve(reservation("b1"))
+
+    outcome, holder = ledger.reserve(reservation("b2"))
+    assert (outcome, holder["booking_id"]) == (ledger.TAKEN, "b1")
+    assert ledger.get("b2") is None
+    assert ledger.reserve(reservation("b3", calendar_id="other@example.com"))[0] == ledger.RESERVED
+    assert ledger.taken_slots(CALENDAR, date(2030, 3, 4)) == {START}
+
+
+def test_released_slot_can_be_booked_again(ledger):
+    ledger.reserve(reservation("b1"))
+    ledger.release("b1")
+
+    assert ledger.taken_slots(CALENDAR, date(2030, 3, 4)) == set()
+    assert ledger.reserve(reservation("b2"))[0] == ledger.RESERVED
+
+
+def test_unconfirmed_reservation_is_reclaimed_after_its_ttl(ledger, later):
+    ledger.reserve(reservation("b1"))
+    later(301)
+
+    assert ledger.taken_slots(CALENDAR, date(2030, 3, 4)) == set()
+    assert ledger.reserve(reservation("b2"))[0] == ledger.RESERVED
+    # b1's retry takes its own expired booking over, but the slot is b2's now
+    outcome, holder = ledger.reserve(reservation("b1"))
+    assert (outcome, holder["booking_id"]) == (ledger.TAKEN, "b2")
+
+
+def test_confirmed_booking_never_expires(ledger, later):
+    ledger.reserve(reservation("b1"))
+    ledger.confirm("b1", "event-1")
+    later(10 * 86400)
+
+    assert ledger.reserve(reservation("b2"))[0] == ledger.TAKEN
+    assert ledger.taken_slots(CALENDAR, date(2030, 3, 4)) == {START}
+
+
+def test_a_window_of_days_costs_one_list_per_month(ledger):
+    for booking_id, start_time in (("b1", "2030-03-31T10:00:00"), ("b2", "2030-04-02T09:30:00"),
+                                   ("b3", "2030-04-20T10:00:00"), ("b4", "2030-03-04T10:00:00")):
+        ledger.reserve(reservation(booking_id, start_time=start_time))
+    lists = ledger.lists
+
+    taken = ledger.taken_between(CALENDAR, date(2030, 3, 20), date(2030, 4, 20))
+
+    assert taken == {"2030-03-31": {"2030-03-31T10:00:00"}, "2030-04-02": {"2030-04-02T09:30:00"}}
+    assert ledger.lists - lists == 2
+
+
+class QueueStub:
+    def __init__(self):
+        self.jobs = []
+
+    def enqueue(self, kind, payload):
+        self.jobs.append((kind, payload))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    calendar = FakeCalendarService()
+    monkeypatch.setattr(booking.backends, "calendar_service", lambda: calendar)
+    monkeypatch.setattr(booking, "_ledger", booking.BookingLedger(LocalRecordStore(str(tmp_path)), ttl=300))
+    monkeypatch.setattr(booking, "_job_queue", QueueStub())
+    booking._busy_cache.invalidate()
+    client = booking.app.test_client()
+
+    def book(booking_id=B1, start_time=START, end_time=END):
+        return client.post("/book", data={
+            "booking_id": booking_id, "name": "Ann", "email": "ann@example.com", "department": "Tech",
+            "start_time": start_time, "end_time": end_time, "location": "Room 1",
+        })
+    book.calendar = calendar
+    return book
+
+
+def test_double_submit_creates_one_event(app):
+    assert app().status_code == 200
+    assert app().status_code == 200
+
+    assert len(app.calendar.events_by_calendar[booking.DEPARTMENT_CALENDARS.get("Tech", CALENDAR)]) == 1
+    assert len(booking._job_queue.jobs) == 1
+
+
+def test_retry_after_a_crash_between_insert_and_confirm_keeps_the_first_event(app, later):
+    calendar_id = booking.DEPARTMENT_CALENDARS.get("Tech", CALENDAR)
+    booking._ledger.reserve(dict(reservation(B1, calendar_id), department="Tech"))
+    # The first attempt's event was created, then its instance was stopped
+    app.calendar.insert(calendar_id, booking.build_interview_event(
+        "Ann", "ann@example.com", "Tech", START, END, "Room 1", event_id=booking.interview_event_id(B1))).execute()
+    later(301)
+
+    assert app().status_code == 200
+    assert len(app.calendar.events_by_calendar[calendar_id]) == 1
+    assert booking._ledger.get(B1)["event_id"] == booking.interview_event_id(B1)
+    assert len(booking._job_queue.jobs) == 1
+
+
+def test_other_booking_for_a_booked_slot_is_refused(app):
+    assert app(B1).status_code == 200
+    response = app(B2)
+    assert response.status_code == 409
+    assert b'&date=2030-03-04">' in response.data
+
+
+def test_slot_taken_page_escapes_the_date():
+    body, _ = booking.render_slot_taken_page(B1, "Ann", "ann@example.com", "Tech", '"><script>x</script>')
+
+    assert "<script>" not in body
+
+
+@pytest.mark.parametrize("booking_id, start_time, end_time", [
+    ("../../../escaped/owned", START, END),
+    (B1, "2030-03-04T10:00:00/../../x", END),
+    (B1, "2030-03-04T10:10:00", "2030-03-04T10:40:00"),
+    (B1, "2030-03-04T22:00:00", "2030-03-04T22:30:00"),
+    (B1, START, "2030-03-04T11:30:00"),
+], ids=["path in booking id", "path in start time", "off the half hour", "after hours", "wrong end"])
+def test_malformed_booking_is_refused_before_the_ledger(app, tmp_path, booking_id, start_time, end_time):
+    assert app(booking_id, start_time, end_time).status_code == 400
+
+    assert booking._ledger.store.list("") == []
+    assert not (tmp_path.parent / "escaped").exists()
+
+
+def test_local_store_refuses_keys_outside_its_directory(tmp_path):
+    store = LocalRecordStore(str(tmp_path / "state"))
+
+    for key in ("../escaped", "bookings/../../escaped", "/etc/owned", "bookings//b1", "bookings/./b1"):
+        with pytest.raises(ValueError):
+            store.create(key, {})
+    assert list(tmp_path.iterdir()) == [tmp_path / "state"]
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+import main
+
+
+def jobs(kind, count):
+    return [main.SendJob(kind, row, f"Candidate {row}", f"c{row}@example.com", "Tech", None, None)
+            for row in range(2, 2 + count)]
+
+
+@pytest.fixture
+def engine():
+    engine = main.DispatchEngine(concurrency=4)
+    yield engine
+    engine.shutdown()
+
+
+def test_statuses_are_recorded_in_input_order(engine):
+    welcome = jobs("welcome", 8)
+    recorded = []
+
+    def send(job):
+        # Later rows finish first
+        time.sleep((10 - job.row_index) * 0.005)
+        return True
+
+    phase = engine.submit("welcome", welcome, send, recorded.append)
+
+    assert phase.wait() == (8, 0)
+    assert recorded == welcome
+
+
+def test_failed_sends_are_counted_and_later_rows_still_recorded(engine):
+    welcome = jobs("welcome", 5)
+    recorded = []
+
+    def send(job):
+        if job.row_index == 3:
+            raise RuntimeError("SMTP down")
+        return job.row_index != 5
+
+    phase = engine.submit("welcome", welcome, send, recorded.append)
+
+    assert phase.wait() == (3, 2)
+    assert [job.row_index for job in recorded] == [2, 4, 6]
+
+
+def test_phases_on_one_engine_run_at_the_same_time(engine):
+    interview_started = threading.Event()
+    recorded = {"welcome": [], "interview": []}
+
+    def send_welcome(job):
+        # Only returns once the interview phase is sending alongside it
+        return interview_started.wait(2)
+
+    def send_interview(job):
+        interview_started.set()
+        return True
+
+    welcome = engine.submit("welcome", jobs("welcome", 2), send_welcome, recorded["welcome"].append)
+    interview = engine.submit("interview", jobs("interview", 3), send_interview, recorded["interview"].append)
+
+    assert welcome.wait() == (2, 0)
+    assert interview.wait() == (3, 0)
+    assert [job.row_index for job in recorded["welcome"]] == [2, 3]
+    assert [job.row_index for job in recorded["interview"]] == [2, 3, 4]
+
+
+def test_empty_phase_is_done_at_once(engine):
+    assert engine.submit("interview", [], None, None).wait() == (0, 0)
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import booking
+import booking_asgi
+from fakes import CallLog, FakeCalendarService, Faults
+
+CALENDAR = booking.DEFAULT_CALENDAR
+DAY = date(2030, 3, 4)
+
+
+@pytest.fixture
+def calendar(monkeypatch):
+    calendar = FakeCalendarService(calls=CallLog())
+    monkeypatch.setattr(booking.backends, "calendar_service", lambda: calendar)
+    return calendar
+
+
+def add_event(calendar, start, end):
+    calendar.insert(CALENDAR, {
+        "start": {"dateTime": start.isoformat() + "-06:00"}, "end": {"dateTime": end.isoformat() + "-06:00"},
+    }).execute()
+
+
+def queries(calendar):
+    return calendar.calls.counts["calendar.freebusy.query"]
+
+
+def test_windows_are_cached_side_by_side(calendar):
+    cache = booking.FreeBusyCache([CALENDAR])
+    later_day = DAY + timedelta(days=booking.AVAILABILITY_WINDOW_DAYS + 5)
+
+    for _ in range(3):
+        cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1))
+        cache.busy_intervals(CALENDAR, later_day, later_day + timedelta(days=1))
+
+    assert queries(calendar) == 2
+    assert cache.stats()["hits"] == 4
+
+
+def test_concurrent_misses_share_one_query(calendar):
+    calendar.faults = Faults(latency=0.2)
+    cache = booking.FreeBusyCache([CALENDAR])
+    threads = [
+        threading.Thread(target=cache.busy_intervals, args=(CALENDAR, DAY, DAY + timedelta(days=1)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert queries(calendar) == 1
+    assert cache.stats()["shared"] == 7
+
+
+def test_cached_window_is_served_while_another_is_being_fetched(calendar):
+    cache = booking.FreeBusyCache([CALENDAR])
+    cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1))
+    calendar.faults = Faults(latency=0.5)
+    later_day = DAY + timedelta(days=30)
+    slow = threading.Thread(target=cache.busy_intervals, args=(CALENDAR, later_day, later_day + timedelta(days=1)))
+    slow.start()
+    time.sleep(0.05)
+
+    started = time.monotonic()
+    cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1))
+    assert time.monotonic() - started < 0.25
+    slow.join()
+
+
+def test_invalidate_makes_the_next_read_see_new_events(calendar):
+    cache = booking.FreeBusyCache([CALENDAR])
+    assert cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1)) == []
+    start = datetime(2030, 3, 4, 10)
+    add_event(calendar, start, start + timedelta(minutes=30))
+
+    assert cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1)) == []
+    cache.invalidate()
+    assert cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1)) == [(start, start + timedelta(minutes=30))]
+
+
+def test_is_free_queries_afresh_without_touching_the_cache(calendar):
+    cache = booking.FreeBusyCache([CALENDAR])
+    cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1))
+    start = datetime(2030, 3, 4, 10)
+    add_event(calendar, start, start + timedelta(minutes=30))
+
+    assert not cache.is_free(CALENDAR, start, start + timedelta(minutes=30))
+    assert cache.is_free(CALENDAR, start + timedelta(minutes=30), start + timedelta(hours=1))
+    # The cached window is still the one the slot pages were using
+    assert cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1)) == []
+
+
+def test_async_misses_on_a_window_share_one_query(monkeypatch):
+    cache = booking_asgi.AsyncFreeBusyCache([CALENDAR])
+    busy = [(datetime(2030, 3, 4, 10), datetime(2030, 3, 4, 11))]
+    fetched = []
+
+    async def fetch(start_day, end_day, calendar_ids=None):
+        fetched.append((start_day, end_day))
+        await asyncio.sleep(0.05)
+        return {CALENDAR: busy}
+    monkeypatch.setattr(cache, "_fetch", fetch)
+
+    async def page_loads():
+        return await asyncio.gather(*(cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1)) for _ in range(5)))
+
+    assert asyncio.run(page_loads()) == [busy] * 5
+    assert len(fetched) == 1
+
+
+def test_async_slot_lookup_reads_the_ledger_off_the_event_loop(monkeypatch):
+    cache = booking_asgi.AsyncFreeBusyCache([CALENDAR])
+    monkeypatch.setattr(booking_asgi, "_busy_cache", cache)
+
+    async def fetch(start_day, end_day, calendar_ids=None):
+        return {CALENDAR: []}
+    monkeypatch.setattr(cache, "_fetch", fetch)
+    threads = []
+
+    def get_open_slots(availability_blocks, day, calendar_id, busy=None, taken=None):
+        threads.append(threading.current_thread())
+        return []
+    monkeypatch.setattr(booking_asgi, "get_open_slots", get_open_slots)
+
+    asyncio.run(booking_asgi.open_slots([], DAY, CALENDAR))
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_cancelled_query_is_neither_cached_nor_handed_to_joiners(monkeypatch):
+    cache = booking_asgi.AsyncFreeBusyCache([CALENDAR])
+    busy = [(datetime(2030, 3, 4, 10), datetime(2030, 3, 4, 11))]
+    fetched = []
+
+    async def fetch(start_day, end_day, calendar_ids=None):
+        fetched.append((start_day, end_day))
+        await asyncio.sleep(0.05)
+        return {CALENDAR: busy}
+    monkeypatch.setattr(cache, "_fetch", fetch)
+
+    async def disconnect_during_the_query():
+        first = asyncio.ensure_future(cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1)))
+        await asyncio.sleep(0.01)
+        joiner = asyncio.ensure_future(cache.busy_intervals(CALENDAR, DAY, DAY + timedelta(days=1)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await joiner
+
+    assert asyncio.run(disconnect_during_the_query()) == busy
+    assert len(fetched) == 2
+    assert [entry for _, entry in cache._windows.values()] == [{CALENDAR: busy}]
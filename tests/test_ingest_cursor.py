@@ -0,0 +1,90 @@
+import pytest
+
+import main
+from fakes import CallLog, FakeSpreadsheet
+
+HEADERS = [
+    main.TIMESTAMP_COLUMN, main.NAME_COLUMN, main.EMAIL_COLUMN, main.DEPARTMENTS_COLUMN,
+    main.EMAIL_SENT_COLUMN, main.GIVE_INTERVIEW_COLUMN, main.INTERVIEW_SENT_COLUMN,
+]
+
+
+def response(i, welcome_sent="Yes", give_interview="", interview_sent=""):
+    return [f"1/{i}/2025 10:00:00", f"Candidate {i}", f"candidate{i}@example.com", "Tech",
+            welcome_sent, give_interview, interview_sent]
+
+
+@pytest.fixture
+def spreadsheet(monkeypatch, unpaced):
+    spreadsheet = FakeSpreadsheet({main.RESPONSES_WORKSHEET_NAME: [
+        HEADERS,
+        response(1),
+        response(2, give_interview="Yes"),
+        response(3, welcome_sent=""),
+        response(4, welcome_sent=""),
+    ]}, calls=CallLog())
+    monkeypatch.setattr(main.backends, "spreadsheet", lambda: spreadsheet)
+    return spreadsheet
+
+
+def responses(spreadsheet):
+    return spreadsheet.worksheets[main.RESPONSES_WORKSHEET_NAME]
+
+
+def cursor(spreadsheet):
+    return main.IngestCursor(main.SheetStateStore(spreadsheet))
+
+
+def checkpoint(spreadsheet, settled_rows):
+    """A full-scan run that settles `settled_rows` and saves its mark."""
+    first = cursor(spreadsheet)
+    assert first.probe(responses(spreadsheet)) is None
+    first.commit(first.read(responses(spreadsheet)), settled_rows)
+    return main.SheetStateStore(spreadsheet).load("ingest")
+
+
+def test_mark_stops_at_the_first_unsettled_row(spreadsheet):
+    # Rows 2-3 were already sent and this run settled row 4; row 5 is still owed its email
+    state = checkpoint(spreadsheet, {4})
+
+    assert (state["last_row"], state["last_timestamp"]) == (4, "1/3/2025 10:00:00")
+
+
+def test_next_run_reads_new_rows_and_approved_interviews_only(spreadsheet):
+    checkpoint(spreadsheet, {4})
+    responses(spreadsheet).append_row(response(5, welcome_sent=""))
+
+    resumed = cursor(spreadsheet)
+    assert resumed.probe(responses(spreadsheet)) == 3
+    df = resumed.read(responses(spreadsheet))
+
+    assert sorted(df["original_row_index"]) == [3, 5, 6]
+    assert not resumed.full_scan
+
+
+def test_nothing_new_skips_the_run(spreadsheet):
+    checkpoint(spreadsheet, {4, 5})
+    responses(spreadsheet).update(range_name="G3", values=[["Yes"]])
+
+    sheet, df, resumed = main.get_new_signups(incremental=True)
+    assert df is None
+    assert resumed.probe(sheet) == 0
+
+
+@pytest.mark.parametrize("edit", [
+    lambda sheet: sheet.update(range_name="B1", values=[["Full name"]]),
+    lambda sheet: sheet.rows.pop(1),
+], ids=["header renamed", "row deleted"])
+def test_changed_sheet_resets_to_a_full_scan(spreadsheet, edit):
+    checkpoint(spreadsheet, {4})
+    edit(responses(spreadsheet))
+
+    resumed = cursor(spreadsheet)
+    assert resumed.probe(responses(spreadsheet)) is None
+    df = resumed.read(responses(spreadsheet))
+    assert resumed.full_scan
+    assert len(df) == len(responses(spreadsheet).rows) - 1
+
+    resumed.commit(df, set())
+    assert main.SheetStateStore(spreadsheet).load("ingest")["header_sha"] == main._header_checksum(
+        responses(spreadsheet).rows[0])
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+import pytest
+
+import booking
+import booking_asgi
+
+
+def queue(store, handler, owner="instance-a:1", **options):
+    job_queue = booking.JobQueue(store, {"invite_email": handler}, **options)
+    job_queue.owner = owner
+    return job_queue
+
+
+def run_due(job_queue):
+    for job in job_queue._claim_due(job_queue.workers):
+        job_queue._run(*job)
+
+
+def test_restart_runs_the_jobs_a_stopped_process_left_pending(store):
+    queue(store, None).enqueue("invite_email", {"email": "ann@example.com"})
+    queue(store, None).enqueue("invite_email", {"email": "bob@example.com"})
+    # That process stops before its workers get to them
+
+    ran = []
+    restarted = booking.JobQueue(store, {"invite_email": ran.append}).start()
+    restarted.drain(timeout=5)
+
+    assert sorted(payload["email"] for payload in ran) == ["ann@example.com", "bob@example.com"]
+    assert store.list("jobs/") == []
+
+
+def test_a_job_is_claimed_by_one_process(store):
+    queue(store, None).enqueue("invite_email", {})
+
+    assert len(queue(store, None, owner="instance-a:1")._claim_due(2)) == 1
+    assert queue(store, None, owner="instance-b:1")._claim_due(2) == []
+
+
+def test_running_job_is_taken_over_once_its_lease_runs_out(store, monkeypatch):
+    queue(store, None).enqueue("invite_email", {})
+    queue(store, None, owner="stopped-instance:1")._claim_due(1)
+
+    ran = []
+    survivor = queue(store, ran.append, owner="instance-b:1")
+    run_due(survivor)
+    assert ran == []
+
+    later = time.time() + booking.JOB_LEASE + 1
+    monkeypatch.setattr(time, "time", lambda: later)
+    run_due(survivor)
+    assert ran == [{}]
+    assert store.list("jobs/") == []
+
+
+def test_failed_job_backs_off_then_is_kept_as_failed(store, monkeypatch):
+    def fail(payload):
+        raise RuntimeError("SMTP down")
+
+    job_queue = queue(store, fail, max_attempts=2)
+    job_queue.enqueue("invite_email", {})
+    run_due(job_queue)
+    [(_, record, _)] = store.list("jobs/")
+    assert (record["status"], record["attempts"], record["last_error"]) == ("pending", 1, "SMTP down")
+    assert record["next_run_at"] > time.time()
+
+    later = record["next_run_at"] + 1
+    monkeypatch.setattr(time, "time", lambda: later)
+    run_due(job_queue)
+    [(_, record, _)] = store.list("jobs/")
+    assert (record["status"], record["attempts"]) == ("failed", 2)
+
+
+def test_timed_out_async_invite_is_cancelled_before_the_retry(monkeypatch):
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    monkeypatch.setattr(booking_asgi, "_loop", loop)
+    monkeypatch.setattr(booking_asgi, "SMTP_TIMEOUT", 0.02)
+    sent, cancelled = [], threading.Event()
+
+    async def slow_send(*args):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        sent.append(args)
+    monkeypatch.setattr(booking_asgi, "send_calendar_invite_email", slow_send)
+
+    payload = dict.fromkeys(("name", "email", "department", "start_time", "end_time", "location"), "")
+    with pytest.raises(FuturesTimeoutError):
+        booking_asgi.run_invite_email_job(payload)
+
+    assert cancelled.wait(1)
+    assert sent == []
+    loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,107 @@
+import random
+import time
+
+import aiosmtplib
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from fakes import quota_error
+from sbi_common.quota import QuotaLimiter, retry_after, transient_status
+
+
+@pytest.fixture
+def waits(monkeypatch):
+    """Record every sleep instead of taking it, with backoff jitter pinned to zero."""
+    waits = []
+    monkeypatch.setattr(time, "sleep", waits.append)
+    monkeypatch.setattr(random, "uniform", lambda low, high: low)
+    return waits
+
+
+def failing(*errors, result="ok"):
+    errors = list(errors)
+
+    def call():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return call
+
+
+def test_gspread_429_waits_for_retry_after(waits):
+    limiter = QuotaLimiter("sheets_read", 0)
+
+    assert limiter.call(failing(quota_error(429, retry_after=7))) == "ok"
+    assert waits == [7.0]
+    assert limiter.stats()["retries"] == 1
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_retry_after_is_read_from_every_error_shape():
+    assert retry_after(quota_error(429, retry_after=7)) == 7.0
+    assert retry_after(HttpError(httplib2.Response({"status": 503, "retry-after": "3"}), b"{}")) == 3.0
+    assert retry_after(quota_error(429)) is None
+    assert retry_after(ValueError("not an API error")) is None
+
+
+def test_http_error_retry_after_is_read_from_httplib2_response(waits):
+    response = httplib2.Response({"status": 503, "retry-after": "3"})
+    limiter = QuotaLimiter("calendar", 0)
+
+    assert limiter.call(failing(HttpError(response, b"{}"))) == "ok"
+    assert waits == [3.0]
+
+
+def test_retry_after_is_a_floor_under_the_backoff(waits, monkeypatch):
+    monkeypatch.setattr(random, "uniform", lambda low, high: high)
+    limiter = QuotaLimiter("sheets_read", 0, backoff_base=0.5)
+
+    limiter.call(failing(quota_error(429, retry_after=0.1), quota_error(503)))
+    assert waits == [0.5, 1.0]
+
+
+def test_server_error_is_not_retried_for_non_idempotent_calls(waits):
+    limiter = QuotaLimiter("sheets_write", 0)
+
+    with pytest.raises(Exception):
+        limiter.call(failing(quota_error(503)), idempotent=False)
+    assert waits == []
+    assert limiter.call(failing(quota_error(429, retry_after=2)), idempotent=False) == "ok"
+    assert waits == [2.0]
+
+
+def test_gives_up_after_max_attempts(waits):
+    limiter = QuotaLimiter("sheets_read", 0, max_attempts=3)
+
+    with pytest.raises(Exception):
+        limiter.call(failing(*[quota_error(429, retry_after=1)] * 3))
+    assert waits == [1.0, 1.0]
+
+
+@pytest.mark.parametrize("error", [
+    aiosmtplib.SMTPResponseException(421, "Service not available, closing channel"),
+    aiosmtplib.SMTPServerDisconnected("Connection lost"),
+    aiosmtplib.SMTPConnectError("Connection refused"),
+    aiosmtplib.SMTPReadTimeoutError("Timed out waiting for server response"),
+])
+def test_async_smtp_errors_are_retried(waits, error):
+    limiter = QuotaLimiter("smtp", 0)
+
+    assert limiter.call(failing(error)) == "ok"
+    assert limiter.stats()["retries"] == 1
+
+
+def test_permanent_smtp_errors_are_not_retried():
+    assert transient_status(aiosmtplib.SMTPRecipientRefused(550, "No such user", "bob@example.com")) is None
+    assert transient_status(aiosmtplib.SMTPAuthenticationError(535, "Bad credentials")) is None
+
+
+def test_services_use_their_own_retry_budget():
+    import booking
+    import main
+
+    assert main._sheets_read_quota.max_attempts == main.API_MAX_ATTEMPTS
+    assert main._sheets_read_quota.backoff_max == main.API_BACKOFF_MAX
+    assert booking._calendar_quota.max_attempts == booking.API_MAX_ATTEMPTS
+    assert booking._calendar_quota.backoff_max == booking.API_BACKOFF_MAX
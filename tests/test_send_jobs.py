@@ -0,0 +1,78 @@
+import uuid
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+import main
+from bench_candidate_selection import legacy_send_jobs, synthetic_responses, without_booking_id
+
+
+def responses(*rows):
+    """A responses frame from (name, email, departments, email_sent, give_interview, interview_sent) rows."""
+    names, emails, departments, email_sent, give, interview_sent = zip(*rows)
+    return pd.DataFrame({
+        main.NAME_COLUMN: names,
+        main.EMAIL_COLUMN: emails,
+        main.DEPARTMENTS_COLUMN: departments,
+        main.EMAIL_SENT_COLUMN: email_sent,
+        main.GIVE_INTERVIEW_COLUMN: give,
+        main.INTERVIEW_SENT_COLUMN: interview_sent,
+        "original_row_index": range(2, len(rows) + 2),
+    })
+
+
+def test_rows_that_cant_be_emailed_are_skipped_with_a_reason(capsys):
+    df = responses(
+        ("ann lee", "ann@example.com", "Tech", "", "", ""),
+        ("", "nobody@example.com", "Tech", "", "", ""),
+        ("bob", "", "Tech", "", "", ""),
+        ("cy", "not an email", "Tech", "", "", ""),
+        ("", "", "Tech", "Yes", "Yes", ""),
+    )
+
+    welcome, interview, skipped = main.build_send_jobs(df)
+
+    assert [job.row_index for job in welcome] == [2]
+    assert interview == []
+    # Only rows owed a welcome email are settled by skipping them
+    assert skipped == [3, 4, 5]
+    out = capsys.readouterr().out
+    for line in ("Skipping row 3: missing name", "Skipping row 4: missing email",
+                 "Skipping row 5: invalid email", "Skipping row 6: missing name"):
+        assert line in out
+
+
+def test_interview_jobs_carry_a_booking_link():
+    df = responses(
+        ("  dana o'neil ", " Dana.O+SBI@Example.com", "Tech , Marketing", "Yes", "yes ", ""),
+        ("eve", "eve@example.com", "", "Yes", "Yes", ""),
+        ("fay", "fay@example.com", "Tech", "Yes", "Yes", "already-sent"),
+        ("gus", "gus@example.com", "Tech", "Yes", "No", ""),
+    )
+
+    welcome, interview, skipped = main.build_send_jobs(df)
+
+    assert (welcome, skipped) == ([], [])
+    assert [(job.row_index, job.name, job.email, job.departments) for job in interview] == [
+        (2, "Dana O'Neil", "dana.o+sbi@example.com", "Tech, Marketing"),
+        (3, "Eve", "eve@example.com", main.DEFAULT_BOOKING_DEPARTMENT),
+    ]
+    link = urlsplit(interview[0].booking_link)
+    assert f"{link.scheme}://{link.netloc}" == main.BOOKING_BASE_URL
+    assert parse_qs(link.query) == {
+        "id": [interview[0].booking_id], "name": ["Dana O'Neil"],
+        "email": ["dana.o+sbi@example.com"], "dept": ["Tech, Marketing"],
+    }
+    assert str(uuid.UUID(interview[0].booking_id)) == interview[0].booking_id
+    assert interview[0].booking_id != interview[1].booking_id
+
+
+def test_same_jobs_as_the_iterrows_loops(capsys):
+    df = synthetic_responses(2000)
+
+    welcome, interview, skipped = main.build_send_jobs(df)
+    legacy_welcome, legacy_interview, legacy_skipped = legacy_send_jobs(df)
+
+    assert welcome == legacy_welcome
+    assert [without_booking_id(job) for job in interview] == [without_booking_id(job) for job in legacy_interview]
+    assert set(skipped) == legacy_skipped
@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+import main
+from fakes import FakeBucket
+from sbi_common.store import GCSRecordStore
+
+WELCOME_MARK = [(2, main.EMAIL_SENT_COLUMN, "Yes")]
+
+
+def welcome_job(row_index=2, email="ann@example.com"):
+    return main.SendJob("welcome", row_index, "Ann", email, "Tech", None, None)
+
+
+def sender(ok=True):
+    sent = []
+
+    def send(job, message_id):
+        sent.append(message_id)
+        return ok
+    send.sent = sent
+    return send
+
+
+def test_sent_email_is_not_resent_and_its_mark_is_replayed(store):
+    job = welcome_job()
+    send = sender()
+    first = main.SendJournal(store).load()
+    assert main.journaled(first, send)(job)
+    # The run dies before the status mark reaches the sheet
+
+    second = main.SendJournal(store).load()
+    assert second.resume([job]) == ([], [job])
+    assert second.stats()["replayed"] == 1
+
+    second.written(WELCOME_MARK)
+    assert store.list("sends/") == []
+    assert len(send.sent) == 1
+
+
+def test_failed_send_is_retried_next_run(store):
+    job = welcome_job()
+    main.journaled(main.SendJournal(store).load(), sender(ok=False))(job)
+
+    assert main.SendJournal(store).load().resume([job]) == ([job], [])
+
+
+def test_send_interrupted_before_its_result_is_held_back_then_taken_as_delivered(store, monkeypatch):
+    job = welcome_job()
+    crashed = main.SendJournal(store).load()
+    message_id = crashed.begin(job)
+    # SMTP accepted the message, then the task died before finish()
+
+    soon = main.SendJournal(store, in_doubt_hours=24).load()
+    assert soon.resume([job]) == ([], [])
+    assert soon.stats()["in_doubt"] == 1
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 25 * 3600)
+    later = main.SendJournal(store, in_doubt_hours=24).load()
+    assert later.resume([job]) == ([], [job])
+    assert later.stats()["resolved"] == 1
+    [(_, record, _)] = store.list("sends/")
+    assert (record["status"], record["message_id"]) == ("sent", message_id)
+
+    later.written(WELCOME_MARK)
+    assert store.list("sends/") == []
+
+
+@pytest.mark.parametrize("action, to_send, replayed", [("sent", 0, 1), ("resend", 1, 0)])
+def test_resolve_in_doubt(store, action, to_send, replayed):
+    job = welcome_job()
+    main.SendJournal(store).load().begin(job)
+
+    assert main.SendJournal(store).load().resolve_in_doubt(action) == 1
+
+    pending, replay = main.SendJournal(store).load().resume([job])
+    assert (len(pending), len(replay)) == (to_send, replayed)
+
+
+def test_overlapping_runs_send_each_email_once(store):
+    job = welcome_job()
+    first, second = main.SendJournal(store).load(), main.SendJournal(store).load()
+    send = sender()
+
+    assert main.journaled(first, send)(job)
+    assert not main.journaled(second, send)(job)
+    assert len(send.sent) == 1
+    assert second.stats()["contended"] == 1
+
+
+def test_journal_errors_never_fail_the_status_write(store, monkeypatch):
+    journal = main.SendJournal(store).load()
+    main.journaled(journal, sender())(welcome_job())
+
+    def unavailable(*args):
+        raise ConnectionError("store unavailable")
+    monkeypatch.setattr(store, "delete", unavailable)
+
+    journal.written(WELCOME_MARK)
+
+
+def test_gcs_write_whose_response_was_lost_counts_as_done():
+    bucket = FakeBucket()
+    store = GCSRecordStore(bucket, "email-job", main.telemetry)
+    bucket.lost_responses = 1
+
+    generation = store.create("sends/welcome/2", {"status": "pending"})
+    assert generation is not None
+    assert store.read("sends/welcome/2") == ({"status": "pending"}, generation)
+    assert store.create("sends/welcome/2", {"status": "pending", "run_id": "other"}) is None
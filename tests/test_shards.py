@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+
+import main
+from sbi_common.store import LocalRecordStore
+
+
+def responses(*emails):
+    return pd.DataFrame({main.EMAIL_COLUMN: list(emails)})
+
+
+def test_shard_of_is_fixed_for_a_key():
+    assert [main._shard_of("ann@example.com", count) for count in (2, 3, 4)] == [1, 0, 1]
+    assert [main._shard_of("bob@example.com", count) for count in (2, 3, 4)] == [0, 1, 0]
+
+
+def test_shard_of_does_not_depend_on_the_hash_seed():
+    script = "import main; print([main._shard_of(f'user{i}@example.com', 7) for i in range(20)])"
+    runs = {
+        subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(main.__file__), env=dict(os.environ, PYTHONHASHSEED=seed),
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert len(runs) == 1
+
+
+def test_shards_partition_the_rows_by_normalised_email():
+    df = responses("ann@example.com", " Ann@Example.com ", "bob@example.com", "cy@example.com", "")
+    owned = [main.Shard(index, 3).owns(df) for index in range(3)]
+
+    assert (sum(mask.astype(int) for mask in owned) == 1).all()
+    owner = [next(i for i, mask in enumerate(owned) if mask[row]) for row in df.index]
+    assert owner[0] == owner[1]
+    assert main.Shard(0, 1).owns(df).all()
+
+
+def test_changing_the_task_count_never_repeats_a_send(tmp_path):
+    store = LocalRecordStore(str(tmp_path))
+    job = main.SendJob("welcome", 2, "Ann", "ann@example.com", "Tech", None, None)
+    # With two tasks the row is shard 1's; with three it moves to shard 0
+    assert main._shard_of(job.email, 2) != main._shard_of(job.email, 3)
+
+    main.journaled(main.SendJournal(store).load(), lambda job, message_id: True)(job)
+
+    assert main.SendJournal(store).load().resume([job]) == ([], [job])
@@ -0,0 +1,61 @@
+import pytest
+
+import main
+from fakes import CallLog, FakeWorksheet, Faults
+
+HEADERS = ["Timestamp", main.EMAIL_SENT_COLUMN, main.INTERVIEW_SENT_COLUMN]
+
+
+@pytest.fixture
+def sheet(unpaced):
+    return FakeWorksheet(main.RESPONSES_WORKSHEET_NAME, [HEADERS] + [[f"1/{i}/2025"] for i in range(1, 6)],
+                         calls=CallLog())
+
+
+def marks(sheet, header):
+    col = HEADERS.index(header)
+    return [row[col] if len(row) > col else "" for row in sheet.rows[1:]]
+
+
+def test_marks_are_written_in_chunks(sheet):
+    written = []
+    buffer = main.StatusWriteBuffer(sheet, flush_every=100, chunk_size=2, on_written=written.append)
+    for row in range(2, 7):
+        buffer.record(row, main.EMAIL_SENT_COLUMN, "Yes")
+    buffer.record(4, main.INTERVIEW_SENT_COLUMN, "booking-1")
+
+    assert buffer.flush()
+    assert marks(sheet, main.EMAIL_SENT_COLUMN) == ["Yes"] * 5
+    assert marks(sheet, main.INTERVIEW_SENT_COLUMN) == ["", "", "booking-1", "", ""]
+    assert sheet.calls.counts["sheets.batch_update"] == 3
+    # Row 1 is read once to find the columns
+    assert sheet.calls.counts["sheets.row_values"] == 1
+    assert [len(chunk) for chunk in written] == [2, 2, 2]
+
+
+def test_buffer_flushes_every_flush_every_rows(sheet):
+    buffer = main.StatusWriteBuffer(sheet, flush_every=2)
+    buffer.record(2, main.EMAIL_SENT_COLUMN, "Yes")
+    assert sheet.calls.counts["sheets.batch_update"] == 0
+
+    buffer.record(3, main.EMAIL_SENT_COLUMN, "Yes")
+    assert sheet.calls.counts["sheets.batch_update"] == 1
+    assert buffer.stats() == {"api_calls": 2, "cells_written": 2, "pending": 0}
+
+
+def test_failed_chunk_is_requeued_for_the_next_flush(sheet):
+    sheet.faults = Faults(fail_calls={1})
+    written = []
+    buffer = main.StatusWriteBuffer(sheet, headers=HEADERS, flush_every=100, chunk_size=2,
+                                    on_written=written.extend)
+    for row in range(2, 6):
+        buffer.record(row, main.EMAIL_SENT_COLUMN, "Yes")
+
+    assert not buffer.flush()
+    assert marks(sheet, main.EMAIL_SENT_COLUMN) == ["", "", "Yes", "Yes", ""]
+    assert buffer.stats()["pending"] == 2
+
+    assert buffer.flush()
+    assert marks(sheet, main.EMAIL_SENT_COLUMN) == ["Yes"] * 4 + [""]
+    assert sorted(row for row, _, _ in written) == [2, 3, 4, 5]
+    assert buffer.stats()["pending"] == 0